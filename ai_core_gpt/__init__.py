@@ -1 +1 @@
-__all__ = ['exporter','controller','optimizer','design','runtime']
+__all__ = ['exporter','controller','optimizer','design','runtime','scoring','lexicon']
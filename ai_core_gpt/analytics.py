@@ -0,0 +1,68 @@
+from __future__ import annotations
+"""
+analytics.py
+
+粒子インデックスを 1 回だけ走査し、登録された複数の Reducer に同時に流し込む集計エンジン。
+
+integration_report.json / summary/particles_summary.json / optimization_summary.json は
+それぞれの Reducer（pipeline_controller / aggregate_particles / optimizer に定義）から作られ、
+integration_pipeline/analytics.py が 1 回の走査でまとめて書き出す。
+"""
+
+import logging
+import time
+from abc import ABC, abstractmethod
+from fnmatch import fnmatchcase
+from typing import Any, Iterable, List, Sequence
+
+from ai_core_gpt.particle import Particle
+from ai_core_gpt.store import ParticleStore
+
+logger = logging.getLogger(__name__)
+
+
+class Reducer(ABC):
+    """
+    集計の差し込み口（add() と result() を実装していないサブクラスはインスタンス化できない）。
+
+    - pattern: 対象にする粒子ファイル名の glob（既定は全件。セグメント内の粒子は元のファイル名で判定）
+    - add(): 粒子レコード（ParticleStore.iter_records() が返す Particle）を 1 件受け取る
+    - result(): 集計結果を返す
+    """
+
+    name = "reducer"
+    pattern = "*.json"
+
+    @abstractmethod
+    def add(self, record: Particle) -> None:
+        ...
+
+    @abstractmethod
+    def result(self) -> Any:
+        ...
+
+
+def run_reducers(records: Iterable[Particle], reducers: Sequence[Reducer]) -> List[Any]:
+    """records を 1 回だけ走査して各 Reducer に配り、結果を reducers と同じ順で返す。"""
+    patterns = sorted({r.pattern for r in reducers})
+    routes = {pattern: [r for r in reducers if r.pattern == pattern] for pattern in patterns}
+    count = 0
+    started = time.perf_counter()
+    for record in records:
+        count += 1
+        name = record.name
+        for pattern, targets in routes.items():
+            if pattern == "*.json" or fnmatchcase(name, pattern):
+                for reducer in targets:
+                    reducer.add(record)
+    logger.info(
+        "Analytics pass: %d particles -> %s (%.3fs)",
+        count, ", ".join(r.name for r in reducers), time.perf_counter() - started,
+    )
+    return [r.result() for r in reducers]
+
+
+def run_pass(store: ParticleStore, reducers: Sequence[Reducer]) -> List[Any]:
+    """インデックスを同期してから全粒子を 1 回走査する。"""
+    store.sync()
+    return run_reducers(store.iter_records(), reducers)
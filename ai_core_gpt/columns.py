@@ -0,0 +1,401 @@
+from __future__ import annotations
+"""
+columns.py
+
+粒子のスコア・status・意図・タイムスタンプ・レビュアを月ごとの列（NumPy 配列）に保持するキャッシュ。
+
+particles/_columns/YYYY-MM.npz に月パーティションごとの列を置き、ParticleStore の seq を
+高水位として新しい粒子だけを追記する。パーセンタイル・移動平均・意図別トレンドのような
+集計を JSON を読まずにベクトル演算で求めるためのもので、optimizer の推奨計算にも使う。
+
+    python -m ai_core_gpt.columns refresh|rebuild|stats --root particles
+"""
+
+import argparse
+import json
+import logging
+import os
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from ai_core_gpt.particle import UNKNOWN_MONTH, Particle, month_of  # noqa: F401
+from ai_core_gpt.sketch import BUCKETS, ScoreHistogram, ScoreSketches
+from ai_core_gpt.store import PARTICLE_ROOT, ParticleStore, open_store
+
+try:
+    import numpy as np
+except ImportError:  # numpy が無い環境ではキャッシュを使わず、集計側はインデックスから計算する
+    np = None  # type: ignore[assignment]
+
+logger = logging.getLogger(__name__)
+
+COLUMN_DIR = "_columns"
+MANIFEST_NAME = "manifest.json"
+# 列の中身の作り方を変えたら上げる（manifest の format が違えば作り直す）
+COLUMN_FORMAT = 2
+
+# 文字列の列は (コード列, 語彙) で持つ
+CATEGORICAL = ("status", "intent", "reviewer", "kind")
+
+
+def _timestamp(created_at: Any) -> Any:
+    if not isinstance(created_at, str):
+        return np.datetime64("NaT", "s")
+    try:
+        ts = datetime.fromisoformat(created_at.replace("Z", "+00:00"))
+    except ValueError:
+        return np.datetime64("NaT", "s")
+    if ts.tzinfo is not None:
+        # オフセット付きは UTC に直す（オフセット無しはそのまま UTC として扱う）
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return np.datetime64(ts, "s")
+
+
+def _kind(name: str) -> str:
+    """粒子ファイル名の種別（AUTO_* → "AUTO"、EVAL_* → "EVAL" など）。"""
+    return name.split("_", 1)[0] if "_" in name else ""
+
+
+@dataclass
+class Columns:
+    """
+    列指向の粒子データ。
+
+    - seq / score / timestamp: 数値列（timestamp は datetime64[s]、不明は NaT）
+    - status / intent / reviewer / kind: 語彙へのコード列（vocab[name][code] が値）
+    """
+
+    seq: Any
+    score: Any
+    timestamp: Any
+    codes: Dict[str, Any]
+    vocab: Dict[str, Tuple[str, ...]]
+
+    def __len__(self) -> int:
+        return len(self.score)
+
+    def values(self, column: str) -> Any:
+        """カテゴリ列を文字列配列に戻す。"""
+        return np.asarray(self.vocab[column], dtype=object)[self.codes[column]] if len(self) else np.array([], object)
+
+    def where(self, **equals: str) -> Any:
+        """status="promoted", kind="AUTO" のような等値条件の真偽マスク。"""
+        mask = np.ones(len(self), dtype=bool)
+        for column, value in equals.items():
+            vocab = self.vocab[column]
+            mask &= self.codes[column] == (vocab.index(value) if value in vocab else -1)
+        return mask
+
+    def select(self, mask: Any) -> "Columns":
+        return Columns(
+            self.seq[mask], self.score[mask], self.timestamp[mask],
+            {k: v[mask] for k, v in self.codes.items()}, self.vocab,
+        )
+
+    # ---- 集計 -----------------------------------------------------------------
+    def counts(self, column: str) -> Dict[str, int]:
+        """カテゴリ値ごとの件数（出現順）。"""
+        codes = self.codes[column]
+        if not len(codes):
+            return {}
+        uniq, first = np.unique(codes, return_index=True)
+        order = uniq[np.argsort(first)]
+        counts = np.bincount(codes, minlength=len(self.vocab[column]))
+        return {self.vocab[column][c]: int(counts[c]) for c in order}
+
+    def percentiles(self, qs: Sequence[float] = (5, 25, 50, 75, 95)) -> Dict[str, float]:
+        if not len(self):
+            return {}
+        return {f"p{q:g}": float(v) for q, v in zip(qs, np.percentile(self.score, qs))}
+
+    def aggregate(self) -> Dict[str, Any]:
+        """
+        optimizer.AggregateReducer.result() と同じ形の集計。
+
+        合計は登録順の累積和で求めるため、Reducer で 1 件ずつ足した値と一致する。
+        """
+        total = len(self)
+        intents: Dict[str, Any] = {}
+        status = self.values("status")
+        intent = self.values("intent")
+        for name in self.counts("intent"):
+            mask = intent == name
+            c = int(mask.sum())
+            intents[name] = {
+                "count": c,
+                "avg_score": float(np.cumsum(self.score[mask])[-1]) / c,
+                "promoted": int((status[mask] == "promoted").sum()),
+                "record_only": int((status[mask] == "record_only").sum()),
+            }
+        return {
+            "total_particles": total,
+            "avg_score": float(np.cumsum(self.score)[-1]) / total if total else 0.0,
+            "status_counts": self.counts("status"),
+            "intents": intents,
+            "score_sketches": self.sketches().to_dict(),
+        }
+
+    def _histogram(self, mask: Any = None) -> ScoreHistogram:
+        scores = self.score if mask is None else self.score[mask]
+        if not len(scores):
+            return ScoreHistogram()
+        buckets = np.clip((scores * BUCKETS).astype(np.int64), 0, BUCKETS - 1)
+        return ScoreHistogram.from_counts(np.bincount(buckets, minlength=BUCKETS), float(scores.min()), float(scores.max()))
+
+    def sketches(self) -> ScoreSketches:
+        """ai_core_gpt.sketch.ScoreSketches（AggregateReducer が 1 件ずつ足したものと同じ）を列から作る。"""
+        out = ScoreSketches()
+        out.all = self._histogram()
+        for column, target in (("intent", out.intents), ("status", out.statuses)):
+            values = self.values(column)
+            for name in self.counts(column):
+                target[name] = self._histogram(values == name)
+        return out
+
+    def rolling_mean(self, days: float = 7.0) -> Tuple[Any, Any]:
+        """タイムスタンプ順に並べ、各時点から過去 days 日のスコア平均を返す（NaT は除外）。"""
+        valid = ~np.isnat(self.timestamp)
+        order = np.argsort(self.timestamp[valid], kind="stable")
+        ts = self.timestamp[valid][order]
+        scores = self.score[valid][order]
+        csum = np.concatenate(([0.0], np.cumsum(scores)))
+        start = np.searchsorted(ts, ts - np.timedelta64(int(days * 86400), "s"), side="right")
+        end = np.arange(1, len(ts) + 1)
+        return ts, (csum[end] - csum[start]) / np.maximum(end - start, 1)
+
+    def timeline(self) -> Tuple[Any, Any, Any]:
+        """
+        タイムスタンプのある粒子を時刻順に並べた (UNIX 秒, スコア, promoted か) の列（NaT は除外）。
+
+        ai_core_gpt.windows.RollingStats.add_series() にそのまま渡せる。
+        """
+        valid = ~np.isnat(self.timestamp)
+        order = np.argsort(self.timestamp[valid], kind="stable")
+        seconds = self.timestamp[valid][order].astype(np.int64).astype(np.float64)
+        return seconds, self.score[valid][order], self.where(status="promoted")[valid][order]
+
+    def monthly(self, by: Optional[str] = None) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """月 → グループ（by が None なら "all"）→ {count, avg_score}。"""
+        valid = ~np.isnat(self.timestamp)
+        months = self.timestamp[valid].astype("datetime64[M]").astype(np.int64)
+        if by:
+            groups, labels = self.codes[by][valid], self.vocab[by]
+        else:
+            groups, labels = np.zeros(int(valid.sum()), dtype=np.int32), ("all",)
+        # (月, グループ) を 1 つの整数キーにまとめて bincount で集計する
+        keys = months * len(labels) + groups
+        uniq, inverse = np.unique(keys, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        counts = np.bincount(inverse, minlength=len(uniq))
+        sums = np.bincount(inverse, weights=self.score[valid], minlength=len(uniq))
+        out: Dict[str, Dict[str, Dict[str, float]]] = {}
+        for key, c, s in zip(uniq.tolist(), counts.tolist(), sums.tolist()):
+            month = str(np.datetime64(key // len(labels), "M"))
+            out.setdefault(month, {})[labels[key % len(labels)]] = {"count": int(c), "avg_score": s / c}
+        return out
+
+    def trends(self, by: str = "intent") -> Dict[str, Dict[str, float]]:
+        """グループごとの月平均スコアの推移（最新月の平均と、1 か月あたりの傾き）。"""
+        series: Dict[str, List[Tuple[str, float]]] = {}
+        for month, groups in sorted(self.monthly(by).items()):
+            for group, stats in groups.items():
+                series.setdefault(group, []).append((month, stats["avg_score"]))
+        out: Dict[str, Dict[str, float]] = {}
+        for group, points in series.items():
+            x = np.array([np.datetime64(m, "M").astype(np.int64) for m, _ in points], dtype=np.float64)
+            y = np.array([v for _, v in points])
+            slope = float(np.polyfit(x, y, 1)[0]) if len(points) >= 2 else 0.0
+            out[group] = {"months": len(points), "latest": float(y[-1]), "slope_per_month": slope}
+        return out
+
+
+class ColumnarCache:
+    """particles/_columns/ の月パーティションを管理する。"""
+
+    def __init__(self, root: Path = PARTICLE_ROOT, store: Optional[ParticleStore] = None):
+        if np is None:
+            raise RuntimeError("ColumnarCache requires numpy (pip install numpy)")
+        self.root = Path(root)
+        self.store = store or open_store(self.root)
+        self.directory = self.root / COLUMN_DIR
+
+    # ---- manifest / partitions ------------------------------------------------
+    def _manifest(self) -> Dict[str, Any]:
+        path = self.directory / MANIFEST_NAME
+        if not path.exists():
+            return {}
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))
+        except Exception as e:
+            logger.warning("Ignoring broken column manifest %s: %s", path, e)
+            return {}
+
+    def _write_atomic(self, path: Path, write: Any) -> None:
+        tmp = path.with_name(path.name + ".tmp")
+        with tmp.open("wb") as f:
+            write(f)
+        os.replace(tmp, path)
+
+    def partitions(self) -> List[str]:
+        if not self.directory.exists():
+            return []
+        return sorted(p.stem for p in self.directory.glob("*.npz"))
+
+    def _load_partition(self, month: str) -> Optional[Columns]:
+        path = self.directory / f"{month}.npz"
+        if not path.exists():
+            return None
+        with np.load(path, allow_pickle=False) as z:
+            return Columns(
+                z["seq"], z["score"], z["timestamp"],
+                {c: z[f"{c}_codes"] for c in CATEGORICAL},
+                {c: tuple(z[f"{c}_vocab"].tolist()) for c in CATEGORICAL},
+            )
+
+    def _save_partition(self, month: str, cols: Columns) -> None:
+        arrays = {"seq": cols.seq, "score": cols.score, "timestamp": cols.timestamp}
+        for c in CATEGORICAL:
+            arrays[f"{c}_codes"] = cols.codes[c]
+            arrays[f"{c}_vocab"] = np.array(cols.vocab[c], dtype=str)
+        self._write_atomic(self.directory / f"{month}.npz", lambda f: np.savez(f, **arrays))
+
+    # ---- maintenance ----------------------------------------------------------
+    def refresh(self) -> Dict[str, int]:
+        """インデックスを同期し、前回以降に登録された粒子を月パーティションへ追記する。"""
+        self.store.sync()
+        generation = self.store.generation
+        manifest = self._manifest()
+        since = int(manifest.get("last_seq", 0))
+        stale = manifest.get("generation") != generation or manifest.get("format") != COLUMN_FORMAT
+        if stale:
+            # 行の削除や rebuild、列の形式の変更があった場合は作り直す
+            for month in self.partitions():
+                (self.directory / f"{month}.npz").unlink()
+            since = 0
+
+        grouped: Dict[str, List[Particle]] = {}
+        last_seq = since
+        for record in self.store.iter_records(since=since):
+            grouped.setdefault(month_of(record, self.root), []).append(record)
+            last_seq = record.seq
+
+        if grouped:
+            self.directory.mkdir(parents=True, exist_ok=True)
+        for month, records in grouped.items():
+            self._save_partition(month, self._append(self._load_partition(month), records))
+        if grouped or stale:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            body = json.dumps(
+                {"format": COLUMN_FORMAT, "generation": generation, "last_seq": last_seq}, ensure_ascii=False
+            ).encode("utf-8")
+            self._write_atomic(self.directory / MANIFEST_NAME, lambda f: f.write(body))
+        stats = {"added": sum(map(len, grouped.values())), "partitions": len(grouped)}
+        if stats["added"]:
+            logger.info("Column cache refreshed: %s", stats)
+        return stats
+
+    def rebuild(self) -> Dict[str, int]:
+        manifest = self.directory / MANIFEST_NAME
+        if manifest.exists():
+            manifest.unlink()
+        return self.refresh()
+
+    @staticmethod
+    def _append(base: Optional[Columns], records: List[Particle]) -> Columns:
+        vocab = {c: list(base.vocab[c]) if base else [] for c in CATEGORICAL}
+        lookup = {c: {v: i for i, v in enumerate(vocab[c])} for c in CATEGORICAL}
+
+        def encode(column: str, value: Any) -> int:
+            value = "" if value is None else str(value)
+            code = lookup[column].get(value)
+            if code is None:
+                code = lookup[column][value] = len(vocab[column])
+                vocab[column].append(value)
+            return code
+
+        n = len(records)
+        seq = np.fromiter((r.seq for r in records), dtype=np.int64, count=n)
+        score = np.fromiter((r.score for r in records), dtype=np.float64, count=n)
+        timestamp = np.array([_timestamp(r.created_at) for r in records], dtype="datetime64[s]")
+        codes = {
+            "status": [encode("status", r.status) for r in records],
+            "intent": [encode("intent", r.intent_category) for r in records],
+            "reviewer": [encode("reviewer", r.reviewer) for r in records],
+            "kind": [encode("kind", _kind(r.name)) for r in records],
+        }
+        new_codes = {c: np.asarray(v, dtype=np.int32) for c, v in codes.items()}
+        if base is not None:
+            seq = np.concatenate((base.seq, seq))
+            score = np.concatenate((base.score, score))
+            timestamp = np.concatenate((base.timestamp, timestamp))
+            new_codes = {c: np.concatenate((base.codes[c], new_codes[c])) for c in CATEGORICAL}
+        return Columns(seq, score, timestamp, new_codes, {c: tuple(v) for c, v in vocab.items()})
+
+    # ---- query ----------------------------------------------------------------
+    def load(self, months: Optional[Iterable[str]] = None) -> Columns:
+        """月パーティション（既定は全部）を語彙を揃えて連結し、seq 順の Columns を返す。"""
+        parts = [p for p in (self._load_partition(m) for m in (months or self.partitions())) if p is not None]
+        vocab: Dict[str, List[str]] = {c: [] for c in CATEGORICAL}
+        codes: Dict[str, List[Any]] = {c: [] for c in CATEGORICAL}
+        for part in parts:
+            for c in CATEGORICAL:
+                index = {v: i for i, v in enumerate(vocab[c])}
+                remap = np.empty(len(part.vocab[c]), dtype=np.int32)
+                for i, v in enumerate(part.vocab[c]):
+                    if v not in index:
+                        index[v] = len(vocab[c])
+                        vocab[c].append(v)
+                    remap[i] = index[v]
+                codes[c].append(remap[part.codes[c]])
+        if not parts:
+            empty = np.array([], dtype=np.int32)
+            return Columns(
+                np.array([], dtype=np.int64), np.array([], dtype=np.float64), np.array([], dtype="datetime64[s]"),
+                {c: empty for c in CATEGORICAL}, {c: () for c in CATEGORICAL},
+            )
+        seq = np.concatenate([p.seq for p in parts])
+        order = np.argsort(seq, kind="stable")
+        return Columns(
+            seq[order],
+            np.concatenate([p.score for p in parts])[order],
+            np.concatenate([p.timestamp for p in parts])[order],
+            {c: np.concatenate(codes[c])[order] for c in CATEGORICAL},
+            {c: tuple(vocab[c]) for c in CATEGORICAL},
+        )
+
+
+def load_columns(root: Path = PARTICLE_ROOT) -> Columns:
+    """キャッシュを最新化して全パーティションを読み込む。"""
+    cache = ColumnarCache(root)
+    cache.refresh()
+    return cache.load()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="粒子の列キャッシュ（particles/_columns）を管理する。")
+    parser.add_argument("command", choices=["refresh", "rebuild", "stats"])
+    parser.add_argument("--root", type=Path, default=PARTICLE_ROOT, help="粒子ディレクトリ（既定: particles）")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="[%(levelname)s] %(message)s")
+    cache = ColumnarCache(args.root)
+    if args.command == "refresh":
+        print(json.dumps(cache.refresh(), ensure_ascii=False))
+    elif args.command == "rebuild":
+        print(json.dumps(cache.rebuild(), ensure_ascii=False))
+    else:
+        cache.refresh()
+        cols = cache.load()
+        print(json.dumps({
+            "total": len(cols),
+            "partitions": cache.partitions(),
+            "percentiles": cols.percentiles(),
+            "status_counts": cols.counts("status"),
+            "intent_trends": cols.trends("intent"),
+        }, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+from __future__ import annotations
+"""
+compact.py
+
+既存の particles/ ツリーから、意味的な内容（ai_core_gpt.store.content_hash）が同じ粒子ファイルを
+1 件に圧縮する一回限りのツール。
+
+- 同じ内容のグループでは最も早く作られた粒子（created_at、同じなら登録順）を残す
+- 残りの JSON ファイルは削除し、その件数をインデックスの duplicates 表に足す（出現回数は失わない）
+- セグメント内の粒子は行単位では消せないので残す（残す側に選ばれることはある）
+
+既定は --dry-run 相当の報告だけで、--apply を付けたときだけファイルを消す。
+
+    python -m ai_core_gpt.compact --root particles           # 消える予定の件数とバイト数を表示
+    python -m ai_core_gpt.compact --root particles --apply   # 実際に消してインデックスを同期する
+"""
+
+import argparse
+import json
+import logging
+from pathlib import Path
+from typing import Any, Dict, List
+
+from ai_core_gpt.particle import Particle
+from ai_core_gpt.store import PARTICLE_ROOT, ParticleStore
+
+logger = logging.getLogger(__name__)
+
+
+def _keep_order(record: Particle) -> tuple:
+    return (record.created_at is None, record.created_at or "", record.seq)
+
+
+def compact(store: ParticleStore, apply: bool = False) -> Dict[str, Any]:
+    """重複した粒子ファイルを数え（apply なら削除し）、結果の統計を返す。"""
+    store.sync()
+    stats: Dict[str, Any] = {"groups": 0, "duplicates": 0, "in_segments": 0, "bytes": 0, "removed": 0}
+    removed: Dict[str, int] = {}
+    examples: List[Dict[str, Any]] = []
+    for group in store.duplicate_groups():
+        keep, *rest = sorted(group, key=_keep_order)
+        stats["groups"] += 1
+        for record in rest:
+            stats["duplicates"] += 1
+            if record.offset >= 0:
+                stats["in_segments"] += 1
+                continue
+            path = Path(record.path)
+            try:
+                stats["bytes"] += path.stat().st_size
+                if apply:
+                    path.unlink()
+            except FileNotFoundError:
+                continue
+            if apply:
+                stats["removed"] += 1
+                removed[record.content_hash] = removed.get(record.content_hash, 0) + 1
+            if len(examples) < 5:
+                examples.append({"remove": record.commit_id, "keep": keep.commit_id})
+    if removed:
+        store.add_duplicates(removed)
+        store.sync()
+    stats["examples"] = examples
+    return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="同じ内容の粒子ファイルを 1 件にまとめる。")
+    parser.add_argument("--root", type=Path, default=PARTICLE_ROOT, help="粒子ディレクトリ（既定: particles）")
+    parser.add_argument("--apply", action="store_true", help="重複ファイルを実際に削除する（省略時は報告のみ）")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="[%(levelname)s] %(message)s")
+    with ParticleStore(args.root) as store:
+        stats = compact(store, apply=args.apply)
+    print(json.dumps(stats, ensure_ascii=False, indent=2))
+    if not args.apply and stats["duplicates"] > stats["in_segments"]:
+        print("dry run: re-run with --apply to remove the duplicate files")
+
+
+if __name__ == "__main__":
+    main()
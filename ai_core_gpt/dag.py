@@ -0,0 +1,207 @@
+from __future__ import annotations
+"""
+dag.py
+
+パイプラインのステップを依存関係（DAG）に沿って実行する小さなスケジューラ（DagScheduler）。
+
+- 各ステップは入力（ファイル・粒子ツリーなどの指紋）と出力ファイルを宣言する
+- 入力の指紋が前回の成功時と同じで、出力ファイルも前回書いたままなら実行を省く（キャッシュヒット）
+- 依存は after=（明示）と「他のステップの出力を入力に持つ」ことから決まり、依存の無いステップは並行に実行する
+- 実行ごとに、ステップ別の所要時間・状態（ran / cached / failed / skipped）とキャッシュヒット数を報告する
+
+キャッシュは cache_path の JSON（ステップ名 → 入力の指紋・出力のハッシュ）に保存する。
+"""
+
+import hashlib
+import json
+import logging
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from ai_core_gpt.store import open_store
+
+logger = logging.getLogger(__name__)
+
+CACHE_PATH = Path("pipeline_dag_cache.json")
+MISSING = "missing"
+
+
+@dataclass(frozen=True)
+class Input:
+    """ステップの入力。fingerprint() は内容が同じなら同じ文字列を返す。"""
+
+    name: str
+    fingerprint: Callable[[], str]
+
+
+def _key(path: Path) -> str:
+    return os.path.normpath(os.path.abspath(path))
+
+
+def file_digest(path: Path) -> str:
+    try:
+        return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+    except FileNotFoundError:
+        return MISSING
+
+
+def file_input(path: Path) -> Input:
+    """ファイルの内容（sha256）を指紋にする入力。他のステップの出力と同じパスなら依存になる。"""
+    return Input(_key(path), lambda: file_digest(path))
+
+
+def particles_input(root: Path) -> Input:
+    """
+    粒子ツリーを指紋にする入力。
+
+    全ファイルを読む代わりに ParticleStore.sync() で取り込んでから、インデックスの世代・最大 seq・件数を使う
+    （粒子は追記専用で、削除や作り直しは世代が変わる）。
+    """
+
+    def fingerprint() -> str:
+        store = open_store(root)
+        store.sync()
+        return f"{store.generation}:{store.last_seq()}:{store.count()}"
+
+    return Input(f"particles:{_key(root)}", fingerprint)
+
+
+@dataclass
+class Step:
+    name: str
+    fn: Callable[[], Any]
+    inputs: Sequence[Input] = ()
+    outputs: Sequence[Path] = ()
+    after: Sequence[str] = ()
+    # 入力を宣言しないステップ（副作用だけのもの）は常に実行する
+    cacheable: bool = True
+    deps: Tuple[str, ...] = field(default=(), init=False)
+
+
+class DagScheduler:
+    def __init__(self, steps: Sequence[Step], cache_path: Path = CACHE_PATH, max_workers: int = 4):
+        self.steps = {step.name: step for step in steps}
+        if len(self.steps) != len(steps):
+            raise ValueError("duplicate step names")
+        self.cache_path = Path(cache_path)
+        self.max_workers = max_workers
+        producers = {_key(out): step.name for step in steps for out in step.outputs}
+        for step in steps:
+            unknown = [name for name in step.after if name not in self.steps]
+            if unknown:
+                raise ValueError(f"{step.name}: unknown dependencies {unknown}")
+            implicit = [producers[i.name] for i in step.inputs if producers.get(i.name, step.name) != step.name]
+            step.deps = tuple(dict.fromkeys([*step.after, *implicit]))
+        self.order = self._toposort()
+
+    def _toposort(self) -> List[str]:
+        order: List[str] = []
+        state: Dict[str, int] = {}
+
+        def visit(name: str, path: Tuple[str, ...]) -> None:
+            if state.get(name) == 2:
+                return
+            if state.get(name) == 1:
+                raise ValueError(f"dependency cycle: {' -> '.join(path + (name,))}")
+            state[name] = 1
+            for dep in self.steps[name].deps:
+                visit(dep, path + (name,))
+            state[name] = 2
+            order.append(name)
+
+        for name in self.steps:
+            visit(name, ())
+        return order
+
+    # ---- cache ----------------------------------------------------------------
+    def _load_cache(self) -> Dict[str, Any]:
+        try:
+            return json.loads(self.cache_path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return {}
+        except Exception as e:  # noqa: BLE001
+            logger.error("Failed to read DAG cache %s: %s", self.cache_path, e)
+            return {}
+
+    def _save_cache(self, cache: Dict[str, Any]) -> None:
+        tmp = self.cache_path.with_name(self.cache_path.name + ".tmp")
+        tmp.write_text(json.dumps(cache, ensure_ascii=False, indent=2), encoding="utf-8")
+        os.replace(tmp, self.cache_path)
+
+    # ---- run ------------------------------------------------------------------
+    def _execute(self, step: Step, cached: Optional[Dict[str, Any]], force: bool) -> Tuple[Dict[str, Any], Any]:
+        """ステップを 1 つ処理し、(報告, キャッシュに残すエントリ) を返す。"""
+        started = time.perf_counter()
+        entry: Dict[str, Any] = {"step": step.name}
+        fingerprints = {i.name: i.fingerprint() for i in step.inputs}
+        cacheable = step.cacheable and bool(step.inputs)
+        if (
+            cacheable
+            and not force
+            and cached is not None
+            and cached.get("inputs") == fingerprints
+            and all(file_digest(Path(p)) == digest for p, digest in cached.get("outputs", {}).items())
+        ):
+            entry.update(status="cached", seconds=round(time.perf_counter() - started, 6))
+            return entry, cached
+        try:
+            step.fn()
+        except Exception as e:  # noqa: BLE001
+            logger.exception("Pipeline step %s failed", step.name)
+            entry.update(status="failed", error=f"{type(e).__name__}: {e}", seconds=round(time.perf_counter() - started, 6))
+            return entry, None
+        entry.update(status="ran", seconds=round(time.perf_counter() - started, 6))
+        if not cacheable:
+            return entry, None
+        return entry, {"inputs": fingerprints, "outputs": {_key(p): file_digest(p) for p in step.outputs}}
+
+    def run(self, force: bool = False) -> Dict[str, Any]:
+        """
+        すべてのステップを依存順に実行し、実行の報告を返す（force なら入力が同じでも実行する）。
+
+        失敗したステップに依存するステップは実行せず skipped にする。
+        """
+        started = time.perf_counter()
+        cache = self._load_cache()
+        results: Dict[str, Dict[str, Any]] = {}
+        remaining = list(self.order)
+        running: Dict[Future, str] = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="dag") as pool:
+            while remaining or running:
+                for name in list(remaining):
+                    step = self.steps[name]
+                    if any(dep not in results for dep in step.deps):
+                        continue
+                    remaining.remove(name)
+                    failed = [dep for dep in step.deps if results[dep]["status"] in ("failed", "skipped")]
+                    if failed:
+                        results[name] = {"step": name, "status": "skipped", "seconds": 0.0, "blocked_by": failed}
+                        continue
+                    running[pool.submit(self._execute, step, cache.get(name), force)] = name
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    entry, cache_entry = future.result()
+                    results[name] = entry
+                    logger.info(json.dumps({"event": "step", **entry}, ensure_ascii=False))
+                    if cache_entry is not None:
+                        cache[name] = cache_entry
+                    elif entry["status"] == "failed":
+                        cache.pop(name, None)
+        self._save_cache(cache)
+        report = {
+            "event": "dag",
+            "seconds": round(time.perf_counter() - started, 6),
+            "ok": all(r["status"] in ("ran", "cached") for r in results.values()),
+            "cache_hits": sum(1 for r in results.values() if r["status"] == "cached"),
+            "ran": sum(1 for r in results.values() if r["status"] == "ran"),
+            "steps": {name: results[name] for name in self.order},
+        }
+        logger.info(json.dumps(report, ensure_ascii=False))
+        return report
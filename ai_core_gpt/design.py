@@ -1,16 +1,21 @@
 from __future__ import annotations
 # gpt_design.py — Hallucination-Resistant GPT Design (self-contained)
-import json, re, logging, uuid
-from dataclasses import dataclass
+import json, logging, uuid
+from dataclasses import dataclass, field
 from pathlib import Path
 from datetime import datetime, timezone
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from ai_core_gpt.lexicon import LexiconHits, default_classifier, default_matcher, match_intent
+from ai_core_gpt.particle import Particle
+from ai_core_gpt.response_cache import REUSE_REFERENCE, ResponseCache, cache_key
+from ai_core_gpt.scoring import score_batch, score_reliability
 
 logging.basicConfig(level=logging.INFO, format="[%(levelname)s] %(message)s")
 
 # ---- Optional imports with graceful fallbacks --------------------------------
 try:
-    from gpts.meta_sync import policy_from_summary_meta  # if our earlier file exists
+    from gpts.meta_sync import current_policy, policy_from_summary_meta  # if our earlier file exists
 except Exception:
     @dataclass
     class _FallbackPolicy:
@@ -24,6 +29,7 @@ except Exception:
         diagnostic: str = "meta_sync not found; using defaults"
     def policy_from_summary_meta(_: Optional[Path] = None):
         return _FallbackPolicy()
+    current_policy = policy_from_summary_meta
 
 try:
     # particle exporter, if present, will persist JSON particles to /particles/...
@@ -31,49 +37,28 @@ try:
 except Exception:
     export_particle = None
 
-# ---- Reliability scoring (fallback mirrors earlier policy) -------------------
-def _score_reliability(text: str, has_evidence: bool, true_intent_clear: bool, contradiction: bool, threshold: float) -> Dict[str, Any]:
-    weights = {
-        "no_emotional": 0.15, "no_speculation": 0.15, "has_evidence": 0.20,
-        "clear_intent": 0.15, "length_ok": 0.10, "no_contradiction": 0.25,
-    }
-    penalties = {"emotional": -0.10, "missing_evidence": -0.15, "contradiction": -0.20, "true_intent_bonus": +0.10}
-    score = 0.0; bonus = {}; malus = {}
-    if not re.search(r"おそらく|たぶん|と思われ|感じ|hope|maybe|probably", text): score += weights["no_emotional"]; bonus["no_emotional"]=weights["no_emotional"]
-    else: malus["emotional"]=penalties["emotional"]
-    if not re.search(r"推測|予想|かもしれ|guess|speculat", text): score += weights["no_speculation"]; bonus["no_speculation"]=weights["no_speculation"]
-    if has_evidence: score += weights["has_evidence"]; bonus["has_evidence"]=weights["has_evidence"]
-    else: malus["missing_evidence"]=penalties["missing_evidence"]
-    if true_intent_clear: score += (weights["clear_intent"]+penalties["true_intent_bonus"]); bonus["clear_intent"]=weights["clear_intent"]+penalties["true_intent_bonus"]
-    if len(text) > 10: score += weights["length_ok"]; bonus["length_ok"]=weights["length_ok"]
-    if not contradiction: score += weights["no_contradiction"]; bonus["no_contradiction"]=weights["no_contradiction"]
-    else: malus["contradiction"]=penalties["contradiction"]
-    score = round(max(min(score + sum(malus.values()), 1.0), 0.0), 3)
-    status = "promoted" if score >= threshold else "record_only"
-    return {"score": score, "status": status, "bonuses": bonus, "penalties": malus}
+# ---- Reliability scoring (shared with ai_core_gpt.scoring) -------------------
+def _score_reliability(text: str, has_evidence: bool, true_intent_clear: bool, contradiction: bool, threshold: float, hits: Optional[LexiconHits] = None) -> Dict[str, Any]:
+    # 語彙はコンパイル済みのものを共有する。大量件数は score_batch() を使う
+    return score_reliability(text, has_evidence, true_intent_clear, contradiction, threshold, hits=hits)
 
 # ---- Intent parsing (True Intent) --------------------------------------------
-def _parse_true_intent(user_text: str) -> Dict[str, str]:
-    categories = [
-        ("Operational Automation", r"(自動|定期|スケジュール|毎|周期)"),
-        ("Evidence Integration",   r"(URL|https?://|値|データ|根拠|出典|証拠)"),
-        ("Reliability Framework",  r"(信頼度|スコア|評価基準|threshold|Reliability)"),
-        ("Meta Evaluation",        r"(EVAL|自己検証|meta|評価結果|再採点)"),
-    ]
-    for name, pat in categories:
-        if re.search(pat, user_text, re.IGNORECASE):
-            return {"Category": name, "Details": user_text[:240]}
-    return {"Category": "General Reflection", "Details": user_text[:240]}
+def _parse_true_intent(user_text: str, hits: Optional[LexiconHits] = None) -> Dict[str, str]:
+    # カテゴリ語彙は ai_core_gpt.lexicon.INTENT_CATEGORIES（判定順もそこで定義）と meta/category_taxonomy.json
+    match = default_classifier().classify(user_text) if hits is None else match_intent(hits)
+    return {"Category": match.category, "Details": user_text[:240]}
 
 # ---- GPT Design class --------------------------------------------------------
 @dataclass
 class GPTDesign:
     threshold: float
     require_evidence: bool
+    # 繰り返し届くプロンプト向けの応答キャッシュ（既定は無効。ai_core_gpt.response_cache を参照）
+    cache: Optional[ResponseCache] = field(default=None, repr=False, compare=False)
 
-    def generate(self, prompt: str, evidence: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-        """Gate output by reliability; demand evidence if policy says so."""
-        true_intent = _parse_true_intent(prompt)
+    def _plan(self, prompt: str, evidence: Optional[Dict[str, Any]], hits: LexiconHits) -> Tuple[Dict[str, str], Dict[str, Any], str, bool, bool]:
+        """Intent, reply and scoring inputs (text, has_evidence, whether text is the prompt-derived answer)."""
+        true_intent = _parse_true_intent(prompt, hits=hits)
         has_evidence = evidence is not None and len(evidence) > 0
         # If policy requires evidence but none provided, mark as record_only and respond with request.
         if self.require_evidence and not has_evidence:
@@ -81,43 +66,150 @@ class GPTDesign:
                 "answer": "根拠（URLや数値データ）を提示してください。ポリシー上、根拠不在の回答は抑止されます。",
                 "needed": ["evidence_url_or_numeric_data"],
             }
-            evalr = _score_reliability("Requesting evidence", has_evidence=False, true_intent_clear=True, contradiction=False, threshold=self.threshold)
-        else:
-            # Minimal “deterministic” answer sketch (実際の生成器は別途接続)
-            reply = {
-                "answer": f"要点: {prompt[:120]}",
-                "evidence_used": bool(has_evidence),
-                "intent": true_intent["Category"],
-            }
-            evalr = _score_reliability(reply["answer"], has_evidence=has_evidence, true_intent_clear=True, contradiction=False, threshold=self.threshold)
-
-        particle = {
-            "Commit ID": str(uuid.uuid4()),
-            "Parent Commit": "gpt_design",
-            "True Intent": true_intent,
-            "Reliability Score": evalr["score"],
-            "Raw Text": reply["answer"],
-            "Context ID": f"CTX_{datetime.now(timezone.utc).strftime('%Y%m%d%H%M%S')}",
-            "Processing Outcome": evalr["status"],
-            "Evidence Sources": [] if not evidence else [evidence.get("source","user")],
-            "Reviewer": "gpt-design",
-            "Score History": [{"version":"DESIGN-1.0","score":evalr["score"],"timestamp":datetime.now(timezone.utc).isoformat()}],
-            "Conflict Status": "pending",
+            return true_intent, reply, "Requesting evidence", False, False
+        # Minimal “deterministic” answer sketch (実際の生成器は別途接続)
+        reply = {
+            "answer": f"要点: {prompt[:120]}",
+            "evidence_used": bool(has_evidence),
+            "intent": true_intent["Category"],
         }
-        return {"reply": reply, "evaluation": evalr, "particle": particle}
+        return true_intent, reply, reply["answer"], has_evidence, True
+
+    def _result(self, evidence: Optional[Dict[str, Any]], true_intent: Dict[str, str], reply: Dict[str, Any], evalr: Dict[str, Any], hits: LexiconHits, now: Optional[datetime] = None) -> Dict[str, Any]:
+        now = now or datetime.now(timezone.utc)
+        particle = Particle(
+            **self._identity(evalr["score"], now),
+            score=evalr["score"],
+            status=evalr["status"],
+            intent_category=true_intent["Category"],
+            intent_details=true_intent["Details"],
+            parent_commit="gpt_design",
+            reviewer="gpt-design",
+            raw_text=reply["answer"],
+            evidence_sources=[] if not evidence else [evidence.get("source","user")],
+            conflict_status="pending",
+        )
+        # API / CLI の応答と export_particle() には V1 の JSON 形で渡す
+        return {"reply": reply, "evaluation": evalr, "particle": particle.to_v1_dict(), "lexicon_hits": hits.phrases()}
+
+    @staticmethod
+    def _identity(score: float, now: datetime) -> Dict[str, Any]:
+        """粒子ごとに変わる項目（Commit ID / Context ID / Score History）。"""
+        return {
+            "commit_id": str(uuid.uuid4()),
+            "context_id": f"CTX_{now.strftime('%Y%m%d%H%M%S')}",
+            "score_history": [{"version":"DESIGN-1.0","score":score,"timestamp":now.isoformat()}],
+        }
+
+    def _cache_key(self, prompt: str, evidence: Optional[Dict[str, Any]]) -> str:
+        return cache_key(prompt, evidence, self.threshold, self.require_evidence)
+
+    def _from_cache(self, result: Dict[str, Any], age: float, ref: Optional[str], now: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        キャッシュした結果（ResponseCache.get() が返した浅いコピー）を返す。
+
+        reuse="reference" で最初の粒子の保存先（ref）が記録済みならそれを指し、
+        それ以外は粒子だけ新しい Commit ID などで作り直す。
+        """
+        if self.cache.reuse == REUSE_REFERENCE and ref is not None:
+            result["cache"] = {"hit": True, "age": round(age, 3), "ref": ref}
+            return result
+        particle = Particle.from_v1_dict(result["particle"])
+        for name, value in self._identity(particle.score, now or datetime.now(timezone.utc)).items():
+            setattr(particle, name, value)
+        result["particle"] = particle.to_v1_dict()
+        result["cache"] = {"hit": True, "age": round(age, 3)}
+        return result
+
+    def record_persisted(self, prompt: str, evidence: Optional[Dict[str, Any]], commit_id: str) -> None:
+        """
+        generate() の粒子を保存した Commit ID をキャッシュに記録する。
+
+        reuse="reference" のヒットは、これを "cache": {"ref": ...} で返す（記録前のヒットは新しい粒子を作る）。
+        """
+        if self.cache is not None:
+            self.cache.set_ref(self._cache_key(prompt, evidence), commit_id)
+
+    def generate(self, prompt: str, evidence: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Gate output by reliability; demand evidence if policy says so."""
+        if self.cache is None:
+            return self._generate(prompt, evidence)
+        key = self._cache_key(prompt, evidence)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return self._from_cache(*cached)
+        result = self._generate(prompt, evidence)
+        self.cache.put(key, result)
+        result["cache"] = {"hit": False}
+        return result
+
+    def _generate(self, prompt: str, evidence: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        # プロンプトは 1 回だけ走査し、意図推定・採点・禁止表現チェックで共有する
+        hits = default_matcher().scan(prompt)
+        true_intent, reply, text, has_evidence, answered = self._plan(prompt, evidence, hits)
+        # 回答は固定の接頭辞 + prompt[:120] なので、プロンプトの走査結果を切り出して再利用する
+        text_hits = hits.within(0, 120) if answered else None
+        evalr = _score_reliability(text, has_evidence=has_evidence, true_intent_clear=True, contradiction=False, threshold=self.threshold, hits=text_hits)
+        return self._result(evidence, true_intent, reply, evalr, hits)
+
+    def generate_many(self, prompts: Sequence[str], evidences: Optional[Sequence[Optional[Dict[str, Any]]]] = None) -> List[Dict[str, Any]]:
+        """
+        generate() の一括版。結果は prompts と同じ順で、各要素は generate() と同じ形・同じ採点結果。
+
+        採点は score_batch() の 1 回の列演算にまとめ、粒子のタイムスタンプはバッチで共有する。
+        キャッシュがあれば、ヒットしなかったプロンプトだけをまとめて処理する。
+        """
+        evidences = list(evidences) if evidences is not None else [None] * len(prompts)
+        if self.cache is None:
+            return self._generate_many(prompts, evidences)
+        keys = [self._cache_key(p, e) for p, e in zip(prompts, evidences)]
+        results: List[Optional[Dict[str, Any]]] = [None] * len(prompts)
+        misses: List[int] = []
+        now = datetime.now(timezone.utc)
+        for i, key in enumerate(keys):
+            cached = self.cache.get(key)
+            if cached is None:
+                misses.append(i)
+            else:
+                results[i] = self._from_cache(*cached, now=now)
+        fresh = self._generate_many([prompts[i] for i in misses], [evidences[i] for i in misses])
+        for i, result in zip(misses, fresh):
+            self.cache.put(keys[i], result)
+            result["cache"] = {"hit": False}
+            results[i] = result
+        return results  # type: ignore[return-value]
+
+    def _generate_many(self, prompts: Sequence[str], evidences: Sequence[Optional[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        matcher = default_matcher()
+        hits_list = [matcher.scan(p) for p in prompts]
+        plans = [self._plan(p, e, h) for p, e, h in zip(prompts, evidences, hits_list)]
+        evaluations = score_batch(
+            [text for _, _, text, _, _ in plans],
+            has_evidence=[has_evidence for _, _, _, has_evidence, _ in plans],
+            true_intent_clear=True,
+            contradiction=False,
+            threshold=self.threshold,
+        ).rows()
+        now = datetime.now(timezone.utc)
+        return [
+            self._result(e, true_intent, reply, evalr, h, now)
+            for (true_intent, reply, _, _, _), e, h, evalr in zip(plans, evidences, hits_list, evaluations)
+        ]
 
 # ---- Runner ------------------------------------------------------------------
-def main():
-    policy = policy_from_summary_meta()
-    logging.info(f"Policy: mode={getattr(policy,'mode','balanced')} threshold={getattr(policy,'threshold',0.90)} require_evidence={getattr(policy,'require_evidence',False)}")
-    gpt = GPTDesign(threshold=getattr(policy,"threshold",0.90), require_evidence=getattr(policy,"require_evidence",False))
+def main(gpt: Optional[GPTDesign] = None):
+    # 常駐ランナーからは構築済みの GPTDesign を渡してポリシーの再読み込みを省く
+    if gpt is None:
+        policy = current_policy()
+        logging.info(f"Policy: mode={getattr(policy,'mode','balanced')} threshold={getattr(policy,'threshold',0.90)} require_evidence={getattr(policy,'require_evidence',False)}")
+        gpt = GPTDesign(threshold=getattr(policy,"threshold",0.90), require_evidence=getattr(policy,"require_evidence",False))
 
     # Demo 1: 根拠なし（policyが厳密なら抑止される）
     demo1 = gpt.generate("信頼度スコアの計算方針を教えて")
     # Demo 2: 根拠あり
     demo2 = gpt.generate("最新の評価手順を要約して（Reliability Framework）", evidence={"source":"meta/summary_meta.json"})
 
-    # 可能なら粒子として保存
+    # 可能なら粒子として保存（デモは毎サイクル同じ内容なので、既にあれば書き出さない）
     saved_paths = []
     if export_particle:
         for px in (demo1["particle"], demo2["particle"]):
@@ -127,6 +219,7 @@ def main():
                 true_intent=px["True Intent"],
                 evidence_sources=px["Evidence Sources"],
                 parent_commit=px["Parent Commit"],
+                dedupe=True,
             )
             saved_paths.append(str(p))
         logging.info(f"Particles saved: {saved_paths}")
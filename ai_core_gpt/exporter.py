@@ -9,7 +9,6 @@ downstream analysis modules.
 """
 
 import json
-import re
 import uuid
 import logging
 from dataclasses import dataclass
@@ -32,6 +31,8 @@ PARTICLE_DIR = Path("particles")
 try:
     from reliability_evaluator import compute_reliability_score  # type: ignore
 except ModuleNotFoundError:
+    from ai_core_gpt.scoring import EMOTIONAL_PATTERN, SPECULATION_PATTERN
+
     @dataclass
     class _EvalResult:
         score: float
@@ -66,13 +67,13 @@ except ModuleNotFoundError:
         bonuses: Dict[str, float] = {}
         penalties: Dict[str, float] = {}
 
-        if not re.search(r"おそらく|たぶん|と思われ|感じ|hope|maybe|probably", text):
+        if not EMOTIONAL_PATTERN.search(text):
             score += _DEFAULT_WEIGHTS["no_emotional"]
             bonuses["no_emotional"] = _DEFAULT_WEIGHTS["no_emotional"]
         else:
             penalties["emotional"] = _META_PENALTIES["emotional"]
 
-        if not re.search(r"推測|予想|かもしれ|guess|speculat", text):
+        if not SPECULATION_PATTERN.search(text):
             score += _DEFAULT_WEIGHTS["no_speculation"]
             bonuses["no_speculation"] = _DEFAULT_WEIGHTS["no_speculation"]
 
@@ -0,0 +1,337 @@
+from __future__ import annotations
+"""
+lexicon.py
+
+採点・意図推定・禁止表現チェックで使う語彙をまとめて 1 回で走査するマッチャ。
+
+全語彙のフレーズを小文字化したキーワードトライから 1 本のパターンにコンパイルし、各位置で最長一致した
+フレーズから「同じ位置から始まる短いフレーズ（接頭辞）」も展開することで、
+重なり合うヒットも取りこぼさずに語彙ごとのヒット一覧を返す
+（Aho–Corasick と同じ出力を、走査自体は re の C 実装で 1 回だけ行う）。
+
+True Intent の判定は IntentClassifier（意図語彙と meta/category_taxonomy.json だけのマッチャ）か、
+共有の走査結果に対する match_intent() で行う。タクソノミーの英数字キーワードは単語の境界でだけ一致させる
+（"doi" は "doing" に、"score" は "underscore" に一致しない）。日本語などのキーワードは部分一致のまま。default_matcher() / default_classifier() は
+meta/ の語彙ファイルが変わると自動でコンパイルし直す。
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+META_DIR = Path("meta")
+
+EMOTIONAL = "emotional"
+SPECULATION = "speculation"
+PROHIBITED = "prohibited"
+INTENT_PREFIX = "intent:"
+TAXONOMY_PREFIX = "taxonomy:"
+
+EMOTIONAL_PHRASES = ("おそらく", "たぶん", "と思われ", "感じ", "hope", "maybe", "probably")
+SPECULATION_PHRASES = ("推測", "予想", "かもしれ", "guess", "speculat")
+
+# _parse_true_intent の判定順（先にヒットしたカテゴリを採用する）
+INTENT_CATEGORIES: Tuple[Tuple[str, Tuple[str, ...]], ...] = (
+    ("Operational Automation", ("自動", "定期", "スケジュール", "毎", "周期")),
+    ("Evidence Integration", ("URL", "http://", "https://", "値", "データ", "根拠", "出典", "証拠")),
+    ("Reliability Framework", ("信頼度", "スコア", "評価基準", "threshold", "Reliability")),
+    ("Meta Evaluation", ("EVAL", "自己検証", "meta", "評価結果", "再採点")),
+)
+DEFAULT_INTENT = "General Reflection"
+# タクソノミーだけでカテゴリを決めるのに必要な、異なるキーワードの数
+TAXONOMY_MIN_KEYWORDS = 2
+
+# 語彙ファイルの変更を確かめる間隔（秒）。gpts.meta_sync.CHECK_INTERVAL と同じ考え方
+CHECK_INTERVAL = 1.0
+
+
+@dataclass
+class Lexicon:
+    name: str
+    phrases: Tuple[str, ...]
+    ignore_case: bool = False
+    # True なら ASCII のフレーズは前後が英数字・_ でないときだけ一致させる（正規表現の \b と同じ）
+    word_boundary: bool = False
+
+
+@dataclass
+class LexiconHits:
+    """語彙名 → [(開始位置, フレーズ), ...] の走査結果。"""
+
+    matches: Dict[str, List[Tuple[int, str]]] = field(default_factory=dict)
+
+    def has(self, lexicon: str) -> bool:
+        return bool(self.matches.get(lexicon))
+
+    def within(self, start: int, end: int) -> "LexiconHits":
+        """text[start:end] に完全に収まるヒットだけを、切り出し後の位置で返す。"""
+        out: Dict[str, List[Tuple[int, str]]] = {}
+        for name, hits in self.matches.items():
+            kept = [(pos - start, phrase) for pos, phrase in hits if pos >= start and pos + len(phrase) <= end]
+            if kept:
+                out[name] = kept
+        return LexiconHits(out)
+
+    def phrases(self, prefix: str = "") -> Dict[str, List[str]]:
+        """語彙名ごとのヒットフレーズ（重複除去・出現順）。"""
+        return {
+            name: list(dict.fromkeys(phrase for _, phrase in hits))
+            for name, hits in self.matches.items()
+            if name.startswith(prefix)
+        }
+
+
+class LexiconMatcher:
+    """複数語彙を 1 回の走査で照合するコンパイル済みマッチャ。"""
+
+    def __init__(self, lexicons: Iterable[Lexicon]):
+        self.lexicons = [lx for lx in lexicons if lx.phrases]
+        entries: Dict[str, List[Tuple[str, bool, bool]]] = {}
+        for lx in self.lexicons:
+            for phrase in lx.phrases:
+                if phrase:
+                    bounded = lx.word_boundary and phrase.isascii()
+                    entries.setdefault(phrase, []).append((lx.name, lx.ignore_case, bounded))
+
+        # 小文字化したテキストに対して走査する。最長一致を優先するため長い順に並べ、
+        # 同じ位置から始まる短いフレーズは _expansions で補う
+        self._phrases: List[str] = sorted({p.lower() for p in entries}, key=lambda p: (-len(p), p))
+        self._expansions: Dict[str, List[Tuple[str, str, bool, bool]]] = {
+            head: [
+                (name, phrase, ignore_case, bounded)
+                for phrase, owners in entries.items()
+                if head.startswith(phrase.lower())
+                for name, ignore_case, bounded in owners
+            ]
+            for head in self._phrases
+        }
+        self._pattern = re.compile(_trie_pattern(self._phrases)) if self._phrases else None
+
+    def scan(self, text: str) -> LexiconHits:
+        hits: Dict[str, List[Tuple[int, str]]] = {}
+        if self._pattern is None:
+            return LexiconHits(hits)
+        lowered = text.lower()
+        if len(lowered) != len(text):
+            # 小文字化で長さが変わる文字（"İ" など）は位置がずれないようそのまま残す
+            lowered = "".join(c if len(c.lower()) != 1 else c.lower() for c in text)
+        search = self._pattern.search
+        m = search(lowered)
+        while m is not None:
+            pos = m.start()
+            for name, phrase, ignore_case, bounded in self._expansions[m.group()]:
+                # 大文字小文字を区別する語彙は原文と完全一致するものだけ数える
+                if not (ignore_case or text.startswith(phrase, pos)):
+                    continue
+                if bounded and not _at_word_boundary(lowered, pos, pos + len(phrase)):
+                    continue
+                hits.setdefault(name, []).append((pos, phrase))
+            # 重なり合うヒットも拾うため、次の走査は 1 文字先から再開する
+            m = search(lowered, pos + 1)
+        return LexiconHits(hits)
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isascii() and (ch.isalnum() or ch == "_")
+
+
+def _at_word_boundary(text: str, start: int, end: int) -> bool:
+    """text[start:end] の前後が単語の境界か（フレーズの端が英数字でない側は問わない）。"""
+    if _is_word_char(text[start]) and start > 0 and _is_word_char(text[start - 1]):
+        return False
+    if _is_word_char(text[end - 1]) and end < len(text) and _is_word_char(text[end]):
+        return False
+    return True
+
+
+def _trie_pattern(phrases: Iterable[str]) -> str:
+    """
+    フレーズ集合をキーワードトライにして正規表現にする（"ab", "abc", "ad" → "a(?:b(?:c)?|d)"）。
+
+    各位置での一致は長い順に並べた選択パターンと同じ最長一致になり、共通の接頭辞を
+    1 度しか照合しないぶん語彙が多いときの走査が速い。
+    """
+    trie: Dict[str, dict] = {}
+    for phrase in phrases:
+        node = trie
+        for ch in phrase:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node: Dict[str, dict]) -> str:
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        terminal = "" in node
+        if len(branches) == 1 and not terminal:
+            return branches[0]
+        group = "(?:" + "|".join(branches) + ")"
+        # 途中で終わるフレーズがあれば残りは省略可能にする（貪欲なので長い方が先に試される）
+        return group + "?" if terminal else group
+
+    return build(trie)
+
+
+def load_prohibited_phrases(path: Path) -> Tuple[str, ...]:
+    if not path.exists():
+        return ()
+    lines = path.read_text(encoding="utf-8").splitlines()
+    return tuple(s for s in (line.strip() for line in lines) if s and not s.startswith("#"))
+
+
+def load_taxonomy(path: Path) -> Dict[str, Tuple[str, ...]]:
+    if not path.exists():
+        return {}
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except Exception as e:
+        logger.warning("Failed to load %s: %s", path, e)
+        return {}
+    return {str(cat): tuple(str(k) for k in (kws or [])) for cat, kws in data.items()}
+
+
+def default_lexicons(meta_dir: Optional[Path] = None) -> List[Lexicon]:
+    """スコアリング・意図推定の組み込み語彙と meta/ の語彙ファイルを合わせた一覧。"""
+    meta = meta_dir or META_DIR
+    lexicons = [
+        Lexicon(EMOTIONAL, EMOTIONAL_PHRASES),
+        Lexicon(SPECULATION, SPECULATION_PHRASES),
+        Lexicon(PROHIBITED, load_prohibited_phrases(meta / "prohibited_phrases.txt"), ignore_case=True),
+    ]
+    lexicons += [Lexicon(INTENT_PREFIX + name, phrases, ignore_case=True) for name, phrases in INTENT_CATEGORIES]
+    lexicons += [
+        Lexicon(TAXONOMY_PREFIX + cat, kws, ignore_case=True, word_boundary=True)
+        for cat, kws in load_taxonomy(meta / "category_taxonomy.json").items()
+    ]
+    return lexicons
+
+
+def intent_lexicons(meta_dir: Optional[Path] = None) -> List[Lexicon]:
+    """True Intent の判定に使う語彙（組み込みのカテゴリ語彙と meta/category_taxonomy.json）だけの一覧。"""
+    meta = meta_dir or META_DIR
+    return [lx for lx in default_lexicons(meta) if lx.name.startswith((INTENT_PREFIX, TAXONOMY_PREFIX))]
+
+
+@dataclass
+class IntentMatch:
+    """判定したカテゴリと、カテゴリごとのヒット数（組み込み語彙とタクソノミーの合計）。"""
+
+    category: str
+    scores: Dict[str, int] = field(default_factory=dict)
+
+
+def match_intent(hits: LexiconHits, categories: Sequence[Tuple[str, Tuple[str, ...]]] = INTENT_CATEGORIES) -> IntentMatch:
+    """
+    走査結果から True Intent を決める。
+
+    1. 組み込みのカテゴリ語彙（INTENT_CATEGORIES）は従来どおり判定順で最初にヒットしたものを採用する
+    2. どれもヒットしなければ、meta/category_taxonomy.json の異なるキーワードが TAXONOMY_MIN_KEYWORDS 個以上
+       ヒットしたカテゴリのうち、ヒット数が最も多いもの（同数なら先に現れた方）。
+       "I like the trend" のように一般的な英単語が 1 つあるだけでは決めない
+    3. それも無ければ DEFAULT_INTENT
+    """
+    scores: Dict[str, int] = {}
+    first_seen: Dict[str, int] = {}
+    for name, found in hits.matches.items():
+        if name.startswith(INTENT_PREFIX):
+            category = name[len(INTENT_PREFIX):]
+        elif name.startswith(TAXONOMY_PREFIX):
+            category = name[len(TAXONOMY_PREFIX):]
+        else:
+            continue
+        scores[category] = scores.get(category, 0) + len(found)
+        if name.startswith(TAXONOMY_PREFIX) and len({p.lower() for _, p in found}) >= TAXONOMY_MIN_KEYWORDS:
+            first_seen[category] = min(first_seen.get(category, found[0][0]), found[0][0])
+
+    for name, _ in categories:
+        if hits.has(INTENT_PREFIX + name):
+            return IntentMatch(name, scores)
+    if first_seen:
+        best = min(first_seen, key=lambda cat: (-len(hits.matches[TAXONOMY_PREFIX + cat]), first_seen[cat]))
+        return IntentMatch(best, scores)
+    return IntentMatch(DEFAULT_INTENT, scores)
+
+
+def classify_intent(hits: LexiconHits, categories: Sequence[Tuple[str, Tuple[str, ...]]] = INTENT_CATEGORIES) -> str:
+    """match_intent() のカテゴリ名だけを返す。"""
+    return match_intent(hits, categories).category
+
+
+class IntentClassifier:
+    """意図語彙だけをコンパイルしたマッチャで、1 回の走査からカテゴリとスコアを返す。"""
+
+    def __init__(self, lexicons: Iterable[Lexicon]):
+        self.matcher = LexiconMatcher(lexicons)
+
+    def classify(self, text: str) -> IntentMatch:
+        return match_intent(self.matcher.scan(text))
+
+
+def _source_key(paths: Sequence[Path]) -> Tuple[Optional[Tuple[int, int, int]], ...]:
+    keys = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except OSError:
+            keys.append(None)
+        else:
+            keys.append((st.st_ino, st.st_mtime_ns, st.st_size))
+    return tuple(keys)
+
+
+class _Compiled:
+    """meta/ の語彙ファイルから作ったオブジェクトを、ファイルが変わったときだけ作り直すキャッシュ。"""
+
+    def __init__(self, meta_dir: Path, build, check_interval: float = CHECK_INTERVAL):
+        self.sources = (meta_dir / "prohibited_phrases.txt", meta_dir / "category_taxonomy.json")
+        self.meta_dir = meta_dir
+        self.build = build
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._value = None
+        self._key: Tuple[Optional[Tuple[int, int, int]], ...] = ()
+        self._checked = 0.0
+
+    def get(self):
+        now = time.monotonic()
+        if self._value is not None and now - self._checked < self.check_interval:
+            return self._value
+        with self._lock:
+            key = _source_key(self.sources)
+            if self._value is None or key != self._key:
+                if self._value is not None:
+                    logger.info("Lexicon files in %s changed; recompiling", self.meta_dir)
+                self._value = self.build(self.meta_dir)
+                self._key = key
+            self._checked = now
+            return self._value
+
+
+_DEFAULT_MATCHERS: Dict[Path, _Compiled] = {}
+_DEFAULT_CLASSIFIERS: Dict[Path, _Compiled] = {}
+
+
+def default_matcher(meta_dir: Optional[Path] = None) -> LexiconMatcher:
+    """default_lexicons() から作ったマッチャ（meta ディレクトリ単位で共有し、語彙ファイルが変われば作り直す）。"""
+    key = meta_dir or META_DIR
+    compiled = _DEFAULT_MATCHERS.get(key)
+    if compiled is None:
+        compiled = _DEFAULT_MATCHERS.setdefault(key, _Compiled(key, lambda meta: LexiconMatcher(default_lexicons(meta))))
+    return compiled.get()
+
+
+def default_classifier(meta_dir: Optional[Path] = None) -> IntentClassifier:
+    """intent_lexicons() から作った IntentClassifier（default_matcher() と同じく変更時に作り直す）。"""
+    key = meta_dir or META_DIR
+    compiled = _DEFAULT_CLASSIFIERS.get(key)
+    if compiled is None:
+        compiled = _DEFAULT_CLASSIFIERS.setdefault(key, _Compiled(key, lambda meta: IntentClassifier(intent_lexicons(meta))))
+    return compiled.get()
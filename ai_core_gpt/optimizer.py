@@ -2,6 +2,8 @@ import json
 from pathlib import Path
 from statistics import mean
 
+from ai_core_gpt.store import open_store
+
 # optimizer.py
 # Purpose: Analyze particle data and integration report to derive
 # optimization recommendations for GPT output reliability.
@@ -16,14 +18,9 @@ def load_report() -> dict:
     return {}
 
 def analyze_particles() -> list[float]:
-    scores = []
-    for p in PARTICLE_DIR.rglob("*.json"):
-        try:
-            data = json.loads(p.read_text(encoding="utf-8"))
-            scores.append(data.get("Reliability Score", 0))
-        except Exception:
-            continue
-    return scores
+    store = open_store(PARTICLE_DIR)
+    store.sync()
+    return [p.score for p in store.iter_records()]
 
 def derive_recommendations(avg_score: float) -> list[str]:
     recs = []
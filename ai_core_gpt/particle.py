@@ -0,0 +1,189 @@
+from __future__ import annotations
+"""
+particle.py
+
+粒子 1 件を表すレコード型（Particle）と、V1 粒子 JSON との相互変換。
+
+粒子 JSON のキーは "Reliability Score" / "True Intent" のような空白入りの名前で、
+旧形式（particle_id + evaluation + true_intent + text）も残っている。集計系は
+from_v1_dict() で一度だけ Particle に直し、以降は属性（p.score / p.intent_category）で読む。
+
+Particle は __slots__ 付きの dataclass なので、1 件あたりのメモリは同じ項目を持つ dict の
+数分の 1 で済む（benchmarks/bench_particle_memory.py で 100 万件あたりの使用量を比べられる）。
+"""
+
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+UNKNOWN_MONTH = "unknown"
+
+
+def content_hash(raw: Dict[str, Any]) -> Optional[str]:
+    """
+    V1 粒子の意味的な内容（Raw Text / True Intent / Reliability Score / Evidence Sources）の sha256。
+
+    Commit ID・Context ID・タイムスタンプは含めないので、同じ入力から作り直した粒子は同じ値になる。V1 以外は None。
+    """
+    if "Reliability Score" not in raw:
+        return None
+    intent = raw.get("True Intent") or {}
+    key = [
+        str(raw.get("Raw Text", "")),
+        str(intent.get("Category", "")),
+        str(intent.get("Details", "")),
+        round(float(raw.get("Reliability Score", 0.0)), 6),
+        sorted(json.dumps(e, ensure_ascii=False, sort_keys=True) for e in raw.get("Evidence Sources") or []),
+    ]
+    return hashlib.sha256(json.dumps(key, ensure_ascii=False, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+
+@dataclass(slots=True)
+class Particle:
+    """
+    正規化済みの粒子。
+
+    - commit_id 〜 content_hash: 集計とインデックスが使う項目（ParticleStore の列と同じ）
+    - raw_text 〜 conflict_status: V1 の本文。インデックスから読んだレコードでは None
+      （全体は ParticleStore.load() で読み直す）
+    - path / name / offset / length / seq: 置き場所（セグメント内なら offset >= 0）とインデックスの登録順
+    """
+
+    commit_id: str
+    score: float = 0.0
+    status: str = "record_only"
+    intent_category: str = "Unknown"
+    intent_details: str = ""
+    parent_commit: Optional[str] = None
+    created_at: Optional[str] = None
+    reviewer: Optional[str] = None
+    content_hash: Optional[str] = None
+    raw_text: Optional[str] = None
+    context_id: Optional[str] = None
+    evidence_sources: Optional[List[Any]] = None
+    score_history: Optional[List[Dict[str, Any]]] = None
+    conflict_status: Optional[str] = None
+    path: str = ""
+    name: str = ""
+    offset: int = -1
+    length: int = -1
+    seq: int = 0
+
+    @classmethod
+    def from_v1_dict(cls, raw: Dict[str, Any], path: Optional[Path] = None) -> "Particle":
+        """
+        粒子 JSON を Particle にする。
+
+        実際のファイルから確認できた形式をカバー：
+        - V1 スキーマ（"Commit ID", "Reliability Score", "Processing Outcome", "True Intent" など）
+        - 旧形式（particle_id + evaluation + true_intent + text）
+        それ以外は最低限の情報だけ残す。Commit ID が無ければ path のファイル名を使う。
+        """
+        stem = path.stem if path is not None else ""
+        where = {"path": str(path), "name": path.name} if path is not None else {}
+
+        # V1 スキーマ（今回のセッションで生成された粒子）
+        if "Reliability Score" in raw:
+            true_intent = raw.get("True Intent", {}) or {}
+            history = raw.get("Score History") or []
+            created_at = None
+            if history and isinstance(history, list):
+                ts = history[0].get("timestamp")
+                if isinstance(ts, str):
+                    created_at = ts
+            return cls(
+                commit_id=str(raw.get("Commit ID", stem)),
+                score=float(raw.get("Reliability Score", 0.0)),
+                status=str(raw.get("Processing Outcome", "record_only")),
+                intent_category=str(true_intent.get("Category", "Unknown")),
+                intent_details=str(true_intent.get("Details", "")),
+                parent_commit=raw.get("Parent Commit"),
+                created_at=created_at,
+                reviewer=raw.get("Reviewer"),
+                content_hash=content_hash(raw),
+                raw_text=raw.get("Raw Text"),
+                context_id=raw.get("Context ID"),
+                evidence_sources=raw.get("Evidence Sources"),
+                score_history=history if isinstance(history, list) else None,
+                conflict_status=raw.get("Conflict Status"),
+                **where,
+            )
+
+        # 旧形式（ログに残っている AUTO_1761... など）
+        if "evaluation" in raw and "true_intent" in raw:
+            eval_block = raw.get("evaluation") or {}
+            true_intent = raw.get("true_intent") or {}
+            return cls(
+                commit_id=str(raw.get("particle_id", stem)),
+                score=float(eval_block.get("score", 0.0)),
+                status=str(eval_block.get("status", "record_only")),
+                intent_category=str(true_intent.get("Category", "Unknown")),
+                intent_details=str(true_intent.get("Details", "")),
+                parent_commit=raw.get("parent_commit"),
+                created_at=raw.get("created_at"),
+                reviewer=raw.get("reviewer"),
+                raw_text=raw.get("text"),
+                evidence_sources=raw.get("evidence_sources"),
+                **where,
+            )
+
+        return cls(
+            commit_id=str(raw.get("Commit ID") or raw.get("particle_id") or stem),
+            score=float(raw.get("score", 0.0)),
+            status=str(raw.get("status", "unknown")),
+            intent_category=str(raw.get("intent", "Unknown")),
+            parent_commit=raw.get("Parent Commit") or raw.get("parent_commit"),
+            created_at=raw.get("created_at"),
+            reviewer=raw.get("Reviewer") or raw.get("reviewer"),
+            **where,
+        )
+
+    def to_v1_dict(self) -> Dict[str, Any]:
+        """
+        V1 スキーマの粒子 JSON（キーの並びは particle_exporter.build_particle() と同じ）。
+
+        旧形式から読んだ粒子は created_at を Score History の先頭に入れ、読み直しても同じ値になるようにする。
+        """
+        history = self.score_history
+        if history is None and self.created_at is not None:
+            history = [{"version": "legacy", "score": self.score, "timestamp": self.created_at}]
+        return {
+            "Commit ID": self.commit_id,
+            "Parent Commit": self.parent_commit,
+            "True Intent": {"Category": self.intent_category, "Details": self.intent_details},
+            "Reliability Score": self.score,
+            "Raw Text": self.raw_text or "",
+            "Context ID": self.context_id,
+            "Processing Outcome": self.status,
+            "Evidence Sources": list(self.evidence_sources or []),
+            "Reviewer": self.reviewer,
+            "Score History": [dict(h) for h in history or []],
+            "Conflict Status": self.conflict_status,
+        }
+
+
+def month_of(record: Particle, root: Path) -> str:
+    """
+    粒子の月（YYYY-MM）。列キャッシュやスコアスケッチの月パーティションに使う。
+
+    オフセット付きの created_at は UTC に直した月、オフセット無しは書かれたままの月にする
+    （columns の timestamp 列と同じ扱い）。
+    """
+    created_at = record.created_at
+    if isinstance(created_at, str) and len(created_at) >= 7 and created_at[4] == "-":
+        try:
+            ts = datetime.fromisoformat(created_at.replace("Z", "+00:00"))
+        except ValueError:
+            return created_at[:7]
+        if ts.tzinfo is not None:
+            ts = ts.astimezone(timezone.utc)
+        return f"{ts.year:04d}-{ts.month:02d}"
+    # タイムスタンプの無い粒子は particles/YYYY/MM の配置から決める
+    parts = Path(os.path.relpath(record.path, root)).parts
+    if len(parts) >= 3 and parts[0].isdigit() and parts[1].isdigit():
+        return f"{parts[0]}-{parts[1]}"
+    return UNKNOWN_MONTH
@@ -0,0 +1,149 @@
+from __future__ import annotations
+"""
+response_cache.py
+
+GPTDesign.generate() の前に置く、件数上限（LRU）と有効期限（TTL）付きの応答キャッシュ。
+
+リトライや定型のヘルスチェックのように同じプロンプトが繰り返し届くとき、意図推定・採点を
+やり直さずに前回の結果を返す。キーは次の 3 つの sha256 で、どれかが変われば別のエントリになる。
+
+- 正規化したプロンプト（NFKC、前後の空白を除き、連続する空白を 1 つにまとめる）
+- 証拠（キーを並べ替えた JSON）
+- ポリシーの版（threshold, require_evidence）
+
+ヒット時の粒子の扱いは reuse で選ぶ。
+
+- "new"（既定）: 評価結果は再利用し、粒子は新しい Commit ID / Context ID / タイムスタンプで作り直す
+- "reference": 最初の粒子をそのまま返し、結果の "cache" の "ref" に、最初の粒子が実際に保存された Commit ID
+  （呼び出し側が set_ref() で記録したもの）を入れる。呼び出し側は保存しない
+
+語彙ファイル（meta/category_taxonomy.json など）の変更はキーに含まないので、ttl の間は前の判定が返る。
+"""
+
+import copy
+import hashlib
+import json
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+REUSE_NEW = "new"
+REUSE_REFERENCE = "reference"
+REUSE_MODES = (REUSE_NEW, REUSE_REFERENCE)
+
+
+def normalize_prompt(prompt: str) -> str:
+    return " ".join(unicodedata.normalize("NFKC", prompt).split())
+
+
+def cache_key(prompt: str, evidence: Optional[Dict[str, Any]], threshold: float, require_evidence: bool) -> str:
+    payload = [
+        normalize_prompt(prompt),
+        json.dumps(evidence or None, ensure_ascii=False, sort_keys=True, default=str),
+        float(threshold),
+        bool(require_evidence),
+    ]
+    return hashlib.sha256(json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+
+
+class ResponseCache:
+    """
+    スレッドセーフな LRU + TTL キャッシュ。
+
+    - max_entries を超えたら最も長く使われていないエントリを捨てる
+    - ttl 秒（None なら無期限）を過ぎたエントリは次に引かれたときに捨てる
+    - put() は結果の深いコピーを保存し、get() はその浅いコピーを返す。呼び出し側が返した dict の
+      トップレベルを書き換えても、保存した結果や他のスレッドに返した結果は変わらない
+    - set_ref() で、その結果の粒子が保存された Commit ID をエントリに記録できる
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl: Optional[float] = 300.0,
+        reuse: str = REUSE_NEW,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if max_entries < 1:
+            raise ValueError("max_entries must be >= 1")
+        if reuse not in REUSE_MODES:
+            raise ValueError(f"reuse must be one of {REUSE_MODES}, got {reuse!r}")
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.reuse = reuse
+        self.clock = clock
+        self.counters = CacheStats()
+        # key → (保存した時刻, 結果, 保存された粒子の Commit ID)
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any], Optional[str]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[Tuple[Dict[str, Any], float, Optional[str]]]:
+        """(結果の浅いコピー, 保存してからの秒数, set_ref() で記録した Commit ID) か None。"""
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl is not None and now - entry[0] > self.ttl:
+                del self._entries[key]
+                self.counters.expirations += 1
+                entry = None
+            if entry is None:
+                self.counters.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.counters.hits += 1
+            stored_at, result, ref = entry
+        return dict(result), now - stored_at, ref
+
+    def put(self, key: str, result: Dict[str, Any]) -> None:
+        stored = copy.deepcopy(result)
+        with self._lock:
+            self._entries[key] = (self.clock(), stored, None)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.counters.evictions += 1
+
+    def set_ref(self, key: str, commit_id: str) -> bool:
+        """
+        エントリの粒子が保存された Commit ID を記録する（最初に記録したものを保つ）。
+
+        エントリが無いか、既に記録済みなら False。
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[2] is not None:
+                return False
+            self._entries[key] = (entry[0], entry[1], commit_id)
+            return True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = asdict(self.counters)
+            size = len(self._entries)
+        lookups = counters["hits"] + counters["misses"]
+        return {
+            **counters,
+            "hit_rate": counters["hits"] / lookups if lookups else 0.0,
+            "size": size,
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "reuse": self.reuse,
+        }
@@ -1,7 +1,7 @@
-from gpt_design import GPTDesign, policy_from_summary_meta
+from gpt_design import GPTDesign, current_policy
 
 def build_hallucination_resistant_gpt():
-    policy = policy_from_summary_meta()
+    policy = current_policy()
     return GPTDesign(
         threshold=getattr(policy, "threshold", 0.9),
         require_evidence=getattr(policy, "require_evidence", False)
@@ -0,0 +1,256 @@
+from __future__ import annotations
+"""
+scoring.py
+
+信頼度スコアリングの共通定義とバッチ採点 API。
+
+単発の `_score_reliability`（design）/ `compute_reliability_score`（exporter）と
+同じ重み・語彙を使い、大量のテキストを 1 回の走査でまとめて採点する。
+"""
+
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+from ai_core_gpt.lexicon import EMOTIONAL, EMOTIONAL_PHRASES, SPECULATION, SPECULATION_PHRASES, LexiconHits
+
+try:
+    import numpy as np
+except ImportError:  # numpy が無い環境では単発採点のループにフォールバック
+    np = None  # type: ignore[assignment]
+
+# 語彙は一度だけコンパイルして共有する
+EMOTIONAL_PATTERN = re.compile("|".join(map(re.escape, EMOTIONAL_PHRASES)))
+SPECULATION_PATTERN = re.compile("|".join(map(re.escape, SPECULATION_PHRASES)))
+
+WEIGHTS: Dict[str, float] = {
+    "no_emotional": 0.15,
+    "no_speculation": 0.15,
+    "has_evidence": 0.20,
+    "clear_intent": 0.15,
+    "length_ok": 0.10,
+    "no_contradiction": 0.25,
+}
+PENALTIES: Dict[str, float] = {
+    "emotional": -0.10,
+    "missing_evidence": -0.15,
+    "contradiction": -0.20,
+    "true_intent_bonus": +0.10,
+}
+
+# bonuses / penalties のキー順は単発版の加算順に揃える（浮動小数の結果を一致させるため）
+BONUS_KEYS = ("no_emotional", "no_speculation", "has_evidence", "clear_intent", "length_ok", "no_contradiction")
+PENALTY_KEYS = ("emotional", "missing_evidence", "contradiction")
+_BONUS_VALUES = dict(WEIGHTS, clear_intent=WEIGHTS["clear_intent"] + PENALTIES["true_intent_bonus"])
+
+_SEPARATOR = "\x00"
+
+Flags = Union[bool, Sequence[bool]]
+Thresholds = Union[float, Sequence[float]]
+
+
+def score_reliability(
+    text: str,
+    has_evidence: bool = False,
+    true_intent_clear: bool = False,
+    contradiction: bool = False,
+    threshold: float = 0.90,
+    hits: Optional[LexiconHits] = None,
+) -> Dict[str, Any]:
+    """
+    単発採点。`_score_reliability` と同じ形式の dict を返す。
+
+    hits に text の LexiconMatcher 走査結果を渡すと、語彙の再走査を省略する。
+    """
+    if hits is not None:
+        emotional, speculation = hits.has(EMOTIONAL), hits.has(SPECULATION)
+    else:
+        emotional, speculation = bool(EMOTIONAL_PATTERN.search(text)), bool(SPECULATION_PATTERN.search(text))
+    score = 0.0
+    bonus: Dict[str, float] = {}
+    malus: Dict[str, float] = {}
+    if not emotional:
+        score += WEIGHTS["no_emotional"]; bonus["no_emotional"] = WEIGHTS["no_emotional"]
+    else:
+        malus["emotional"] = PENALTIES["emotional"]
+    if not speculation:
+        score += WEIGHTS["no_speculation"]; bonus["no_speculation"] = WEIGHTS["no_speculation"]
+    if has_evidence:
+        score += WEIGHTS["has_evidence"]; bonus["has_evidence"] = WEIGHTS["has_evidence"]
+    else:
+        malus["missing_evidence"] = PENALTIES["missing_evidence"]
+    if true_intent_clear:
+        score += WEIGHTS["clear_intent"] + PENALTIES["true_intent_bonus"]
+        bonus["clear_intent"] = WEIGHTS["clear_intent"] + PENALTIES["true_intent_bonus"]
+    if len(text) > 10:
+        score += WEIGHTS["length_ok"]; bonus["length_ok"] = WEIGHTS["length_ok"]
+    if not contradiction:
+        score += WEIGHTS["no_contradiction"]; bonus["no_contradiction"] = WEIGHTS["no_contradiction"]
+    else:
+        malus["contradiction"] = PENALTIES["contradiction"]
+    score = round(max(min(score + sum(malus.values()), 1.0), 0.0), 3)
+    status = "promoted" if score >= threshold else "record_only"
+    return {"score": score, "status": status, "bonuses": bonus, "penalties": malus}
+
+
+@dataclass
+class BatchScores:
+    """
+    列指向の採点結果。
+
+    - scores: 各テキストのスコア（numpy 有効時は float64 配列）
+    - statuses: "promoted" / "record_only"
+    - bonus_mask / penalty_mask: キーごとの真偽列
+    """
+
+    scores: Any
+    statuses: Any
+    bonus_mask: Dict[str, Any] = field(default_factory=dict)
+    penalty_mask: Dict[str, Any] = field(default_factory=dict)
+
+    def __len__(self) -> int:
+        return len(self.scores)
+
+    def row(self, i: int) -> Dict[str, Any]:
+        """i 番目の結果を単発採点と同じ dict 形式で取り出す。"""
+        return {
+            "score": float(self.scores[i]),
+            "status": str(self.statuses[i]),
+            "bonuses": {k: _BONUS_VALUES[k] for k in BONUS_KEYS if self.bonus_mask[k][i]},
+            "penalties": {k: PENALTIES[k] for k in PENALTY_KEYS if self.penalty_mask[k][i]},
+        }
+
+    def rows(self) -> List[Dict[str, Any]]:
+        """全件を row() と同じ dict の列で取り出す（配列からの変換は列ごとに 1 回）。"""
+        scores = [float(v) for v in _tolist(self.scores)]
+        statuses = [str(v) for v in _tolist(self.statuses)]
+        bonus = [(k, _BONUS_VALUES[k], _tolist(self.bonus_mask[k])) for k in BONUS_KEYS]
+        malus = [(k, PENALTIES[k], _tolist(self.penalty_mask[k])) for k in PENALTY_KEYS]
+        return [
+            {
+                "score": scores[i],
+                "status": statuses[i],
+                "bonuses": {k: v for k, v, mask in bonus if mask[i]},
+                "penalties": {k: v for k, v, mask in malus if mask[i]},
+            }
+            for i in range(len(scores))
+        ]
+
+
+def _tolist(values: Any) -> List[Any]:
+    return values.tolist() if hasattr(values, "tolist") else list(values)
+
+
+@lru_cache(maxsize=None)
+def _first_hit_pattern(pattern: re.Pattern[str]) -> re.Pattern[str]:
+    # ヒット後は次の区切り文字まで読み飛ばし、同じテキストの残りで何度もヒットさせない
+    return re.compile(f"(?:{pattern.pattern})[^{_SEPARATOR}]*", pattern.flags)
+
+
+def _pattern_hits(pattern: re.Pattern[str], joined: str, ends: Any, n: int) -> Any:
+    """
+    区切り文字で連結したテキストを 1 回走査し、ヒットしたテキストの真偽列を返す。
+
+    どのテキストのヒットかは長さの累積和（ends）から決め、テキストが区切り文字を含んでいてもよい。
+    """
+    hits = np.zeros(n, dtype=bool)
+    spans = [x for m in _first_hit_pattern(pattern).finditer(joined) for x in m.span()]
+    if not spans:
+        return hits
+    starts = np.array(spans[0::2], dtype=np.int64)
+    stops = np.array(spans[1::2], dtype=np.int64)
+    owner = np.searchsorted(ends, starts, side="right")
+    inside = stops <= ends[owner]
+    hits[owner[inside]] = True
+    # 語彙が区切り文字を跨いでヒットしたときは、覆われたテキストをそれぞれの範囲だけで探し直す
+    crossing = ~inside
+    bounds = ends.tolist() if crossing.any() else []
+    for first, stop in zip(owner[crossing].tolist(), stops[crossing].tolist()):
+        last = min(int(np.searchsorted(ends, stop - 1, side="left")), n - 1)
+        for i in range(first, last + 1):
+            begin = bounds[i - 1] + 1 if i else 0
+            hits[i] = hits[i] or pattern.search(joined, begin, bounds[i]) is not None
+    return hits
+
+
+def _column(value: Any, n: int, dtype: Any) -> Any:
+    arr = np.asarray(value, dtype=dtype)
+    return np.broadcast_to(arr, (n,)) if arr.ndim == 0 else arr
+
+
+def _score_batch_fallback(texts: List[str], has_evidence: Flags, true_intent_clear: Flags,
+                          contradiction: Flags, threshold: Thresholds) -> BatchScores:
+    def col(v: Any) -> List[Any]:
+        return list(v) if isinstance(v, (list, tuple)) else [v] * len(texts)
+
+    rows = [
+        score_reliability(t, e, c, x, th)
+        for t, e, c, x, th in zip(texts, col(has_evidence), col(true_intent_clear), col(contradiction), col(threshold))
+    ]
+    return BatchScores(
+        scores=[r["score"] for r in rows],
+        statuses=[r["status"] for r in rows],
+        bonus_mask={k: [k in r["bonuses"] for r in rows] for k in BONUS_KEYS},
+        penalty_mask={k: [k in r["penalties"] for r in rows] for k in PENALTY_KEYS},
+    )
+
+
+def score_batch(
+    texts: Sequence[str],
+    has_evidence: Flags = False,
+    true_intent_clear: Flags = False,
+    contradiction: Flags = False,
+    threshold: Thresholds = 0.90,
+) -> BatchScores:
+    """
+    テキスト列をまとめて採点する。
+
+    フラグと threshold はスカラー（全件共通）または texts と同じ長さの列を受け付ける。
+    結果は `score_reliability` をテキストごとに呼んだ場合とビット単位で一致する。
+    """
+    texts = list(texts)
+    if np is None:
+        return _score_batch_fallback(texts, has_evidence, true_intent_clear, contradiction, threshold)
+
+    n = len(texts)
+    lengths = np.fromiter(map(len, texts), dtype=np.int64, count=n)
+    # 連結文字列中の各テキスト終端（テキストの長さの累積和から求める区切り文字の位置）
+    ends = np.cumsum(lengths + 1) - 1
+    joined = _SEPARATOR.join(texts)
+
+    emotional = _pattern_hits(EMOTIONAL_PATTERN, joined, ends, n)
+    speculation = _pattern_hits(SPECULATION_PATTERN, joined, ends, n)
+    evidence = _column(has_evidence, n, bool)
+    intent_clear = _column(true_intent_clear, n, bool)
+    contra = _column(contradiction, n, bool)
+
+    bonus_mask = {
+        "no_emotional": ~emotional,
+        "no_speculation": ~speculation,
+        "has_evidence": evidence,
+        "clear_intent": intent_clear,
+        "length_ok": lengths > 10,
+        "no_contradiction": ~contra,
+    }
+    penalty_mask = {
+        "emotional": emotional,
+        "missing_evidence": ~evidence,
+        "contradiction": contra,
+    }
+
+    # 単発版と同じ順序で加算する（未加算の項は +0.0 なので値は変わらない）
+    raw = np.zeros(n, dtype=np.float64)
+    for key in BONUS_KEYS:
+        raw += np.where(bonus_mask[key], _BONUS_VALUES[key], 0.0)
+    malus = np.zeros(n, dtype=np.float64)
+    for key in PENALTY_KEYS:
+        malus += np.where(penalty_mask[key], PENALTIES[key], 0.0)
+    clipped = np.clip(raw + malus, 0.0, 1.0)
+
+    # np.round は Python の round と丸め方が異なるため、値の種類ごとに round() を適用する
+    uniq, inverse = np.unique(clipped, return_inverse=True)
+    scores = np.array([round(v, 3) for v in uniq.tolist()], dtype=np.float64)[inverse.reshape(-1)]
+
+    statuses = np.where(scores >= _column(threshold, n, np.float64), "promoted", "record_only")
+    return BatchScores(scores=scores, statuses=statuses, bonus_mask=bonus_mask, penalty_mask=penalty_mask)
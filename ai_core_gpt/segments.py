@@ -0,0 +1,380 @@
+from __future__ import annotations
+"""
+segments.py
+
+粒子の追記型セグメントログ。
+
+1 粒子 = 1 JSON ファイルの代わりに、particles/segments/[<shard>/]seg-000001.jsonl へ
+1 行 1 粒子（`<粒子ファイル名>\\t<V1 粒子のコンパクト JSON>\\n`）で追記し、
+max_bytes を超えたら次のセグメントへ切り替える。粒子の中身は V1 スキーマのまま。
+
+ParticleStore は各レコードを (segment, offset, length) で索引するので、集計側
+（pipeline_controller / analytics / optimizer）は JSON ファイルと区別せずインデックスの行だけを読み、
+粒子全体はデコードしない（デコードするのは索引するときの 1 回だけ）。
+
+scan_segments() はインデックスを通さずにセグメントを mmap して件数・スコア・status を数える
+診断用のリーダで、`segments stats` とベンチマークがインデックスとの突き合わせに使う。
+索引の行には Intent Details や内容のハッシュも要るため、索引の作成には使わない。
+既存ツリーの変換は:
+
+    python -m ai_core_gpt.segments convert --root particles --remove-source   # 同じ root のセグメントへ移す
+    python -m ai_core_gpt.segments convert --root particles --out segmented   # 別の root へ写す
+"""
+
+import argparse
+import json
+import logging
+import mmap
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from ai_core_gpt.particle import Particle
+from ai_core_gpt.store import (
+    PARTICLE_ROOT,
+    SEGMENT_DIR,
+    SEGMENT_SUFFIX,
+    ParticleStore,
+    decode_segment_record,
+    encode_segment_record,
+    is_particle_dir,
+    iter_segment,
+    open_store,
+)
+
+try:
+    import fcntl
+except ImportError:  # Windows では同一プロセス内のロックのみ
+    fcntl = None  # type: ignore[assignment]
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+SEGMENT_PREFIX = "seg-"
+
+
+def segment_dir(root: Path = PARTICLE_ROOT, shard: str = "") -> Path:
+    base = Path(root) / SEGMENT_DIR
+    return base / shard if shard else base
+
+
+def list_segments(root: Path = PARTICLE_ROOT) -> List[Path]:
+    """root 配下の全セグメント（シャードごとに番号順）。"""
+    base = segment_dir(root)
+    if not base.exists():
+        return []
+    return sorted(base.rglob(f"{SEGMENT_PREFIX}*{SEGMENT_SUFFIX}"))
+
+
+class SegmentWriter:
+    """
+    1 シャード分のセグメントへの追記口。
+
+    - append() は (segment, offset, length) を返し、ParticleStore にも同時に登録する
+      （index=False なら登録せず、別プロセスの sync() に任せる）
+    - 他プロセスとの同時追記は fcntl.flock で直列化する
+    - fsync=True ならレコードごとにディスクへ同期する（既定は flush のみ）
+    """
+
+    def __init__(
+        self,
+        root: Path = PARTICLE_ROOT,
+        shard: str = "",
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        fsync: bool = False,
+        store: Optional[ParticleStore] = None,
+        index: bool = True,
+    ):
+        self.root = Path(root)
+        self.shard = shard
+        self.max_bytes = max_bytes
+        self.fsync = fsync
+        self.store = store
+        self.index = index
+        self.directory = segment_dir(self.root, shard)
+        self._lock = threading.Lock()
+
+    def _current(self, incoming: int) -> Path:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        existing = sorted(self.directory.glob(f"{SEGMENT_PREFIX}*{SEGMENT_SUFFIX}"))
+        if existing:
+            last = existing[-1]
+            size = last.stat().st_size
+            if size == 0 or size + incoming <= self.max_bytes:
+                return last
+            number = int(last.stem[len(SEGMENT_PREFIX):]) + 1
+        else:
+            number = 1
+        return self.directory / f"{SEGMENT_PREFIX}{number:06d}{SEGMENT_SUFFIX}"
+
+    def append_many(self, items: Iterable[Tuple[str, Dict[str, Any]]]) -> List[Tuple[Path, int, int]]:
+        """(粒子ファイル名, V1 粒子) の列を追記し、各レコードの位置を返す。"""
+        encoded = [(name, data, encode_segment_record(name, data)) for name, data in items]
+        if not encoded:
+            return []
+        placed: List[Tuple[Path, int, int]] = []
+        with self._lock:
+            pending = list(encoded)
+            while pending:
+                segment = self._current(len(pending[0][2]))
+                with segment.open("ab") as f:
+                    if fcntl is not None:
+                        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+                    try:
+                        f.seek(0, os.SEEK_END)
+                        offset = f.tell()
+                        entries = []
+                        # 同じセグメントに収まる分だけまとめて書く
+                        while pending:
+                            name, data, line = pending[0]
+                            if entries and offset + len(line) > self.max_bytes:
+                                break
+                            f.write(line)
+                            entries.append((offset, len(line), name, data))
+                            placed.append((segment, offset, len(line)))
+                            offset += len(line)
+                            pending.pop(0)
+                        f.flush()
+                        if self.fsync:
+                            os.fsync(f.fileno())
+                    finally:
+                        if fcntl is not None:
+                            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+                self._index(segment, entries)
+        return placed
+
+    def append(self, name: str, data: Dict[str, Any]) -> Tuple[Path, int, int]:
+        return self.append_many([(name, data)])[0]
+
+    def _index(self, segment: Path, entries: List[Tuple[int, int, str, Dict[str, Any]]]) -> None:
+        if not self.index:
+            return
+        store = self.store or open_store(self.root)
+        try:
+            store.add_segment_records(segment, entries)
+        except Exception:
+            logger.exception("Failed to index %s (run `python -m ai_core_gpt.store sync`)", segment)
+
+
+_WRITERS: Dict[Tuple[str, str], SegmentWriter] = {}
+_WRITERS_LOCK = threading.Lock()
+
+
+def open_writer(root: Path = PARTICLE_ROOT, shard: str = "", index: bool = True) -> SegmentWriter:
+    """root / shard ごとに 1 つの SegmentWriter を共有する（プロセス内キャッシュ）。"""
+    key = (os.path.abspath(root), shard)
+    with _WRITERS_LOCK:
+        writer = _WRITERS.get(key)
+        if writer is None:
+            writer = _WRITERS[key] = SegmentWriter(Path(root), shard, index=index)
+        return writer
+
+
+def iter_particles(root: Path = PARTICLE_ROOT) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """全セグメントの粒子を (粒子ファイル名, V1 粒子) として先頭から順に流す。"""
+    for segment in list_segments(root):
+        for offset, _, line in iter_segment(segment):
+            try:
+                yield decode_segment_record(line)
+            except Exception as e:
+                logger.error("Failed to decode %s@%d: %s", segment, offset, e)
+
+
+class SegmentRecord(NamedTuple):
+    """scan_segments() が返す軽量レコード（Raw Text などは含まない）。"""
+
+    name: str
+    commit_id: str
+    score: float
+    status: str
+    intent_category: str
+    segment: Path
+    offset: int
+    length: int
+
+
+# export_particle() が書くコンパクト JSON のキーをそのまま探す。JSON 文字列中の " は必ず
+# エスケープされるので、Raw Text の中身がこれらに一致することはない
+_JSON_STR = rb'"((?:[^"\\]|\\.)*)"'
+_COMMIT_ID = re.compile(rb'"Commit ID":' + _JSON_STR)
+_SCORE = re.compile(rb'"Reliability Score":(-?[0-9][0-9.eE+-]*)')
+_OUTCOME = re.compile(rb'"Processing Outcome":' + _JSON_STR)
+_CATEGORY = re.compile(rb'"True Intent":\{"Category":' + _JSON_STR)
+
+
+def _json_str(raw: bytes) -> str:
+    return json.loads(b'"' + raw + b'"') if b"\\" in raw else raw.decode("utf-8")
+
+
+def _light_record(buf: Any, segment: Path, offset: int, tab: int, end: int) -> SegmentRecord:
+    name = buf[offset:tab].decode("utf-8")
+    length = end + 1 - offset
+    # export_particle() のキー順（Commit ID → True Intent → Reliability Score → Processing Outcome）で
+    # 前の一致の直後から探す
+    commit = _COMMIT_ID.search(buf, tab, end)
+    category = commit and _CATEGORY.search(buf, commit.end(), end)
+    score = category and _SCORE.search(buf, category.end(), end)
+    outcome = score and _OUTCOME.search(buf, score.end(), end)
+    if commit and category and score and outcome:
+        return SegmentRecord(
+            name, _json_str(commit.group(1)), float(score.group(1)), _json_str(outcome.group(1)),
+            _json_str(category.group(1)), segment, offset, length,
+        )
+    # 旧形式やキー順の異なるレコードだけは全体をデコードして正規化する
+    _, data = decode_segment_record(buf[offset:end + 1])
+    record = Particle.from_v1_dict(data, segment / name)
+    return SegmentRecord(
+        name, record.commit_id, record.score, record.status, record.intent_category, segment, offset, length,
+    )
+
+
+def scan_segment(segment: Path, start: int = 0) -> Iterator[SegmentRecord]:
+    """
+    セグメントを mmap し、start バイト目以降の完結したレコードを SegmentRecord で流す。
+
+    行全体の dict は作らず、必要なフィールドだけをマップ上で正規表現照合して取り出すため、
+    メモリ使用量はセグメントの大きさや件数に依存しない。
+    """
+    segment = Path(segment)
+    with segment.open("rb") as f:
+        if os.fstat(f.fileno()).st_size <= start:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            offset = start
+            while True:
+                end = buf.find(b"\n", offset)
+                if end < 0:
+                    break  # 書き込み途中の末尾レコード
+                tab = buf.find(b"\t", offset, end)
+                try:
+                    if tab < 0:
+                        raise ValueError("missing name field")
+                    yield _light_record(buf, segment, offset, tab, end)
+                except Exception as e:
+                    logger.error("Failed to decode %s@%d: %s", segment, offset, e)
+                offset = end + 1
+
+
+def scan_segments(root: Path = PARTICLE_ROOT) -> Iterator[SegmentRecord]:
+    """root 配下の全セグメントを scan_segment() で順に流す（診断用。集計はインデックスから読む）。"""
+    for segment in list_segments(root):
+        yield from scan_segment(segment)
+
+
+def _particle_files(root: Path) -> List[Path]:
+    files = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        # segments/ と _ で始まるキャッシュ（_sketches/ など）は ParticleStore と同じく粒子ではない
+        dirnames[:] = sorted(d for d in dirnames if is_particle_dir(d))
+        files += [Path(dirpath) / n for n in sorted(filenames) if n.endswith(".json")]
+    return files
+
+
+def convert(
+    root: Path = PARTICLE_ROOT,
+    out: Optional[Path] = None,
+    shard: str = "",
+    remove_source: bool = False,
+    batch_size: int = 1000,
+) -> Dict[str, int]:
+    """
+    root 配下の粒子 JSON をセグメント（既定は同じ root の segments/）へ変換する。
+
+    同じ root へ変換すると元ファイルとセグメントの両方が索引されるため、その場合は remove_source=True が必要。
+    バッチごとに追記・fsync し、インデックスで元ファイルの行とセグメントのレコードを 1 トランザクションで
+    入れ替えてから元ファイルを削除する。別の root（out）へ変換するときは、remove_source=True なら
+    全件の追記と fsync が済んでから元ファイルを削除する。
+    """
+    root = Path(root)
+    out = Path(out) if out is not None else root
+    in_place = os.path.abspath(out) == os.path.abspath(root)
+    if in_place and not remove_source:
+        raise ValueError(
+            "converting in place would index every particle twice; pass remove_source=True or a separate out root"
+        )
+    store = ParticleStore(out)
+    # 同じ root では索引を replace_with_segments() でまとめて入れ替える
+    writer = SegmentWriter(out, shard, fsync=in_place, store=store, index=not in_place)
+    stats = {"converted": 0, "skipped": 0, "removed": 0}
+    converted: List[Path] = []
+    batch: List[Tuple[str, Dict[str, Any]]] = []
+
+    def flush() -> None:
+        placed = writer.append_many(batch)
+        stats["converted"] += len(batch)
+        if in_place and placed:
+            sources = converted[-len(batch):]
+            store.replace_with_segments(
+                sources, [(seg, off, length, name, data) for (seg, off, length), (name, data) in zip(placed, batch)]
+            )
+            for path in sources:
+                path.unlink()
+            stats["removed"] += len(sources)
+        batch.clear()
+
+    for path in _particle_files(root):
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except Exception as e:
+            logger.error("Failed to read %s: %s", path, e)
+            stats["skipped"] += 1
+            continue
+        if not isinstance(data, dict):
+            stats["skipped"] += 1
+            continue
+        batch.append((path.name, data))
+        converted.append(path)
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+
+    if not in_place:
+        for segment in list_segments(out):
+            with segment.open("rb") as f:
+                os.fsync(f.fileno())
+        if remove_source:
+            for path in converted:
+                path.unlink()
+                stats["removed"] += 1
+    store.close()
+    return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="粒子 JSON と追記型セグメントの変換・閲覧。")
+    sub = parser.add_subparsers(dest="command", required=True)
+    conv = sub.add_parser("convert", help="粒子 JSON をセグメントへ変換する")
+    conv.add_argument("--root", type=Path, default=PARTICLE_ROOT, help="変換元の粒子ディレクトリ")
+    conv.add_argument("--out", type=Path, default=None,
+                      help="変換先の粒子ディレクトリ（既定: --root と同じ。その場合は --remove-source が必要）")
+    conv.add_argument("--shard", default="", help="書き込み先シャード名")
+    conv.add_argument("--remove-source", action="store_true", help="変換後に元の JSON ファイルを削除する")
+    dump = sub.add_parser("dump", help="セグメント内の粒子を JSON Lines で標準出力へ流す")
+    dump.add_argument("--root", type=Path, default=PARTICLE_ROOT)
+    stats = sub.add_parser("stats", help="インデックスを通さず mmap リーダで件数・平均スコア・status 別件数を数える（診断用）")
+    stats.add_argument("--root", type=Path, default=PARTICLE_ROOT)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="[%(levelname)s] %(message)s")
+    if args.command == "convert":
+        if args.out is None and not args.remove_source:
+            parser.error("converting in place requires --remove-source (or pass --out to convert into another root)")
+        print(json.dumps(convert(args.root, args.out, args.shard, args.remove_source), ensure_ascii=False))
+    elif args.command == "stats":
+        count, total = 0, 0.0
+        statuses: Dict[str, int] = {}
+        for record in scan_segments(args.root):
+            count += 1
+            total += record.score
+            statuses[record.status] = statuses.get(record.status, 0) + 1
+        print(json.dumps({"count": count, "avg_score": total / count if count else 0.0, "statuses": statuses},
+                         ensure_ascii=False))
+    else:
+        for name, data in iter_particles(args.root):
+            print(json.dumps({"name": name, "particle": data}, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+from __future__ import annotations
+"""
+sketch.py
+
+信頼度スコア（0.0〜1.0）の分布を固定幅のヒストグラムで持つ、マージ可能なストリーミングスケッチ。
+
+平均だけでは見えない下位の裾（意図ごとの p5 など）を、粒子を全件読み直さずに求めるためのもの。
+ビン数は BUCKETS 個で固定なので、何件足してもメモリは変わらず、シャードや月ごとのスケッチは
+ビンごとの件数を足すだけで 1 つにまとまる（分位点の誤差はビン幅 1 / BUCKETS 以内）。
+
+- ScoreHistogram: 1 系列のヒストグラム（件数・最小・最大つき）
+- ScoreSketches: 全体・意図カテゴリ別・status 別のヒストグラムの組
+- particle_exporter は書き出した粒子を particles/_sketches/<YYYY-MM>[.<シャード>].json に足し込む
+  （record_particles()）。load_sketches() は必要な月のファイルだけを読んでマージする
+
+    python -m ai_core_gpt.sketch stats [--months 2025-11 2025-12]   # マージした分位点を表示
+    python -m ai_core_gpt.sketch rebuild                            # インデックスから作り直す
+"""
+
+import argparse
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from ai_core_gpt.particle import Particle, month_of
+from ai_core_gpt.store import PARTICLE_ROOT, ParticleStore
+
+try:
+    import fcntl
+except ImportError:  # Windows などでは同じプロセス内の排他だけにする
+    fcntl = None  # type: ignore[assignment]
+
+logger = logging.getLogger(__name__)
+
+BUCKETS = 1000
+SKETCH_DIR = "_sketches"
+# 要約に出す分位点（%）
+DEFAULT_PERCENTILES = (5, 10, 50, 90, 95)
+
+
+def bucket_of(score: float) -> int:
+    """スコアのビン番号（範囲外は両端のビンに入れる）。"""
+    return min(BUCKETS - 1, max(0, int(score * BUCKETS)))
+
+
+class ScoreHistogram:
+    """BUCKETS 個の等幅ビンに件数を数えるヒストグラム。"""
+
+    __slots__ = ("counts", "count", "min", "max")
+
+    def __init__(self) -> None:
+        self.counts: List[int] = [0] * BUCKETS
+        self.count = 0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def add(self, score: float) -> None:
+        self.counts[bucket_of(score)] += 1
+        self.count += 1
+        if self.min is None or score < self.min:
+            self.min = score
+        if self.max is None or score > self.max:
+            self.max = score
+
+    def merge(self, other: "ScoreHistogram") -> "ScoreHistogram":
+        if not other.count:
+            return self
+        counts = self.counts
+        for i, c in enumerate(other.counts):
+            if c:
+                counts[i] += c
+        self.count += other.count
+        self.min = other.min if self.min is None else min(self.min, other.min)  # type: ignore[type-var]
+        self.max = other.max if self.max is None else max(self.max, other.max)  # type: ignore[type-var]
+        return self
+
+    def quantile(self, q: float) -> Optional[float]:
+        """q（0〜1）分位点。ビン内は一様とみなして補間し、実際の最小・最大で切り詰める。空なら None。"""
+        if not self.count:
+            return None
+        target = q * self.count
+        cum = 0
+        for i, c in enumerate(self.counts):
+            if c and cum + c >= target:
+                value = (i + (target - cum) / c) / BUCKETS
+                return min(max(value, self.min), self.max)  # type: ignore[type-var]
+            cum += c
+        return self.max
+
+    def percentiles(self, qs: Sequence[float] = DEFAULT_PERCENTILES) -> Dict[str, float]:
+        """columns.Columns.percentiles() と同じ形（"p5" など）の分位点。"""
+        if not self.count:
+            return {}
+        return {f"p{q:g}": round(self.quantile(q / 100), 4) for q in qs}  # type: ignore[arg-type]
+
+    def to_dict(self) -> Dict[str, Any]:
+        # 空のビンは書かない（JSON ではビン番号が文字列になる）
+        return {
+            "count": self.count,
+            "min": self.min,
+            "max": self.max,
+            "buckets": {str(i): c for i, c in enumerate(self.counts) if c},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ScoreHistogram":
+        hist = cls()
+        for i, c in (data.get("buckets") or {}).items():
+            hist.counts[int(i)] += int(c)
+        hist.count = int(data.get("count", sum(hist.counts)))
+        hist.min = data.get("min")
+        hist.max = data.get("max")
+        return hist
+
+    @classmethod
+    def from_counts(cls, counts: Sequence[int], low: Optional[float], high: Optional[float]) -> "ScoreHistogram":
+        """ビンごとの件数（長さ BUCKETS）から作る（列キャッシュで bincount した結果など）。"""
+        hist = cls()
+        hist.counts = [int(c) for c in counts]
+        hist.count = sum(hist.counts)
+        if hist.count:
+            hist.min, hist.max = low, high
+        return hist
+
+
+class ScoreSketches:
+    """全体・意図カテゴリ別・status 別のスコア分布。"""
+
+    __slots__ = ("all", "intents", "statuses")
+
+    def __init__(self) -> None:
+        self.all = ScoreHistogram()
+        self.intents: Dict[str, ScoreHistogram] = {}
+        self.statuses: Dict[str, ScoreHistogram] = {}
+
+    def __len__(self) -> int:
+        return self.all.count
+
+    def add(self, score: float, intent: str, status: str) -> None:
+        self.all.add(score)
+        hist = self.intents.get(intent)
+        if hist is None:
+            hist = self.intents[intent] = ScoreHistogram()
+        hist.add(score)
+        hist = self.statuses.get(status)
+        if hist is None:
+            hist = self.statuses[status] = ScoreHistogram()
+        hist.add(score)
+
+    def add_record(self, record: Particle) -> None:
+        self.add(record.score, record.intent_category, record.status)
+
+    def merge(self, other: "ScoreSketches") -> "ScoreSketches":
+        self.all.merge(other.all)
+        for mine, theirs in ((self.intents, other.intents), (self.statuses, other.statuses)):
+            for name, hist in theirs.items():
+                mine.setdefault(name, ScoreHistogram()).merge(hist)
+        return self
+
+    def percentiles(self, qs: Sequence[float] = DEFAULT_PERCENTILES) -> Dict[str, Any]:
+        """全体・意図別・status 別の件数と分位点。"""
+        def describe(hist: ScoreHistogram) -> Dict[str, Any]:
+            return {"count": hist.count, **hist.percentiles(qs)}
+
+        return {
+            "all": describe(self.all),
+            "intents": {name: describe(h) for name, h in self.intents.items()},
+            "statuses": {name: describe(h) for name, h in self.statuses.items()},
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "buckets": BUCKETS,
+            "all": self.all.to_dict(),
+            "intents": {name: h.to_dict() for name, h in self.intents.items()},
+            "statuses": {name: h.to_dict() for name, h in self.statuses.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ScoreSketches":
+        if int(data.get("buckets", BUCKETS)) != BUCKETS:
+            raise ValueError(f"sketch has {data.get('buckets')} buckets, expected {BUCKETS}")
+        sketches = cls()
+        sketches.all = ScoreHistogram.from_dict(data.get("all") or {})
+        sketches.intents = {name: ScoreHistogram.from_dict(h) for name, h in (data.get("intents") or {}).items()}
+        sketches.statuses = {name: ScoreHistogram.from_dict(h) for name, h in (data.get("statuses") or {}).items()}
+        return sketches
+
+
+# ---- 月・シャードごとのスケッチファイル ----------------------------------------------
+_LOCK = threading.Lock()
+
+
+def sketch_dir(root: Path = PARTICLE_ROOT) -> Path:
+    return root / SKETCH_DIR
+
+
+def sketch_file(root: Path, month: str, shard: str = "") -> Path:
+    return sketch_dir(root) / (f"{month}.{shard}.json" if shard else f"{month}.json")
+
+
+def _read(path: Path) -> ScoreSketches:
+    try:
+        return ScoreSketches.from_dict(json.loads(path.read_text(encoding="utf-8")))
+    except FileNotFoundError:
+        return ScoreSketches()
+
+
+def _write(path: Path, sketches: ScoreSketches) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(sketches.to_dict(), ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+@contextmanager
+def _locked(directory: Path) -> Iterator[None]:
+    """スケッチファイルの読み書きを、プロセス内のロックと fcntl.flock で直列化する。"""
+    directory.mkdir(parents=True, exist_ok=True)
+    with _LOCK, (directory / ".lock").open("a") as lock:
+        if fcntl is not None:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+
+
+def record_particles(root: Path, records: Iterable[Particle], shard: str = "") -> int:
+    """
+    書き出した粒子を月ごとのスケッチファイルに足し込み、足した件数を返す。
+
+    同じファイルへの読み書きはプロセス内のロックと fcntl.flock で直列化する
+    （マルチワーカ配信では各ワーカが自分のシャードのファイルだけに書く）。
+    """
+    by_month: Dict[str, ScoreSketches] = {}
+    for record in records:
+        by_month.setdefault(month_of(record, root), ScoreSketches()).add_record(record)
+    if not by_month:
+        return 0
+    with _locked(sketch_dir(root)):
+        for month, added in by_month.items():
+            path = sketch_file(root, month, shard)
+            _write(path, _read(path).merge(added))
+    return sum(len(s) for s in by_month.values())
+
+
+def sketch_months(root: Path = PARTICLE_ROOT) -> List[str]:
+    directory = sketch_dir(root)
+    if not directory.exists():
+        return []
+    return sorted({p.name.split(".", 1)[0] for p in directory.glob("*.json")})
+
+
+def load_sketches(root: Path = PARTICLE_ROOT, months: Optional[Iterable[str]] = None) -> ScoreSketches:
+    """months（省略時は全期間）のスケッチファイルを、全シャードについてマージする。"""
+    wanted = None if months is None else set(months)
+    merged = ScoreSketches()
+    directory = sketch_dir(root)
+    if not directory.exists():
+        return merged
+    for path in sorted(directory.glob("*.json")):
+        if wanted is not None and path.name.split(".", 1)[0] not in wanted:
+            continue
+        try:
+            merged.merge(_read(path))
+        except (OSError, ValueError) as e:
+            logger.warning("Skipping unreadable sketch %s: %s", path, e)
+    return merged
+
+
+def rebuild(store: ParticleStore) -> Dict[str, int]:
+    """
+    インデックスの全粒子から月ごとのスケッチファイルを作り直す（シャード別のファイルは 1 つにまとまる）。
+
+    作り直している間は書き手（record_particles）と同じロックを持ち、書き手を待たせる。
+    """
+    by_month: Dict[str, ScoreSketches] = {}
+    with _locked(sketch_dir(store.root)):
+        store.sync()
+        for record in store.iter_records():
+            by_month.setdefault(month_of(record, store.root), ScoreSketches()).add_record(record)
+        for path in sketch_dir(store.root).glob("*.json"):
+            path.unlink()
+        for month, sketches in by_month.items():
+            _write(sketch_file(store.root, month), sketches)
+    count = sum(len(s) for s in by_month.values())
+    return {"particles": count, "months": len(sketch_months(store.root))}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="スコア分布のスケッチ（particles/_sketches）を表示・再構築する。")
+    parser.add_argument("command", choices=["stats", "rebuild"])
+    parser.add_argument("--root", type=Path, default=PARTICLE_ROOT, help="粒子ディレクトリ（既定: particles）")
+    parser.add_argument("--months", nargs="+", default=None, help="対象の月（YYYY-MM、既定は全期間）")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="[%(levelname)s] %(message)s")
+    if args.command == "rebuild":
+        with ParticleStore(args.root) as store:
+            print(json.dumps(rebuild(store), ensure_ascii=False))
+        return
+    sketches = load_sketches(args.root, args.months)
+    print(json.dumps({"months": args.months or sketch_months(args.root), **sketches.percentiles()}, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,735 @@
+from __future__ import annotations
+"""
+store.py
+
+particles/ 配下の粒子 JSON に対する SQLite インデックス（ParticleStore）。
+
+集計系（pipeline_controller / optimizer / aggregate_particles）は毎回全ファイルを
+パースする代わりに、このインデックスから V1 の主要フィールドを問い合わせる。
+
+- export_particle() が書き出すたびに add() / add_many() で登録する
+- sync() は mtime が変わったディレクトリだけを列挙し、未登録のファイルだけをパースする
+- rebuild() はインデックスを作り直す（粒子は追記専用なので通常は sync() で足りる）
+- segments/ と、_ で始まるディレクトリ（_sketches/ などのキャッシュ）の JSON は粒子として扱わない
+- 空のインデックスへの初回 sync（コールドスタート）は YYYY/MM ディレクトリ単位でプロセスプールに分けて読む
+
+粒子は 1 件 1 ファイルの JSON のほか、segments/ 配下の追記型セグメント（ai_core_gpt.segments）
+にも置ける。セグメント内の粒子は (path, offset, length) で索引し、同じ問い合わせで扱う。
+
+Commit ID と Parent Commit にも索引があり、系譜（ancestors() / descendants()）を全件走査せずに辿れる。
+
+各粒子には意味的な内容のハッシュ（content_hash()）も索引する。export_particle(dedupe=True) は
+同じ内容の粒子があれば書き出さずに duplicates 表の件数だけを増やす（この表はインデックスを作り直しても残す）。
+"""
+
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from ai_core_gpt.particle import Particle, content_hash  # noqa: F401  (content_hash は再エクスポート)
+
+logger = logging.getLogger(__name__)
+
+PARTICLE_ROOT = Path("particles")
+INDEX_NAME = "_index.sqlite3"
+SEGMENT_DIR = "segments"
+SEGMENT_SUFFIX = ".jsonl"
+
+# コールドスタート時の並列読み込み。これより粒子が少ないツリーは直列で読む
+LOAD_WORKERS = min(8, os.cpu_count() or 1)
+PARALLEL_MIN_FILES = 2000
+
+# descendants() が辿る深さの上限（Parent Commit が循環していても止まるように）
+LINEAGE_MAX_DEPTH = 10_000
+
+# スキーマを変えたら上げる（インデックスはキャッシュなので作り直すだけ）
+_SCHEMA_VERSION = 5
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS particles (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    path TEXT NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    dir TEXT NOT NULL,
+    name TEXT NOT NULL,
+    commit_id TEXT NOT NULL,
+    parent_commit TEXT,
+    score REAL NOT NULL,
+    status TEXT NOT NULL,
+    intent_category TEXT NOT NULL,
+    intent_details TEXT NOT NULL,
+    created_at TEXT,
+    reviewer TEXT,
+    content_hash TEXT,
+    UNIQUE (path, offset)
+);
+CREATE INDEX IF NOT EXISTS particles_commit_id ON particles(commit_id);
+CREATE INDEX IF NOT EXISTS particles_dir ON particles(dir);
+CREATE INDEX IF NOT EXISTS particles_content_hash ON particles(content_hash);
+CREATE INDEX IF NOT EXISTS particles_parent_commit ON particles(parent_commit);
+CREATE TABLE IF NOT EXISTS segments (
+    path TEXT PRIMARY KEY,
+    indexed_bytes INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS dirs (
+    path TEXT PRIMARY KEY,
+    parent TEXT,
+    mtime_ns INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS duplicates (
+    content_hash TEXT PRIMARY KEY,
+    count INTEGER NOT NULL,
+    last_seen TEXT NOT NULL
+);
+"""
+
+_COLUMNS = (
+    "path", "offset", "length", "dir", "name", "commit_id", "parent_commit", "score",
+    "status", "intent_category", "intent_details", "created_at", "reviewer", "content_hash",
+)
+
+
+def is_particle_dir(name: str) -> bool:
+    """
+    粒子 JSON を置くディレクトリか。segments/ と、_ で始まるキャッシュ
+    （_sketches/ や _columns/ など）は粒子として索引しない。
+    """
+    return name != SEGMENT_DIR and not name.startswith("_")
+
+
+def read_particle(path: Path) -> Optional[Particle]:
+    """粒子 JSON を読み込んで Particle にする。壊れたファイルは None。"""
+    try:
+        raw = json.loads(path.read_text(encoding="utf-8"))
+    except Exception as e:
+        logger.error("Failed to read %s: %s", path, e)
+        return None
+    if not isinstance(raw, dict):
+        logger.error("Skipping non-object particle %s", path)
+        return None
+    return Particle.from_v1_dict(raw, path)
+
+
+def encode_segment_record(name: str, data: Dict[str, Any]) -> bytes:
+    """
+    セグメントの 1 レコード: `<粒子ファイル名>\t<V1 粒子のコンパクト JSON>\n`
+
+    JSON 文字列中の改行・タブはエスケープされるので、行とフィールドの区切りは一意に決まる。
+    """
+    body = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+    return f"{name}\t{body}\n".encode("utf-8")
+
+
+def decode_segment_record(line: bytes) -> Tuple[str, Dict[str, Any]]:
+    name, _, body = line.rstrip(b"\n").partition(b"\t")
+    return name.decode("utf-8"), json.loads(body)
+
+
+def iter_segment(path: Path, start: int = 0) -> Iterator[Tuple[int, int, bytes]]:
+    """セグメントの start バイト目以降の完結したレコードを (offset, length, line) で返す。"""
+    with path.open("rb") as f:
+        f.seek(start)
+        offset = start
+        for line in f:
+            if not line.endswith(b"\n"):
+                break  # 書き込み途中の末尾レコードは次回に回す
+            yield offset, len(line), line
+            offset += len(line)
+
+
+def read_segment_record(path: Path, offset: int, length: int) -> Dict[str, Any]:
+    with path.open("rb") as f:
+        f.seek(offset)
+        return decode_segment_record(f.read(length))[1]
+
+
+def _load_shard(root: str, rel: str) -> Tuple[str, int, List[Particle], int, float]:
+    """
+    プロセスプールのワーカ: 1 ディレクトリ分の粒子を読み込んで正規化する。
+
+    (rel, 列挙前の mtime_ns, レコード, 読めなかった件数, 所要秒) を返す。
+    """
+    started = time.perf_counter()
+    abs_dir = Path(root) / rel
+    mtime_ns = abs_dir.stat().st_mtime_ns
+    records, errors = [], 0
+    with os.scandir(abs_dir) as it:
+        names = sorted(e.name for e in it if e.is_file() and e.name.endswith(".json"))
+    for name in names:
+        record = read_particle(abs_dir / name)
+        if record is None:
+            errors += 1
+        else:
+            records.append(record)
+    return rel, mtime_ns, records, errors, time.perf_counter() - started
+
+
+class ParticleStore:
+    """particles/ ツリーと、その直下に置く SQLite インデックス。"""
+
+    def __init__(self, root: Path = PARTICLE_ROOT, index_path: Optional[Path] = None):
+        self.root = Path(root)
+        self.index_path = index_path or self.root / INDEX_NAME
+        self._lock = threading.RLock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._in_memory = False
+
+    # ---- connection -------------------------------------------------------
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is not None and self._in_memory and self.root.exists():
+            # 粒子ディレクトリが後から作られた場合はファイルのインデックスへ切り替える
+            self._conn.close()
+            self._conn = None
+        if self._conn is None:
+            # ディレクトリが無いうちは作らずに空のインデックスとして振る舞う
+            self._in_memory = not self.root.exists()
+            target = ":memory:" if self._in_memory else str(self.index_path)
+            conn = sqlite3.connect(target, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            (version,) = conn.execute("PRAGMA user_version").fetchone()
+            if version != _SCHEMA_VERSION:
+                conn.executescript(
+                    "DROP TABLE IF EXISTS particles; DROP TABLE IF EXISTS dirs;"
+                    " DROP TABLE IF EXISTS meta; DROP TABLE IF EXISTS segments;"
+                )
+                conn.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def __enter__(self) -> "ParticleStore":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    # ---- write ------------------------------------------------------------
+    def _rel(self, path: Path) -> str:
+        return Path(os.path.relpath(os.path.abspath(path), os.path.abspath(self.root))).as_posix()
+
+    def _row(self, record: Particle) -> Tuple[Any, ...]:
+        path = Path(record.path)
+        rel = self._rel(path)
+        parent = record.parent_commit
+        return (
+            rel, record.offset, record.length,
+            Path(rel).parent.as_posix(), record.name or path.name, record.commit_id,
+            None if parent is None else str(parent), record.score, record.status,
+            record.intent_category, record.intent_details, record.created_at,
+            None if record.reviewer is None else str(record.reviewer),
+            record.content_hash,
+        )
+
+    def _insert(self, records: List[Particle]) -> None:
+        placeholders = ", ".join("?" * len(_COLUMNS))
+        self.conn.executemany(
+            f"INSERT OR IGNORE INTO particles ({', '.join(_COLUMNS)}) VALUES ({placeholders})",
+            [self._row(r) for r in records],
+        )
+
+    def add(self, path: Path, data: Dict[str, Any]) -> None:
+        """書き出し直後の粒子をインデックスに登録する。"""
+        self.add_many([(path, data)])
+
+    def add_many(self, items: Iterable[Tuple[Path, Dict[str, Any]]]) -> None:
+        """書き出し直後の粒子 (path, data) をまとめて 1 トランザクションで登録する。"""
+        records = [Particle.from_v1_dict(data, Path(path)) for path, data in items]
+        with self._lock, self.conn:
+            self._insert(records)
+
+    def add_segment_records(self, segment: Path, entries: List[Tuple[int, int, str, Dict[str, Any]]]) -> None:
+        """セグメントに追記した (offset, length, name, data) をインデックスに登録する。"""
+        with self._lock, self.conn:
+            self._index_segment_entries(segment, entries)
+
+    def _index_segment_entries(self, segment: Path, entries: List[Tuple[int, int, str, Dict[str, Any]]]) -> None:
+        records = []
+        for offset, length, name, data in entries:
+            # Commit ID が無い旧形式でもファイル名由来の ID になるよう、論理パスで正規化する
+            record = Particle.from_v1_dict(data, segment / name)
+            record.path, record.offset, record.length = str(segment), offset, length
+            records.append(record)
+        self._insert(records)
+        if not entries:
+            return
+        rel = self._rel(segment)
+        # sync の再開位置は先頭から隙間なく索引済みの範囲までしか進めない
+        # （別プロセスが間に追記した未索引の行を読み飛ばさないため）
+        if entries[0][0] <= self._indexed_bytes(rel):
+            end = entries[-1][0] + entries[-1][1]
+            self.conn.execute(
+                "INSERT INTO segments (path, indexed_bytes) VALUES (?, ?) "
+                "ON CONFLICT(path) DO UPDATE SET indexed_bytes = MAX(indexed_bytes, excluded.indexed_bytes)",
+                (rel, end),
+            )
+
+    def replace_with_segments(
+        self, files: Iterable[Path], placed: Iterable[Tuple[Path, int, int, str, Dict[str, Any]]]
+    ) -> None:
+        """
+        JSON ファイルから同じ root のセグメントへ移した粒子について、元ファイルの行を外し、
+        セグメントのレコード (segment, offset, length, name, data) を登録する。
+
+        1 トランザクションで入れ替えるので、同じ粒子が二重に索引される時点は無い。
+        """
+        by_segment: Dict[Path, List[Tuple[int, int, str, Dict[str, Any]]]] = {}
+        for segment, offset, length, name, data in placed:
+            by_segment.setdefault(segment, []).append((offset, length, name, data))
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "DELETE FROM particles WHERE path = ? AND offset = -1", [(self._rel(Path(f)),) for f in files]
+            )
+            for segment, entries in by_segment.items():
+                self._index_segment_entries(segment, entries)
+            self._bump_generation()
+
+    def _indexed_bytes(self, rel: str) -> int:
+        row = self.conn.execute("SELECT indexed_bytes FROM segments WHERE path = ?", (rel,)).fetchone()
+        return int(row[0]) if row else 0
+
+    def _scan_segments(self, stats: Dict[str, int]) -> None:
+        """segments/ 配下のセグメントのうち、未索引の末尾部分だけを読み込む。"""
+        seg_root = self.root / SEGMENT_DIR
+        if not seg_root.exists():
+            return
+        for segment in sorted(seg_root.rglob(f"*{SEGMENT_SUFFIX}")):
+            start = self._indexed_bytes(self._rel(segment))
+            if segment.stat().st_size <= start:
+                continue
+            entries = []
+            for offset, length, line in iter_segment(segment, start):
+                try:
+                    name, data = decode_segment_record(line)
+                except Exception as e:
+                    logger.error("Failed to decode %s@%d: %s", segment, offset, e)
+                    continue
+                entries.append((offset, length, name, data))
+            self._index_segment_entries(segment, entries)
+            stats["added"] += len(entries)
+
+    def _scan_dir(self, rel: str, known: Dict[str, Tuple[Optional[str], int]], stats: Dict[str, int]) -> None:
+        """rel ディレクトリの変化を取り込み、サブディレクトリへ再帰する。"""
+        abs_dir = self.root / rel if rel != "." else self.root
+        # mtime は列挙前に取得する（列挙中に追加されたファイルは次回の sync で拾う）
+        try:
+            mtime_ns = abs_dir.stat().st_mtime_ns
+        except FileNotFoundError:
+            return
+        prev = known.get(rel)
+        if prev is not None and prev[1] == mtime_ns:
+            # 変化なし：ファイルは列挙せず、既知のサブディレクトリだけ辿る
+            for child, (parent, _) in known.items():
+                if parent != rel:
+                    continue
+                if is_particle_dir(Path(child).name):
+                    self._scan_dir(child, known, stats)
+                else:
+                    # 以前の版が索引してしまったキャッシュディレクトリを外す
+                    self._drop_dir(child)
+            return
+
+        indexed = {
+            name for (name,) in self.conn.execute("SELECT name FROM particles WHERE dir = ? AND offset = -1", (rel,))
+        }
+        present, subdirs, fresh = set(), [], []
+        with os.scandir(abs_dir) as it:
+            for entry in it:
+                if entry.is_dir():
+                    if is_particle_dir(entry.name):
+                        subdirs.append(entry.name)
+                elif entry.name.endswith(".json"):
+                    present.add(entry.name)
+                    if entry.name not in indexed:
+                        record = read_particle(Path(entry.path))
+                        if record is not None:
+                            fresh.append(record)
+
+        for child, (parent, _) in known.items():
+            if parent == rel and Path(child).name not in subdirs:
+                self._drop_dir(child)
+
+        # 並列読み込み（_preload）と同じく、ディレクトリ・ファイルとも名前順に登録する
+        subdirs.sort()
+        fresh.sort(key=lambda r: r.name)
+        removed = indexed - present
+        if removed:
+            self.conn.executemany(
+                "DELETE FROM particles WHERE dir = ? AND name = ? AND offset = -1", [(rel, n) for n in removed]
+            )
+            self._bump_generation()
+        if fresh:
+            self._insert(fresh)
+        self.conn.execute(
+            "INSERT OR REPLACE INTO dirs (path, parent, mtime_ns) VALUES (?, ?, ?)",
+            (rel, None if rel == "." else Path(rel).parent.as_posix(), mtime_ns),
+        )
+        stats["dirs"] += 1
+        stats["added"] += len(fresh)
+        stats["removed"] += len(removed)
+        for name in subdirs:
+            self._scan_dir(name if rel == "." else f"{rel}/{name}", known, stats)
+
+    def _drop_dir(self, rel: str) -> None:
+        """rel ディレクトリとその配下の JSON 粒子をインデックスから外す。"""
+        self.conn.execute("DELETE FROM particles WHERE offset = -1 AND (dir = ? OR dir LIKE ?)", (rel, f"{rel}/%"))
+        self.conn.execute("DELETE FROM dirs WHERE path = ? OR path LIKE ?", (rel, f"{rel}/%"))
+        self._bump_generation()
+
+    def _bump_generation(self) -> str:
+        generation = uuid.uuid4().hex
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('generation', ?)", (generation,))
+        return generation
+
+    @property
+    def generation(self) -> str:
+        """
+        インデックスの世代 ID。
+
+        行の削除や rebuild() で変わる。seq を高水位として差分集計する側は、
+        世代が変わっていたら全件から集計し直す。
+        """
+        with self._lock, self.conn:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()
+            return row[0] if row else self._bump_generation()
+
+    def _shards(self) -> List[Tuple[str, int]]:
+        """粒子 JSON を含むディレクトリ（particles/YYYY/MM など）と、その中のファイル数。"""
+        shards = []
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = sorted(d for d in dirnames if is_particle_dir(d))
+            count = sum(1 for n in filenames if n.endswith(".json"))
+            if count:
+                shards.append((Path(self._rel(Path(dirpath))).as_posix(), count))
+        return shards
+
+    def _preload(self, workers: int, stats: Dict[str, int]) -> None:
+        """
+        空のインデックスに対し、ディレクトリ単位のシャードをプロセスプールで並列に読み込む。
+
+        正規化はワーカで行い、結果はシャード順に登録する（seq の並びは直列の場合と同じ規則になる）。
+        小さなツリーでは何もせず、続く _scan_dir() の直列読み込みに任せる。
+        """
+        shards = self._shards()
+        total = sum(count for _, count in shards)
+        if workers <= 1 or len(shards) < 2 or total < PARALLEL_MIN_FILES:
+            return
+        started = time.perf_counter()
+        errors = 0
+        with ProcessPoolExecutor(max_workers=min(workers, len(shards))) as pool:
+            results = pool.map(_load_shard, [str(self.root)] * len(shards), [rel for rel, _ in shards])
+            for rel, mtime_ns, records, failed, elapsed in results:
+                self._insert(records)
+                if rel != ".":
+                    # ルートは続く _scan_dir() で列挙させ、中間ディレクトリ経由でシャードへ辿れるようにする
+                    self.conn.execute(
+                        "INSERT OR REPLACE INTO dirs (path, parent, mtime_ns) VALUES (?, ?, ?)",
+                        (rel, Path(rel).parent.as_posix(), mtime_ns),
+                    )
+                logger.info("Shard %s: %d particles (%d unreadable) in %.3fs", rel, len(records), failed, elapsed)
+                stats["dirs"] += 1
+                stats["added"] += len(records)
+                errors += failed
+        logger.info(
+            "Parallel load: %d particles from %d shards with %d workers in %.3fs (%d unreadable)",
+            stats["added"], len(shards), workers, time.perf_counter() - started, errors,
+        )
+
+    def sync(self, workers: Optional[int] = None) -> Dict[str, int]:
+        """
+        前回から変化したディレクトリだけを取り込む。
+
+        インデックスが空なら workers（既定は LOAD_WORKERS）個のプロセスで並列に読み込む。
+        """
+        stats = {"dirs": 0, "added": 0, "removed": 0}
+        if not self.root.exists():
+            return stats
+        with self._lock, self.conn:
+            known = {
+                path: (parent, mtime_ns)
+                for path, parent, mtime_ns in self.conn.execute("SELECT path, parent, mtime_ns FROM dirs")
+            }
+            if not known:
+                self._preload(LOAD_WORKERS if workers is None else workers, stats)
+                known = {
+                    path: (parent, mtime_ns)
+                    for path, parent, mtime_ns in self.conn.execute("SELECT path, parent, mtime_ns FROM dirs")
+                }
+            self._scan_dir(".", known, stats)
+            self._scan_segments(stats)
+        if stats["added"] or stats["removed"]:
+            logger.info("Particle index synced: %s", stats)
+        return stats
+
+    def rebuild(self, workers: Optional[int] = None) -> Dict[str, int]:
+        """インデックスを破棄してツリー全体から作り直す。"""
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM particles")
+            self.conn.execute("DELETE FROM dirs")
+            self.conn.execute("DELETE FROM segments")
+            self._bump_generation()
+        return self.sync(workers)
+
+    # ---- read -------------------------------------------------------------
+    def _record(self, row: Tuple[Any, ...]) -> Particle:
+        """
+        インデックスの 1 行（seq + _COLUMNS）を Particle に戻す（V1 の本文は持たない）。
+
+        status / intent_category / reviewer / parent_commit（とセグメントのパス）は種類が少ないので intern し、
+        大量に読んでも文字列を共有させる。
+        """
+        (seq, path, offset, length, _dir, name, commit_id, parent_commit, score, status,
+         intent_category, intent_details, created_at, reviewer, digest) = row
+        return Particle(
+            commit_id, score, sys.intern(status), sys.intern(intent_category), intent_details,
+            None if parent_commit is None else sys.intern(parent_commit), created_at,
+            None if reviewer is None else sys.intern(reviewer), digest,
+            path=sys.intern(str(self.root / path)) if offset >= 0 else str(self.root / path),
+            name=name, offset=offset, length=length, seq=seq,
+        )
+
+    def iter_records(self, pattern: str = "*.json", since: int = 0) -> Iterator[Particle]:
+        """ファイル名が pattern（glob）に一致し、seq が since より大きい粒子を登録順に返す。"""
+        with self._lock:
+            rows = self.conn.execute(
+                f"SELECT seq, {', '.join(_COLUMNS)} FROM particles WHERE name GLOB ? AND seq > ? ORDER BY seq",
+                (pattern, since),
+            ).fetchall()
+        for row in rows:
+            yield self._record(row)
+
+    def records(self, pattern: str = "*.json", since: int = 0) -> List[Particle]:
+        return list(self.iter_records(pattern, since))
+
+    def get(self, commit_id: str) -> Optional[Particle]:
+        with self._lock:
+            row = self.conn.execute(
+                f"SELECT seq, {', '.join(_COLUMNS)} FROM particles WHERE commit_id = ? LIMIT 1", (commit_id,)
+            ).fetchone()
+        return None if row is None else self._record(row)
+
+    def load(self, commit_id: str) -> Optional[Dict[str, Any]]:
+        """Commit ID から V1 粒子の全体を読み出す（JSON ファイル・セグメントのどちらでも）。"""
+        record = self.get(commit_id)
+        if record is None:
+            return None
+        path = Path(record.path)
+        if record.offset < 0:
+            return json.loads(path.read_text(encoding="utf-8"))
+        return read_segment_record(path, record.offset, record.length)
+
+    # ---- lineage ----------------------------------------------------------
+    def children(self, commit_id: str) -> List[Particle]:
+        """Parent Commit が commit_id の粒子（登録順）。"""
+        with self._lock:
+            rows = self.conn.execute(
+                f"SELECT seq, {', '.join(_COLUMNS)} FROM particles WHERE parent_commit = ? ORDER BY seq", (commit_id,)
+            ).fetchall()
+        return [self._record(row) for row in rows]
+
+    def ancestors(self, commit_id: str) -> Tuple[List[Particle], Optional[str]]:
+        """
+        commit_id の粒子から Parent Commit を根まで辿る（深さ分の索引引きだけで済む）。
+
+        (粒子自身を先頭にした祖先のリスト, インデックスに無い最上位の Parent Commit) を返す。
+        粒子自身が無ければ ([], commit_id)。循環していればそこで止める。
+        """
+        chain: List[Particle] = []
+        seen = set()
+        current: Optional[str] = commit_id
+        while current is not None and current not in seen:
+            seen.add(current)
+            record = self.get(current)
+            if record is None:
+                return chain, current
+            chain.append(record)
+            current = record.parent_commit
+        return chain, None
+
+    def descendants(self, commit_id: str, max_depth: int = LINEAGE_MAX_DEPTH) -> List[Tuple[int, Particle]]:
+        """
+        commit_id の子孫を再帰 CTE で 1 回の問い合わせで集める（深さ順、同じ深さは登録順）。
+
+        commit_id からの深さ（子が 1）と粒子の組で返す。
+        """
+        with self._lock:
+            rows = self.conn.execute(
+                f"""
+                WITH RECURSIVE sub(commit_id, depth) AS (
+                    SELECT ?, 0
+                    UNION
+                    SELECT p.commit_id, sub.depth + 1
+                    FROM particles AS p JOIN sub ON p.parent_commit = sub.commit_id
+                    WHERE sub.depth < ?
+                )
+                SELECT MIN(sub.depth), p.seq, {', '.join('p.' + c for c in _COLUMNS)}
+                FROM sub JOIN particles AS p ON p.commit_id = sub.commit_id
+                WHERE sub.depth > 0
+                GROUP BY p.seq
+                ORDER BY 1, p.seq
+                """,
+                (commit_id, max_depth),
+            ).fetchall()
+        return [(depth, self._record(tuple(row))) for depth, *row in rows]
+
+    def find_content(self, digest: str) -> Optional[Particle]:
+        """content_hash が digest の粒子のうち最初に登録されたもの（無ければ None）。"""
+        with self._lock:
+            row = self.conn.execute(
+                f"SELECT seq, {', '.join(_COLUMNS)} FROM particles WHERE content_hash = ? ORDER BY seq LIMIT 1",
+                (digest,),
+            ).fetchone()
+        return None if row is None else self._record(row)
+
+    def add_duplicates(self, counts: Dict[str, int]) -> None:
+        """書き出さずに済ませた（または compact で消した）重複の件数を content_hash ごとに足す。"""
+        now = datetime.now(timezone.utc).isoformat()
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "INSERT INTO duplicates (content_hash, count, last_seen) VALUES (?, ?, ?) "
+                "ON CONFLICT(content_hash) DO UPDATE SET count = count + excluded.count, last_seen = excluded.last_seen",
+                [(digest, n, now) for digest, n in counts.items() if n],
+            )
+
+    def duplicate_counts(self) -> Dict[str, int]:
+        """content_hash → 書き出さなかった重複の件数（粒子 1 件あたりの出現回数は 1 + この値）。"""
+        with self._lock:
+            return dict(self.conn.execute("SELECT content_hash, count FROM duplicates"))
+
+    def duplicate_groups(self) -> Iterator[List[Particle]]:
+        """同じ content_hash の粒子が 2 件以上索引されているグループを、登録順のリストで返す。"""
+        with self._lock:
+            rows = self.conn.execute(
+                f"SELECT seq, {', '.join(_COLUMNS)} FROM particles WHERE content_hash IN ("
+                " SELECT content_hash FROM particles WHERE content_hash IS NOT NULL"
+                " GROUP BY content_hash HAVING COUNT(*) > 1"
+                ") ORDER BY content_hash, seq"
+            ).fetchall()
+        group: List[Particle] = []
+        for row in rows:
+            record = self._record(row)
+            if group and group[0].content_hash != record.content_hash:
+                yield group
+                group = []
+            group.append(record)
+        if group:
+            yield group
+
+    def last_seq(self) -> int:
+        with self._lock:
+            (seq,) = self.conn.execute("SELECT COALESCE(MAX(seq), 0) FROM particles").fetchone()
+        return int(seq)
+
+    def count(self, pattern: str = "*.json") -> int:
+        with self._lock:
+            (n,) = self.conn.execute("SELECT COUNT(*) FROM particles WHERE name GLOB ?", (pattern,)).fetchone()
+        return int(n)
+
+
+_STORES: Dict[Path, ParticleStore] = {}
+_STORES_LOCK = threading.Lock()
+
+
+def open_store(root: Path = PARTICLE_ROOT) -> ParticleStore:
+    """root ごとに 1 つの ParticleStore を共有する（プロセス内キャッシュ）。"""
+    key = Path(os.path.abspath(root))
+    with _STORES_LOCK:
+        store = _STORES.get(key)
+        if store is None:
+            store = _STORES[key] = ParticleStore(Path(root))
+        return store
+
+
+def _describe(record: Particle) -> str:
+    return f"{record.commit_id}  {record.score:.2f} {record.status}  {record.path}"
+
+
+def print_lineage(store: ParticleStore, commit_id: str, max_depth: int = LINEAGE_MAX_DEPTH) -> bool:
+    """commit_id の祖先の鎖（根から）と子孫の木を表示する。粒子も子孫も索引に無ければ False。"""
+    chain, missing_root = store.ancestors(commit_id)
+    descendants = store.descendants(commit_id, max_depth)
+    if not chain and not descendants:
+        print(f"{commit_id}: not found in the particle index")
+        return False
+    # 根から commit_id までの行（索引に無い Parent Commit は名前だけ出す）
+    path = [f"{missing_root}  (not indexed)"] if missing_root is not None else []
+    path += [_describe(record) for record in reversed(chain)]
+    path[-1] += "  <=="
+    lines = [("   " * (depth - 1) + "└─ " if depth else "") + text for depth, text in enumerate(path)]
+
+    children: Dict[str, List[Particle]] = {}
+    for _, record in descendants:
+        children.setdefault(record.parent_commit, []).append(record)
+
+    def walk(parent: str, depth: int, seen: set) -> None:
+        for record in children.get(parent, []):
+            if record.commit_id in seen:
+                continue
+            lines.append("   " * (depth - 1) + "└─ " + _describe(record))
+            walk(record.commit_id, depth + 1, seen | {record.commit_id})
+
+    walk(commit_id, len(path), {commit_id})
+    print("\n".join(lines))
+    print(f"ancestors: {max(0, len(chain) - 1)}  descendants: {len(descendants)}")
+    return True
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="particles/ の SQLite インデックスを管理する。")
+    parser.add_argument("command", choices=["sync", "rebuild", "stats", "lineage"])
+    parser.add_argument("commit_id", nargs="?", help="lineage: 系譜を表示する粒子の Commit ID")
+    parser.add_argument("--depth", type=int, default=LINEAGE_MAX_DEPTH, help="lineage: 表示する子孫の深さ")
+    parser.add_argument("--root", type=Path, default=PARTICLE_ROOT, help="粒子ディレクトリ（既定: particles）")
+    parser.add_argument(
+        "--workers", type=int, default=None, help=f"コールドスタート時の並列ワーカ数（既定: {LOAD_WORKERS}、1 で直列）"
+    )
+    args = parser.parse_args()
+    if args.command == "lineage" and not args.commit_id:
+        parser.error("lineage requires a Commit ID")
+
+    logging.basicConfig(level=logging.INFO, format="[%(levelname)s] %(message)s")
+    with ParticleStore(args.root) as store:
+        if args.command == "lineage":
+            store.sync()
+            if not print_lineage(store, args.commit_id, args.depth):
+                raise SystemExit(1)
+        elif args.command == "sync":
+            print(json.dumps(store.sync(args.workers), ensure_ascii=False))
+        elif args.command == "rebuild":
+            print(json.dumps(store.rebuild(args.workers), ensure_ascii=False))
+        else:
+            store.sync()
+            duplicates = store.duplicate_counts()
+            print(json.dumps(
+                {
+                    "total": store.count(),
+                    "auto": store.count("AUTO_*.json"),
+                    "duplicate_groups": sum(1 for _ in store.duplicate_groups()),
+                    "duplicates_skipped": sum(duplicates.values()),
+                },
+                ensure_ascii=False,
+            ))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+from __future__ import annotations
+"""
+watch.py
+
+particles/ に新しい粒子が来たときだけ処理を起動するウォッチャ（ParticleWatcher）。
+
+変化の検出元は 3 つ：
+
+- Linux では inotify（ctypes 経由、追加の依存なし）で粒子ツリーを再帰的に監視する
+- inotify が使えない環境では poll_interval 秒ごとに ParticleStore.sync() を呼び、新規登録があれば変化とみなす
+- 同じプロセスで書き出した粒子は particle_exporter の post hook から notify() で直接知らせる
+
+変化が続く間は debounce 秒静かになるまで（最長 max_delay 秒まで）待ってから、callback を 1 回だけ呼ぶ。
+何も起きていない間は inotify / 条件変数の待ちでブロックするだけなので、CPU はほぼ使わない。
+
+    python -m ai_core_gpt.watch --root particles   # 変化を検出するたびに件数をログに出す
+"""
+
+import argparse
+import ctypes
+import ctypes.util
+import errno
+import logging
+import os
+import select
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from ai_core_gpt.store import PARTICLE_ROOT, open_store
+
+logger = logging.getLogger(__name__)
+
+DEBOUNCE = 2.0
+MAX_DELAY = 30.0
+POLL_INTERVAL = 5.0
+
+# <linux/inotify.h>
+_IN_MODIFY = 0x00000002
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_DELETE_SELF = 0x00000400
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ISDIR = 0x40000000
+_WATCH_MASK = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE | _IN_DELETE_SELF
+_EVENT = struct.Struct("iIII")
+
+
+def _ignored(name: str) -> bool:
+    """インデックス・列キャッシュなど、集計側が particles/ に書くもの（"_" 始まり）と一時ファイルは無視する。"""
+    return name.startswith("_") or name.startswith(".")
+
+
+class _Inotify:
+    """inotify の薄いラッパ。ディレクトリを再帰的に監視し、粒子の変化があったら on_change() を呼ぶ。"""
+
+    def __init__(self, roots: List[Path], on_change: Callable[[int], None]):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.on_change = on_change
+        self.dirs: Dict[int, Path] = {}
+        self._wake_r, self._wake_w = os.pipe()
+        for root in roots:
+            self._watch_tree(root)
+
+    def _watch(self, path: Path) -> None:
+        wd = self._add_watch(self.fd, os.fsencode(path), _WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err == errno.ENOSPC:
+                raise OSError(err, "inotify watch limit reached (fs.inotify.max_user_watches)")
+            if err != errno.ENOENT:
+                logger.warning("Cannot watch %s: %s", path, os.strerror(err))
+            return
+        self.dirs[wd] = path
+
+    def _watch_tree(self, root: Path) -> int:
+        """root 以下のディレクトリをすべて監視し、既にあるファイル数を返す（監視開始前に書かれた分を拾うため）。"""
+        files = 0
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = [d for d in dirnames if not _ignored(d)]
+            self._watch(Path(dirpath))
+            files += sum(1 for n in filenames if not _ignored(n))
+        return files
+
+    def run(self) -> None:
+        while True:
+            readable, _, _ = select.select([self.fd, self._wake_r], [], [])
+            if self._wake_r in readable:
+                return
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                continue
+            changes = 0
+            pos = 0
+            while pos < len(data):
+                wd, mask, _cookie, length = _EVENT.unpack_from(data, pos)
+                name = data[pos + _EVENT.size:pos + _EVENT.size + length].rstrip(b"\0").decode("utf-8", "replace")
+                pos += _EVENT.size + length
+                if mask & _IN_Q_OVERFLOW:
+                    # キューがあふれた：取りこぼした可能性があるので変化ありとして扱う
+                    changes += 1
+                    continue
+                if mask & _IN_IGNORED:
+                    self.dirs.pop(wd, None)
+                    continue
+                parent = self.dirs.get(wd)
+                if parent is None or (name and _ignored(name)):
+                    continue
+                if mask & _IN_ISDIR:
+                    if mask & (_IN_CREATE | _IN_MOVED_TO):
+                        # 新しい YYYY/MM やシャード。中身が監視前に書かれていても拾えるよう、既存ファイルも数える
+                        changes += self._watch_tree(parent / name)
+                    continue
+                if mask & _IN_CREATE:
+                    # 書き込み途中のファイルは IN_CLOSE_WRITE / IN_MODIFY で数える
+                    continue
+                changes += 1
+            if changes:
+                self.on_change(changes)
+
+    def close(self) -> None:
+        os.write(self._wake_w, b"x")
+
+    def release(self) -> None:
+        for fd in (self.fd, self._wake_r, self._wake_w):
+            os.close(fd)
+
+
+class ParticleWatcher:
+    """
+    粒子ツリーの変化をまとめて callback(changes) に伝える。
+
+    inotify は start() の時点で存在するルートだけを監視する（後から作られたルートはポーリングで拾う必要がある）。
+
+    - start() で監視スレッドを起動し、wait() / run_forever() は呼び出したスレッドで変化を待つ
+    - notify() は同じプロセスからの通知（particle_exporter.add_post_hook(watcher.notify) で登録する）
+    - use_inotify=False（または inotify が使えない環境）では poll_interval 秒ごとの ParticleStore.sync() で検出する
+    """
+
+    def __init__(
+        self,
+        roots: Iterable[Path] = (PARTICLE_ROOT,),
+        debounce: float = DEBOUNCE,
+        max_delay: float = MAX_DELAY,
+        poll_interval: float = POLL_INTERVAL,
+        use_inotify: Optional[bool] = None,
+    ):
+        self.roots = list(dict.fromkeys(Path(os.path.abspath(r)) for r in roots))
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.poll_interval = poll_interval
+        self.use_inotify = use_inotify
+        self.mode = ""
+        self.triggers = 0
+        self._cond = threading.Condition()
+        self._pending = 0
+        self._first = 0.0
+        self._last = 0.0
+        self._stopped = False
+        self._inotify: Optional[_Inotify] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def notify(self, changes: Any = 1) -> None:
+        """変化を 1 件以上知らせる（任意のスレッドから呼べる。粒子パスのリストを渡してもよい）。"""
+        count = len(changes) if isinstance(changes, (list, tuple)) else int(changes)
+        if count <= 0:
+            return
+        with self._cond:
+            now = time.monotonic()
+            if not self._pending:
+                self._first = now
+            self._pending += count
+            self._last = now
+            self._cond.notify()
+
+    def start(self) -> "ParticleWatcher":
+        if self._thread is not None:
+            return self
+        if self.use_inotify is not False:
+            try:
+                self._inotify = _Inotify(self.roots, self.notify)
+            except (OSError, AttributeError) as e:
+                if self.use_inotify:
+                    raise
+                logger.info("inotify unavailable (%s); polling every %.1fs", e, self.poll_interval)
+        if self._inotify is not None:
+            self.mode = "inotify"
+            target: Callable[[], None] = self._inotify.run
+        else:
+            self.mode = "poll"
+            target = self._poll
+        self._thread = threading.Thread(target=target, name="particle-watcher", daemon=True)
+        self._thread.start()
+        logger.info("Watching %s (%s)", ", ".join(map(str, self.roots)), self.mode)
+        return self
+
+    def _poll(self) -> None:
+        stores = [open_store(root) for root in self.roots]
+        while True:
+            with self._cond:
+                if self._cond.wait_for(lambda: self._stopped, self.poll_interval):
+                    return
+            changes = 0
+            for store in stores:
+                try:
+                    stats = store.sync()
+                except Exception:
+                    logger.exception("Failed to poll %s", store.root)
+                    continue
+                changes += stats["added"] + stats["removed"]
+            self.notify(changes)
+
+    def wait(self, timeout: Optional[float] = None) -> int:
+        """
+        変化が来て落ち着くまで待ち、まとめた変化（イベント）の件数を返す。
+
+        timeout 秒たっても何も来なければ 0、stop() 後は -1。変化が来ていれば timeout より debounce を優先する。
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while not self._stopped:
+                now = time.monotonic()
+                if self._pending:
+                    due = min(self._last + self.debounce, self._first + self.max_delay)
+                    if now >= due:
+                        changes, self._pending = self._pending, 0
+                        return changes
+                    wait: Optional[float] = due - now
+                elif deadline is not None:
+                    if now >= deadline:
+                        return 0
+                    wait = deadline - now
+                else:
+                    wait = None
+                self._cond.wait(wait)
+            return -1
+
+    def run_forever(self, callback: Callable[[int], Any]) -> None:
+        """変化が落ち着くたびに callback(changes) を呼ぶ。stop() されるまで戻らない。"""
+        self.start()
+        while True:
+            changes = self.wait()
+            if changes < 0:
+                return
+            self.triggers += 1
+            logger.info("Particle changes detected: %d (trigger #%d)", changes, self.triggers)
+            try:
+                callback(changes)
+            except Exception:
+                logger.exception("Watcher callback failed")
+
+    def stop(self) -> None:
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        if self._inotify is not None:
+            self._inotify.close()
+        if self._thread is not None:
+            self._thread.join(5)
+            self._thread = None
+        if self._inotify is not None:
+            self._inotify.release()
+            self._inotify = None
+
+    def __enter__(self) -> "ParticleWatcher":
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="粒子ツリーの変化を監視する")
+    parser.add_argument("--root", type=Path, action="append", default=None)
+    parser.add_argument("--debounce", type=float, default=DEBOUNCE)
+    parser.add_argument("--poll", action="store_true", help="inotify を使わずポーリングする")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="[%(asctime)s] [%(levelname)s] %(message)s")
+    watcher = ParticleWatcher(args.root or [PARTICLE_ROOT], debounce=args.debounce, use_inotify=False if args.poll else None)
+    try:
+        watcher.run_forever(lambda changes: None)
+    except KeyboardInterrupt:
+        watcher.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+from __future__ import annotations
+"""
+windows.py
+
+直近 1 時間 / 1 日 / 1 週間のスコアを、リングバッファのバケット（件数・スコア合計・promoted 件数）で
+持つローリング集計と、傾向シグナル（EWMA と傾き）。
+
+全期間の平均は古い粒子に引きずられて反応が遅いので、optimizer の推奨はこちらの直近の値と傾向も見る。
+バケットは時刻 // 幅 の番号で上書きしていくため、粒子を 1 件足すのも窓を読むのも件数に依存しない
+（窓の外に出たバケットは読むときに番号で除外し、次にそのスロットを使うときに上書きする）。
+
+    stats = RollingStats()
+    stats.add(ts, score, promoted)          # ts は UNIX 秒。時刻順でなくても窓の中なら正しく入る
+    stats.snapshot(now)                     # {"windows": {"1h": {...}, "1d": {...}, "7d": {...}}, "ewma": ..., "slope_per_day": ...}
+"""
+
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from ai_core_gpt.particle import Particle
+
+# (名前, 窓の長さ（秒）, バケット数)
+WINDOWS: Tuple[Tuple[str, int, int], ...] = (
+    ("1h", 3600, 60),
+    ("1d", 86400, 24),
+    ("7d", 7 * 86400, 28),
+)
+# 傾き（1 日あたりのスコア変化）を求める窓
+SLOPE_WINDOW = "1d"
+# EWMA の半減期（秒）
+EWMA_HALFLIFE = 6 * 3600
+
+
+def timestamp_of(record: Particle) -> Optional[float]:
+    """
+    粒子の作成時刻（UNIX 秒）。created_at が無い・読めない粒子は None。
+
+    オフセット無しの created_at は UTC として解釈する（ai_core_gpt.columns の timestamp 列と同じ）。
+    """
+    created_at = record.created_at
+    if not isinstance(created_at, str):
+        return None
+    try:
+        ts = datetime.fromisoformat(created_at.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return ts.timestamp()
+
+
+class RingWindow:
+    """span 秒を buckets 個のバケットに分けたリングバッファ。"""
+
+    __slots__ = ("span", "width", "epochs", "counts", "sums", "promoted")
+
+    def __init__(self, span: int, buckets: int):
+        self.span = span
+        self.width = span / buckets
+        self.epochs: List[int] = [-1] * buckets
+        self.counts: List[int] = [0] * buckets
+        self.sums: List[float] = [0.0] * buckets
+        self.promoted: List[int] = [0] * buckets
+
+    def add(self, ts: float, score: float, promoted: bool) -> bool:
+        """バケットに足す。スロットにより新しいバケットが入っている（窓から外れた古い粒子）なら False。"""
+        epoch = int(ts // self.width)
+        slot = epoch % len(self.epochs)
+        current = self.epochs[slot]
+        if current != epoch:
+            if current > epoch:
+                return False
+            self.epochs[slot] = epoch
+            self.counts[slot] = 0
+            self.sums[slot] = 0.0
+            self.promoted[slot] = 0
+        self.counts[slot] += 1
+        self.sums[slot] += score
+        self.promoted[slot] += promoted
+        return True
+
+    def buckets(self, now: float) -> List[Tuple[float, int, float, int]]:
+        """窓の中のバケットを (開始時刻, 件数, スコア合計, promoted 件数) で古い順に返す（空のバケットは除く）。"""
+        last = int(now // self.width)
+        first = last - len(self.epochs) + 1
+        out = [
+            (epoch * self.width, c, s, p)
+            for epoch, c, s, p in zip(self.epochs, self.counts, self.sums, self.promoted)
+            if first <= epoch <= last and c
+        ]
+        out.sort()
+        return out
+
+    def totals(self, now: float) -> Dict[str, Any]:
+        count = score_sum = promoted = 0
+        for _, c, s, p in self.buckets(now):
+            count += c
+            score_sum += s
+            promoted += p
+        return {
+            "count": count,
+            "avg_score": score_sum / count if count else None,
+            "promoted_ratio": promoted / count if count else None,
+        }
+
+    def slope(self, now: float) -> Optional[float]:
+        """バケット平均スコアの件数重み付き最小二乗の傾き（1 日あたり）。バケットが 2 つ未満なら None。"""
+        points = [(start + self.width / 2, c, s / c) for start, c, s, _ in self.buckets(now)]
+        if len(points) < 2:
+            return None
+        weight = sum(c for _, c, _ in points)
+        mean_t = sum(t * c for t, c, _ in points) / weight
+        mean_y = sum(y * c for _, c, y in points) / weight
+        var = sum(c * (t - mean_t) ** 2 for t, c, _ in points)
+        if var == 0:
+            return None
+        cov = sum(c * (t - mean_t) * (y - mean_y) for t, c, y in points)
+        return cov / var * 86400
+
+
+class Ewma:
+    """
+    時間減衰つきの指数加重平均。
+
+    halflife 秒たつごとに過去の粒子の重みが半分になる（同じ時刻の粒子はどれも同じ重み）。
+    重み付き合計と重みの合計を持つので、件数の多い時間帯に偏らず、窓を持たなくても直近ほど強く効く。
+    """
+
+    __slots__ = ("halflife", "total", "weight", "last")
+
+    def __init__(self, halflife: float = EWMA_HALFLIFE):
+        self.halflife = halflife
+        self.total = 0.0
+        self.weight = 0.0
+        self.last: Optional[float] = None
+
+    @property
+    def value(self) -> Optional[float]:
+        return self.total / self.weight if self.weight else None
+
+    def add(self, ts: float, x: float) -> None:
+        if self.last is None:
+            self.last = ts
+        if ts > self.last:
+            decay = 0.5 ** ((ts - self.last) / self.halflife)
+            self.total *= decay
+            self.weight *= decay
+            self.last = ts
+            w = 1.0
+        else:
+            # 最新より前の粒子（順不同の取り込み）は、その分だけ減衰させて足す
+            w = 0.5 ** ((self.last - ts) / self.halflife)
+        self.total += w * x
+        self.weight += w
+
+
+class RollingStats:
+    """WINDOWS の各窓と EWMA をまとめて更新し、推奨計算に渡すシグナルを返す。"""
+
+    def __init__(self, windows: Sequence[Tuple[str, int, int]] = WINDOWS, halflife: float = EWMA_HALFLIFE):
+        self.windows = {name: RingWindow(span, buckets) for name, span, buckets in windows}
+        self.ewma = Ewma(halflife)
+        self.latest: Optional[float] = None
+        self.skipped = 0
+
+    def add(self, ts: float, score: float, promoted: bool) -> None:
+        for window in self.windows.values():
+            window.add(ts, score, promoted)
+        self.ewma.add(ts, score)
+        self.latest = ts if self.latest is None else max(self.latest, ts)
+
+    def add_record(self, record: Particle) -> None:
+        ts = timestamp_of(record)
+        if ts is None:
+            self.skipped += 1
+            return
+        self.add(ts, record.score, record.status == "promoted")
+
+    def add_series(self, timestamps: Iterable[float], scores: Iterable[float], promoted: Iterable[bool]) -> None:
+        """時刻順に並べた列（列キャッシュの timestamp / score / status から作ったものなど）をまとめて足す。"""
+        for ts, score, flag in zip(timestamps, scores, promoted):
+            self.add(ts, score, flag)
+
+    def snapshot(self, now: float) -> Dict[str, Any]:
+        slope_window = self.windows.get(SLOPE_WINDOW)
+        return {
+            "at": datetime.fromtimestamp(now, timezone.utc).isoformat(),
+            "windows": {name: window.totals(now) for name, window in self.windows.items()},
+            "ewma": self.ewma.value,
+            "slope_per_day": slope_window.slope(now) if slope_window is not None else None,
+        }
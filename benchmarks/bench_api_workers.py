@@ -0,0 +1,104 @@
+from __future__ import annotations
+"""
+bench_api_workers.py
+
+gpt_api.py を --workers N（pre-fork、ワーカごとのセグメントシャード）で起動して負荷をかけ、
+スループットを比べたうえで、保存された粒子に欠落・重複がないことを確かめる。
+
+各 N について一時ディレクトリ（meta/ をコピー）でサーバを起動し、load_test_api.run() で計測してから
+SIGINT で止め、次を検証する：
+
+- 応答で返った Commit ID がすべて異なる
+- インデックス（N > 1 ではコーディネータが各シャードから取り込んだもの）の Commit ID が応答と一致し、重複がない
+- particles/segments/ のセグメントにも同じ Commit ID が 2 回書かれていない
+
+N = 1 は従来どおりの単一プロセス（files バックエンド）で、比較の基準になる。
+
+    python benchmarks/bench_api_workers.py [--workers 1 2 4] [-c 32] [-n 100]
+"""
+
+import argparse
+import asyncio
+import collections
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from ai_core_gpt.segments import scan_segments  # noqa: E402
+from ai_core_gpt.store import ParticleStore  # noqa: E402
+from load_test_api import _wait_ready, run  # noqa: E402
+
+
+def _verify(root: Path, commit_ids: list) -> None:
+    with ParticleStore(root) as store:
+        indexed = collections.Counter(record.commit_id for record in store.iter_records())
+    segmented = collections.Counter(record.commit_id for record in scan_segments(root))
+    returned = set(commit_ids)
+    print(
+        f"  responses={len(commit_ids):,} unique={len(returned):,} indexed={sum(indexed.values()):,} "
+        f"in_segments={sum(segmented.values()):,} "
+        f"shards={len({p.parent.name for p in (root / 'segments').rglob('*.jsonl')})}"
+    )
+    problems = []
+    if len(returned) != len(commit_ids):
+        problems.append(f"{len(commit_ids) - len(returned)} duplicated Commit IDs in responses")
+    for label, counts in (("index", indexed), ("segments", segmented)):
+        duplicated = [cid for cid, count in counts.items() if count > 1]
+        if duplicated:
+            problems.append(f"{len(duplicated)} duplicated particles in {label}, e.g. {duplicated[:3]}")
+    missing = returned - set(indexed)
+    if missing:
+        problems.append(f"{len(missing)} lost particles, e.g. {sorted(missing)[:3]}")
+    if set(indexed) - returned:
+        problems.append(f"{len(set(indexed) - returned)} unexpected particles")
+    if problems:
+        raise AssertionError("; ".join(problems))
+    print("  ok: no lost or duplicated particles")
+
+
+def bench(workers: int, args: argparse.Namespace) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(tmp)
+        if (REPO_ROOT / "meta").exists():
+            shutil.copytree(REPO_ROOT / "meta", workdir / "meta")
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join([str(REPO_ROOT), os.environ.get("PYTHONPATH", "")]))
+        server = subprocess.Popen(
+            [sys.executable, str(REPO_ROOT / "gpt_api.py"), "--host", args.host, "--port", str(args.port),
+             "--workers", str(workers), "--log-level", "warning"],
+            cwd=workdir,
+            env=env,
+        )
+        try:
+            asyncio.run(_wait_ready(args.host, args.port))
+            print(f"workers={workers}")
+            result = asyncio.run(run(args.host, args.port, args.concurrency, args.requests, True, args.warmup))
+        finally:
+            server.send_signal(signal.SIGINT)
+            server.wait(60)
+        _verify(workdir / "particles", result["commit_ids"])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="multi-worker API throughput and particle integrity benchmark")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("-c", "--concurrency", type=int, default=32, help="同時接続数")
+    parser.add_argument("-n", "--requests", type=int, default=100, help="接続あたりのリクエスト数")
+    parser.add_argument("--warmup", type=int, default=20)
+    args = parser.parse_args()
+    print(f"cpus={os.cpu_count()}")
+    for workers in args.workers:
+        bench(workers, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+from __future__ import annotations
+"""
+bench_intent_classifier.py
+
+True Intent 判定の比較。
+
+- legacy: 以前の _parse_true_intent（カテゴリごとの正規表現を判定順に re.search する）
+- classifier: default_classifier().classify()（意図語彙とタクソノミーだけのトライを 1 回走査）
+- shared: default_matcher() の走査結果に match_intent()（GPTDesign.generate と同じく採点と走査を共有）
+
+長い日本語 / 英語の入力で 1 件あたりの時間を表示し、組み込みのカテゴリ語彙でのカテゴリが
+legacy と一致することも確認する。組み込み語彙にヒットせずタクソノミーのキーワードが 2 つ以上ある入力は、
+新しい判定では General Reflection ではなくタクソノミーのカテゴリになる（件数を表示する）。
+同じ一致確認は tests/test_lexicon.py でも行う。
+最後に、一時ディレクトリの category_taxonomy.json を書き換えて自動で再コンパイルされることを確かめる。
+
+    python benchmarks/bench_intent_classifier.py [--length 10000] [--corpus 20000]
+"""
+
+import argparse
+import json
+import random
+import re
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from ai_core_gpt.lexicon import (  # noqa: E402
+    DEFAULT_INTENT,
+    INTENT_CATEGORIES,
+    INTENT_PREFIX,
+    IntentClassifier,
+    default_classifier,
+    default_matcher,
+    intent_lexicons,
+    match_intent,
+)
+
+# 以前の gpt_design._parse_true_intent のカテゴリ判定
+LEGACY_RULES = (
+    ("Operational Automation", r"(自動|定期|スケジュール|毎|周期)"),
+    ("Evidence Integration", r"(URL|https?://|値|データ|根拠|出典|証拠)"),
+    ("Reliability Framework", r"(信頼度|スコア|評価基準|threshold|Reliability)"),
+    ("Meta Evaluation", r"(EVAL|自己検証|meta|評価結果|再採点)"),
+)
+
+
+def legacy_intent(text: str) -> str:
+    for category, pattern in LEGACY_RULES:
+        if re.search(pattern, text, re.IGNORECASE):
+            return category
+    return DEFAULT_INTENT
+
+
+FILLER_JA = "本日の議事録を要約して、今後の方針について関係者と検討します。"
+FILLER_EN = "The quick brown fox jumps over the lazy dog while the team discusses plans. "
+BUILTIN_WORDS = [phrase for _, phrases in INTENT_CATEGORIES for phrase in phrases]
+TAXONOMY_WORDS = ["automation", "batch", "schedule", "score", "criteria", "citation", "doi", "data", "eval", "trend"]
+FRAGMENTS = ["要点: ", "について教えて", "the plan", "次の手順", "with ", "。", " ", "ok"]
+
+
+def long_inputs(length: int):
+    def fill(filler: str, tail: str = "") -> str:
+        body = filler * (length // len(filler) + 1)
+        return body[: length - len(tail)] + tail
+
+    return [
+        ("ja-none", fill(FILLER_JA)),
+        ("ja-late", fill(FILLER_JA, "評価結果を再採点して")),
+        ("en-none", fill(FILLER_EN)),
+        ("en-late", fill(FILLER_EN, " please raise the Reliability threshold")),
+        ("en-taxonomy", fill(FILLER_EN, " nightly batch automation")),
+        ("mixed", fill(FILLER_JA + FILLER_EN, " 定期 schedule")),
+    ]
+
+
+def random_corpus(n: int, seed: int = 0) -> List[str]:
+    rng = random.Random(seed)
+    words = BUILTIN_WORDS + TAXONOMY_WORDS + FRAGMENTS * 3
+    texts = []
+    for _ in range(n):
+        parts = [rng.choice(words) for _ in range(rng.randint(0, 6))]
+        text = "".join(p.upper() if rng.random() < 0.2 else p for p in parts)
+        texts.append(text)
+    return texts
+
+
+def _per_call(fn: Callable[[str], str], text: str, budget: float = 0.2) -> float:
+    fn(text)
+    calls = 0
+    started = time.perf_counter()
+    while True:
+        fn(text)
+        calls += 1
+        elapsed = time.perf_counter() - started
+        if elapsed >= budget:
+            return elapsed / calls
+
+
+def check_equivalence(texts: List[str]) -> None:
+    # 組み込み語彙だけの分類器は legacy と全件一致する
+    builtin = IntentClassifier([lx for lx in intent_lexicons() if lx.name.startswith(INTENT_PREFIX)])
+    classifier = default_classifier()
+    matcher = default_matcher()
+    fallback = 0
+    for i, text in enumerate(texts):
+        expected = legacy_intent(text)
+        got = builtin.classify(text).category
+        if got != expected:
+            raise AssertionError(f"built-in rules mismatch at {i} {text!r}: {got} != {expected}")
+        full = classifier.classify(text)
+        if full.category != match_intent(matcher.scan(text)).category:
+            raise AssertionError(f"classifier and shared scan disagree at {i} {text!r}")
+        if expected != DEFAULT_INTENT:
+            if full.category != expected:
+                raise AssertionError(f"taxonomy changed a built-in decision at {i} {text!r}: {full.category} != {expected}")
+        elif full.category != DEFAULT_INTENT:
+            fallback += 1
+    print(f"corpus={len(texts):,}  built-in rules identical to legacy; taxonomy fallback decided {fallback:,} General Reflection inputs")
+
+
+def check_recompile() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        meta = Path(tmp)
+        taxonomy = meta / "category_taxonomy.json"
+        taxonomy.write_text(json.dumps({"Meta Evaluation": ["retro", "notes"]}), encoding="utf-8")
+        before = default_classifier(meta).classify("weekly retro notes")
+        taxonomy.write_text(json.dumps({"Operational Automation": ["retro", "notes", "cron"]}), encoding="utf-8")
+        time.sleep(1.1)  # CHECK_INTERVAL
+        after = default_classifier(meta).classify("weekly retro notes")
+    if (before.category, after.category) != ("Meta Evaluation", "Operational Automation"):
+        raise AssertionError(f"taxonomy change not picked up: {before} -> {after}")
+    print(f"recompile: {before.category} -> {after.category} after editing category_taxonomy.json")
+
+
+def run(length: int) -> None:
+    classifier = default_classifier()
+    matcher = default_matcher()
+    impls = {
+        "legacy": legacy_intent,
+        "classifier": lambda t: classifier.classify(t).category,
+        "shared": lambda t: match_intent(matcher.scan(t)).category,
+    }
+    for label, text in long_inputs(length):
+        times = {name: _per_call(fn, text) for name, fn in impls.items()}
+        result = classifier.classify(text)
+        print(
+            f"{label:<12} len={len(text):>6,}  "
+            + "  ".join(f"{name}={sec * 1e6:8.1f}us" for name, sec in times.items())
+            + f"  speedup={times['legacy'] / times['classifier']:4.1f}x  -> {result.category} {result.scores}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="intent classifier benchmark")
+    parser.add_argument("--length", type=int, default=10_000, help="長い入力の文字数")
+    parser.add_argument("--corpus", type=int, default=20_000, help="一致確認に使うランダム入力の件数")
+    args = parser.parse_args()
+    run(args.length)
+    check_equivalence(random_corpus(args.corpus))
+    check_recompile()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+from __future__ import annotations
+"""
+bench_particle_memory.py
+
+集計系が ParticleStore.records() で保持する粒子レコードのメモリ比較（tracemalloc）。
+
+- dict: 以前のレコード形式（インデックスの 1 行を列名 → 値の dict にしたもの）
+- Particle: __slots__ 付きの Particle（status / intent_category / reviewer / parent_commit は intern 済み）
+
+どちらも同じインデックスの全行を読み、保持しているメモリ（current）とピークを 1 件あたり・100 万件あたりに
+換算して表示する。インデックスは一時ディレクトリに particles/YYYY/MM/<Commit ID>.json の配置で
+（ファイルは書かずに add_many() で）登録する。
+
+    python benchmarks/bench_particle_memory.py [--sizes 100000 1000000]
+"""
+
+import argparse
+import gc
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from ai_core_gpt.particle import Particle  # noqa: E402
+from ai_core_gpt.store import _COLUMNS, ParticleStore  # noqa: E402
+
+STATUSES = ("promoted", "record_only")
+CATEGORIES = ("Operational Automation", "Evidence Integration", "Reliability Framework", "General Reflection")
+
+
+def _build_index(root: Path, n: int, seed: int = 0, chunk: int = 10_000) -> ParticleStore:
+    rng = random.Random(seed)
+    start = datetime(2025, 11, 1)
+    root.mkdir(parents=True)
+    store = ParticleStore(root)
+    for first in range(0, n, chunk):
+        items = []
+        for i in range(first, min(n, first + chunk)):
+            commit_id = f"AUTO_20251101_000000_{i:06x}"
+            score = round(rng.random(), 3)
+            particle = Particle(
+                commit_id=commit_id,
+                score=score,
+                status=rng.choice(STATUSES),
+                intent_category=rng.choice(CATEGORIES),
+                intent_details=f"要点: ベンチマーク {i}",
+                parent_commit="DESIGN_V1.0_001",
+                reviewer="gpt-design",
+                raw_text="信頼度の計算方針",
+                score_history=[{"version": "DESIGN-1.1", "score": score, "timestamp": (start + timedelta(seconds=i)).isoformat()}],
+                conflict_status="pending",
+            )
+            items.append((root / "2025" / "11" / f"{commit_id}.json", particle.to_v1_dict()))
+        store.add_many(items)
+    return store
+
+
+def dict_records(store: ParticleStore) -> List[Dict[str, Any]]:
+    """以前の ParticleStore._record() と同じ dict のリスト。"""
+    rows = store.conn.execute(f"SELECT seq, {', '.join(_COLUMNS)} FROM particles ORDER BY seq").fetchall()
+    records = []
+    for row in rows:
+        record = dict(zip(("seq",) + _COLUMNS, row))
+        del record["dir"]
+        record["path"] = str(store.root / record["path"])
+        records.append(record)
+    return records
+
+
+def particle_records(store: ParticleStore) -> List[Particle]:
+    return store.records()
+
+
+def _measure(fn: Callable[[ParticleStore], List[Any]], store: ParticleStore) -> Tuple[int, float, int, int]:
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    records = fn(store)
+    elapsed = time.perf_counter() - started
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    n = len(records)
+    del records
+    return n, elapsed, current, peak
+
+
+def run(n: int, workdir: Path) -> None:
+    store = _build_index(workdir / f"particles-{n}", n)
+    try:
+        baseline = None
+        for fn in (dict_records, particle_records):
+            count, elapsed, current, peak = _measure(fn, store)
+            if count != n:
+                raise AssertionError(f"{fn.__name__} returned {count} records, expected {n}")
+            per = current / n
+            note = "" if baseline is None else f"  ({baseline / current:.1f}x smaller)"
+            baseline = baseline or current
+            print(
+                f"n={n:>9,}  {fn.__name__:<17} {elapsed:6.2f}s  {per:7.0f} B/particle  "
+                f"{per * 1_000_000 / 1e6:8.1f} MB per 1M  peak={peak / 1e6:8.1f} MB{note}"
+            )
+    finally:
+        store.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="particle record memory benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000])
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.sizes:
+            run(n, Path(tmp))
+
+
+if __name__ == "__main__":
+    main()
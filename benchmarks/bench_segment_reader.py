@@ -0,0 +1,130 @@
+from __future__ import annotations
+"""
+bench_segment_reader.py
+
+セグメントからスコア・status・意図カテゴリを集計するときのピークメモリ（tracemalloc）と時間の比較。
+
+- load_all: 各行を json.loads して dict のリストを作ってから集計（従来のローダと同じ形）
+- json_stream: 1 行ずつ json.loads して集計（dict は都度捨てる）
+- mmap_scan: scan_segment() で Raw Text をデコードせずに集計
+
+mmap_scan のピークは件数によらずほぼ一定になる。
+
+    python benchmarks/bench_segment_reader.py [--sizes 10000 100000] [--text-bytes 1000]
+"""
+
+import argparse
+import json
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from ai_core_gpt.segments import scan_segment  # noqa: E402
+from ai_core_gpt.store import encode_segment_record  # noqa: E402
+
+STATUSES = ("promoted", "record_only")
+CATEGORIES = ("Operational Automation", "Evidence Integration", "Reliability Framework", "General Reflection")
+
+
+def _write_segment(path: Path, n: int, text_bytes: int, seed: int = 0) -> None:
+    rng = random.Random(seed)
+    now = datetime(2025, 11, 1).isoformat()
+    with path.open("wb") as f:
+        for i in range(n):
+            commit_id = f"AUTO_20251101_000000_{i:06x}"
+            score = round(rng.random(), 3)
+            particle = {
+                "Commit ID": commit_id,
+                "Parent Commit": "DESIGN_V1.0_001",
+                "True Intent": {"Category": rng.choice(CATEGORIES), "Details": "要点: ベンチマーク"},
+                "Reliability Score": score,
+                "Raw Text": "信頼度 \"quoted\" text\n" * (text_bytes // 24 + 1),
+                "Context ID": "CTX_20251101000000",
+                "Processing Outcome": rng.choice(STATUSES),
+                "Evidence Sources": [],
+                "Reviewer": "gpt-design",
+                "Score History": [{"version": "DESIGN-1.1", "score": score, "timestamp": now}],
+                "Conflict Status": "pending",
+            }
+            f.write(encode_segment_record(f"{commit_id}.json", particle))
+
+
+Summary = Tuple[int, float, Dict[str, int]]
+
+
+def _fold(rows) -> Summary:
+    count, total = 0, 0.0
+    statuses: Dict[str, int] = {}
+    for score, status, _category in rows:
+        count += 1
+        total += score
+        statuses[status] = statuses.get(status, 0) + 1
+    return count, total, statuses
+
+
+def load_all(path: Path) -> Summary:
+    with path.open("rb") as f:
+        particles = [json.loads(line.partition(b"\t")[2]) for line in f]
+    return _fold(
+        (p["Reliability Score"], p["Processing Outcome"], p["True Intent"]["Category"]) for p in particles
+    )
+
+
+def json_stream(path: Path) -> Summary:
+    with path.open("rb") as f:
+        rows = (json.loads(line.partition(b"\t")[2]) for line in f)
+        return _fold((p["Reliability Score"], p["Processing Outcome"], p["True Intent"]["Category"]) for p in rows)
+
+
+def mmap_scan(path: Path) -> Summary:
+    return _fold((r.score, r.status, r.intent_category) for r in scan_segment(path))
+
+
+def _measure(fn: Callable[[Path], Summary], path: Path) -> Tuple[Summary, float, int]:
+    started = time.perf_counter()
+    result = fn(path)
+    elapsed = time.perf_counter() - started
+    tracemalloc.start()
+    fn(path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def run(n: int, text_bytes: int, workdir: Path) -> None:
+    path = workdir / f"seg-{n}.jsonl"
+    _write_segment(path, n, text_bytes)
+    size_mb = path.stat().st_size / 1e6
+    expected = None
+    for fn in (load_all, json_stream, mmap_scan):
+        result, elapsed, peak = _measure(fn, path)
+        if expected is None:
+            expected = result
+        elif result[0] != expected[0] or result[2] != expected[2] or abs(result[1] - expected[1]) > 1e-6:
+            raise AssertionError(f"{fn.__name__} mismatch: {result} != {expected}")
+        print(
+            f"n={n:>9,} ({size_mb:8.1f} MB)  {fn.__name__:<12} {elapsed:7.2f}s  "
+            f"{n / elapsed:>10,.0f}/s  peak={peak / 1e6:9.2f} MB"
+        )
+    path.unlink()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="segment reader memory benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--text-bytes", type=int, default=1000, help="Raw Text のおおよそのバイト数")
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.sizes:
+            run(n, args.text_bytes, Path(tmp))
+
+
+if __name__ == "__main__":
+    main()
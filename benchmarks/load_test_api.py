@@ -0,0 +1,154 @@
+from __future__ import annotations
+"""
+load_test_api.py
+
+gpt_api.py の POST /generate に並列でリクエストを送り、レイテンシ分布（p50 / p90 / p99 / max）と
+スループットを表示するローカル負荷試験。標準ライブラリ（asyncio の keep-alive 接続）だけで動く。
+
+    python benchmarks/load_test_api.py --spawn                  # uvicorn でサーバを起動して計測
+    python benchmarks/load_test_api.py --port 8000 -c 32 -n 200 # 起動済みのサーバに対して計測
+"""
+
+import argparse
+import asyncio
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+PROMPTS = [
+    "信頼度スコアの計算方針を教えて",
+    "最新の評価手順を要約して（Reliability Framework）",
+    "毎日定期的にデータを集計する手順",
+    "EVAL の再採点結果を確認したい",
+]
+
+
+async def _request(
+    reader: asyncio.StreamReader, writer: asyncio.StreamWriter, host: str, body: bytes
+) -> Tuple[int, bytes]:
+    writer.write(
+        b"POST /generate HTTP/1.1\r\nHost: " + host.encode() + b"\r\nContent-Type: application/json\r\n"
+        b"Content-Length: " + str(len(body)).encode() + b"\r\n\r\n" + body
+    )
+    await writer.drain()
+    status_line = await reader.readline()
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value.strip())
+    payload = await reader.readexactly(length)
+    return int(status_line.split()[1]), payload
+
+
+async def _client(host: str, port: int, count: int, persist: bool, offset: int) -> List[Tuple[float, int, bytes]]:
+    reader, writer = await asyncio.open_connection(host, port)
+    results = []
+    try:
+        for i in range(count):
+            body = json.dumps(
+                {"text": PROMPTS[(offset + i) % len(PROMPTS)], "evidence": {"source": "load-test"}, "persist": persist},
+                ensure_ascii=False,
+            ).encode("utf-8")
+            started = time.perf_counter()
+            status, payload = await _request(reader, writer, host, body)
+            results.append((time.perf_counter() - started, status, payload))
+    finally:
+        writer.close()
+    return results
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    index = min(len(sorted_values) - 1, max(0, int(round(q / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+async def run(host: str, port: int, concurrency: int, requests: int, persist: bool, warmup: int) -> Dict[str, Any]:
+    """
+    計測して結果を表示し、集計値と保存された粒子の Commit ID（応答の particle_meta）を返す。
+
+    commit_ids にはウォームアップ分も含む（保存された粒子の総数と突き合わせるため）。
+    """
+    warmed = await _client(host, port, warmup, persist, 0) if warmup else []
+    started = time.perf_counter()
+    batches = await asyncio.gather(*(_client(host, port, requests, persist, c) for c in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(lat for batch in batches for lat, _, _ in batch)
+    errors = sum(1 for batch in batches for _, status, _ in batch if status != 200)
+    commit_ids = [
+        json.loads(payload)["particle_meta"]["storage_commit_id"]
+        for batch in [warmed, *batches]
+        for _, status, payload in batch
+        if persist and status == 200
+    ]
+    total = len(latencies)
+    print(
+        f"requests={total:,} concurrency={concurrency} errors={errors} "
+        f"throughput={total / elapsed:,.0f} req/s"
+    )
+    print(
+        "latency ms: "
+        + "  ".join(f"p{q:g}={_percentile(latencies, q) * 1000:.2f}" for q in (50, 90, 99))
+        + f"  max={latencies[-1] * 1000:.2f}"
+    )
+    return {
+        "requests": total,
+        "errors": errors,
+        "elapsed": elapsed,
+        "throughput": total / elapsed,
+        "p99": _percentile(latencies, 99),
+        "commit_ids": commit_ids,
+    }
+
+
+async def _wait_ready(host: str, port: int, timeout: float = 20.0) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            _, writer = await asyncio.open_connection(host, port)
+            writer.close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.1)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="POST /generate load test")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("-c", "--concurrency", type=int, default=16, help="同時接続数")
+    parser.add_argument("-n", "--requests", type=int, default=200, help="接続あたりのリクエスト数")
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--no-persist", action="store_true", help="粒子を保存しないリクエストにする")
+    parser.add_argument("--spawn", action="store_true", help="リポジトリ直下で uvicorn gpt_api:app を起動して計測する")
+    args = parser.parse_args()
+
+    server = None
+    if args.spawn:
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "gpt_api:app", "--host", args.host, "--port", str(args.port),
+             "--log-level", "warning"],
+            cwd=REPO_ROOT,
+        )
+    try:
+        asyncio.run(_wait_ready(args.host, args.port))
+        asyncio.run(run(args.host, args.port, args.concurrency, args.requests, not args.no_persist, args.warmup))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,22 @@
-import subprocess, logging, time
-from datetime import datetime, timezone
+import logging
+import sys
 
 logging.basicConfig(filename="final_integration.log", level=logging.INFO, format="[%(asctime)s] %(message)s")
 
-def run_all():
-    steps = [
-        "python particle_exporter.py",
-        "python integration_pipeline/pipeline_controller.py",
-        "python integration_pipeline/optimizer.py",
-        "python gpt_design.py"
-    ]
-    for step in steps:
-        logging.info(f"Running {step}")
-        subprocess.run(step, shell=True)
-        time.sleep(2)
-    logging.info("Final GPT integration pipeline completed successfully.")
+from integration_pipeline.runner import FINAL_STEPS, PipelineRunner  # noqa: E402
+
+def run_all(force=False):
+    # 各ステップは同じプロセスで依存順に実行し、入力が前回から変わっていないステップは省く
+    # （ステップごとの所要時間・キャッシュヒットは構造化ログに出る）
+    report = PipelineRunner(FINAL_STEPS).run_dag(force=force)
+    if report["ok"]:
+        logging.info(f"Final GPT integration pipeline completed successfully ({report['ran']} ran, {report['cache_hits']} cached).")
+    else:
+        failed = [name for name, step in report["steps"].items() if step["status"] in ("failed", "skipped")]
+        logging.error(f"Final GPT integration pipeline finished with failed steps: {failed}")
+    return report
 
 if __name__ == "__main__":
     logging.info("=== Starting Final GPT Integration Cycle ===")
-    run_all()
+    run_all(force="--force" in sys.argv[1:])
     logging.info("=== Integration Complete ===")
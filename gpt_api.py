@@ -1,27 +1,283 @@
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional
+
 from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from ai_core_gpt.design import GPTDesign, policy_from_summary_meta
+from ai_core_gpt.design import GPTDesign
+from ai_core_gpt.response_cache import REUSE_MODES, REUSE_NEW, ResponseCache
+from gpts.meta_sync import PolicyProvider, ReasoningPolicy
+from ai_core_gpt.store import open_store
+import particle_exporter
+from particle_exporter import default_writer, export_kwargs
 import uvicorn
 
-app = FastAPI(title="Hallucination-Safe GPT API", version="1.0")
+logger = logging.getLogger(__name__)
+
+SUMMARY_META = Path("meta/summary_meta.json")
+# /generate/batch のストリーミング時に 1 回の generate_many() で処理する件数
+BATCH_CHUNK = 64
+# マルチワーカ配信でコーディネータが各ワーカのセグメントをインデックスへ取り込む間隔（秒）
+SYNC_INTERVAL = 2.0
+
+
+# meta/summary_meta.json を stat で確かめる間隔（秒）
+POLICY_CHECK_INTERVAL = 1.0
+
+# ポリシーは PolicyProvider がファイルの識別情報ごとにキャッシュし、変わったときだけ GPTDesign を作り直す
+policies = PolicyProvider(SUMMARY_META, check_interval=POLICY_CHECK_INTERVAL)
+_design: Optional[GPTDesign] = None
+# 応答キャッシュ（既定は無効、--cache N で有効）。ポリシーの版はキーに含まれるので GPTDesign を作り直しても共有する
+response_cache: Optional[ResponseCache] = None
+
+
+def _on_policy(policy: ReasoningPolicy) -> None:
+    """ポリシーが変わったら GPTDesign を作り直す（参照を差し替えるだけなので、リクエスト側は待たない）。"""
+    global _design
+    _design = GPTDesign(threshold=policy.threshold, require_evidence=policy.require_evidence, cache=response_cache)
+    logger.info(
+        "Policy loaded: mode=%s threshold=%s require_evidence=%s",
+        policy.mode, policy.threshold, policy.require_evidence,
+    )
+
+
+policies.subscribe(_on_policy)
+
+
+def configure_cache(max_entries: int, ttl: Optional[float] = 300.0, reuse: str = REUSE_NEW) -> Optional[ResponseCache]:
+    """応答キャッシュを設定する（max_entries <= 0 なら無効）。pre-fork 前に呼べば各ワーカが自分のキャッシュを持つ。"""
+    global response_cache
+    response_cache = ResponseCache(max_entries, ttl=ttl, reuse=reuse) if max_entries > 0 else None
+    if _design is not None:
+        _design.cache = response_cache
+    return response_cache
+
+
+def current_design() -> GPTDesign:
+    policies.get()
+    return _design  # type: ignore[return-value]
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    policies.get()
+    yield
+    # 停止時はキューに残った粒子を書き切る
+    await asyncio.get_running_loop().run_in_executor(None, default_writer().close)
+
+
+app = FastAPI(title="Hallucination-Safe GPT API", version="1.1", lifespan=lifespan)
 
 class GenerateRequest(BaseModel):
     text: str
     evidence: dict | None = None
+    persist: bool = True
 
-@app.post("/generate", response_model=dict)
-def generate(req: GenerateRequest):
-    policy = policy_from_summary_meta()
-    gpt = GPTDesign(
-        threshold=getattr(policy, "threshold", 0.9),
-        require_evidence=getattr(policy, "require_evidence", False)
-    )
+
+class BatchItem(BaseModel):
+    text: str
+    evidence: dict | None = None
+
+class BatchRequest(BaseModel):
+    items: List[BatchItem]
+    persist: bool = True
+    stream: bool = False
+
+
+def _is_reference(result: Dict[str, Any]) -> bool:
+    """reuse="reference" のキャッシュヒット（元の粒子を指すだけなので保存しない）。"""
+    return result.get("cache", {}).get("ref") is not None
+
+
+def _attach_meta(result: Dict[str, Any], saved: Path) -> None:
+    result["particle_meta"] = {"storage_commit_id": saved.stem, "saved_path": str(saved)}
+
+
+def _generate_one(gpt: GPTDesign, req: GenerateRequest) -> Dict[str, Any]:
+    """
+    1 件の生成と、粒子を AsyncParticleWriter に積むところまで（キューが満杯なら空くまで待つ）。
+
+    意図推定・採点は CPU を使うので、イベントループではなく executor のスレッドで呼ぶ。
+    """
     result = gpt.generate(req.text, evidence=req.evidence)
+    if req.persist and not _is_reference(result):
+        # 書き込みはバックグラウンドのライタに任せ、積んだ時点で応答する
+        saved = default_writer().submit(**export_kwargs(result["particle"]))
+        _attach_meta(result, saved)
+        gpt.record_persisted(req.text, req.evidence, saved.stem)
     return result
 
+
+def _generate_many(gpt: GPTDesign, items: List[BatchItem], persist: bool) -> List[Dict[str, Any]]:
+    """
+    generate_many() と、粒子をまとめてライタに積むところまで（_generate_one() と同じく executor で呼ぶ）。
+    """
+    results = gpt.generate_many([item.text for item in items], [item.evidence for item in items])
+    if persist:
+        stored = [(item, r) for item, r in zip(items, results) if not _is_reference(r)]
+        if stored:
+            saved = default_writer().submit_many([export_kwargs(r["particle"]) for _, r in stored])
+            for (item, result), path in zip(stored, saved):
+                _attach_meta(result, path)
+                gpt.record_persisted(item.text, item.evidence, path.stem)
+    return results
+
+
+@app.post("/generate", response_model=dict)
+async def generate(req: GenerateRequest):
+    return await asyncio.get_running_loop().run_in_executor(None, _generate_one, current_design(), req)
+
+async def _stream_batch(gpt: GPTDesign, req: BatchRequest) -> AsyncIterator[str]:
+    loop = asyncio.get_running_loop()
+    for start in range(0, len(req.items), BATCH_CHUNK):
+        chunk = req.items[start:start + BATCH_CHUNK]
+        # チャンクごとに executor へ渡し、チャンクの間は他のリクエストを処理できるようにする
+        results = await loop.run_in_executor(None, _generate_many, gpt, chunk, req.persist)
+        for offset, result in enumerate(results):
+            yield json.dumps({"index": start + offset, **result}, ensure_ascii=False) + "\n"
+
+@app.post("/generate/batch")
+async def generate_batch(req: BatchRequest):
+    """
+    複数プロンプトを 1 リクエストで処理する。結果は items と同じ順。
+
+    stream=true なら BATCH_CHUNK 件ずつ処理し、終わった分から NDJSON（1 行 1 結果、"index" 付き）で返す。
+    """
+    gpt = current_design()
+    if req.stream:
+        return StreamingResponse(_stream_batch(gpt, req), media_type="application/x-ndjson")
+    results = await asyncio.get_running_loop().run_in_executor(None, _generate_many, gpt, req.items, req.persist)
+    return {"results": results}
+
+@app.get("/policy")
+async def policy():
+    return policies.describe()
+
+@app.post("/policy/reload")
+async def reload_policy():
+    changed = policies.reload()
+    return {"changed": changed, **policies.describe()}
+
+@app.get("/cache")
+async def cache_stats():
+    if response_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **response_cache.stats()}
+
+@app.post("/cache/clear")
+async def clear_cache():
+    if response_cache is not None:
+        response_cache.clear()
+    return await cache_stats()
+
 @app.get("/")
 def root():
     return {"message": "API ready. Use POST /generate with JSON body."}
 
+def _worker_main(index: int, sock: socket.socket, log_level: str) -> None:
+    """pre-fork ワーカ：自分専用のシャード w<index> に粒子を書き、共有ソケットで受け付ける。"""
+    particle_exporter.configure_worker(f"w{index}")
+    # 端末の Ctrl-C は親（コーディネータ）だけが受け、ワーカは親の SIGTERM で 1 回だけ止める
+    os.setpgrp()
+    server = uvicorn.Server(uvicorn.Config(app, log_level=log_level))
+    server.run(sockets=[sock])
+
+
+def _sync_index(store: Any) -> None:
+    try:
+        store.sync()
+    except Exception:
+        logger.exception("Failed to merge worker segments into the particle index")
+
+
+def serve(host: str = "127.0.0.1", port: int = 8000, workers: int = 1, log_level: str = "info") -> None:
+    """
+    workers 個のプロセスで API を配信する。
+
+    workers > 1 では親プロセスが listen したソケットを fork した各ワーカが共有し（pre-fork）、
+    ワーカ i は particles/segments/w<i>/ にだけ追記する（Commit ID にも _w<i> が付くので重複しない）。
+    親はコーディネータとして SYNC_INTERVAL 秒ごとに ParticleStore.sync() で各シャードをインデックスへ取り込み、
+    SIGINT / SIGTERM でワーカを止めてから最後にもう一度取り込む。
+    """
+    if workers <= 1:
+        uvicorn.run(app, host=host, port=port, log_level=log_level)
+        return
+    if "fork" not in multiprocessing.get_all_start_methods():
+        logger.warning("fork is not available; serving with a single worker")
+        uvicorn.run(app, host=host, port=port, log_level=log_level)
+        return
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    # 受け付けたソケットに引き継がせる（渡したソケットには uvicorn が設定しないため、無いと遅延 ACK で ~40ms 待つ）
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+
+    ctx = multiprocessing.get_context("fork")
+    procs = [ctx.Process(target=_worker_main, args=(i, sock, log_level), name=f"gpt-api-w{i}") for i in range(workers)]
+    for proc in procs:
+        proc.start()
+    logger.info("Serving on http://%s:%d with %d workers (pids: %s)", host, port, workers, [p.pid for p in procs])
+
+    stopping = threading.Event()
+
+    def _stop(signum: int, _frame: Any) -> None:
+        stopping.set()
+
+    signal.signal(signal.SIGINT, _stop)
+    signal.signal(signal.SIGTERM, _stop)
+
+    store = open_store(particle_exporter.PARTICLE_ROOT)
+    try:
+        while not stopping.wait(SYNC_INTERVAL):
+            _sync_index(store)
+            dead = [p for p in procs if not p.is_alive()]
+            if dead:
+                logger.error("Worker exited unexpectedly: %s", [(p.name, p.exitcode) for p in dead])
+                break
+    finally:
+        for proc in procs:
+            if proc.is_alive():
+                os.kill(proc.pid, signal.SIGTERM)
+        deadline = time.monotonic() + 30
+        for proc in procs:
+            proc.join(max(0.0, deadline - time.monotonic()))
+            if proc.is_alive():
+                proc.kill()
+        sock.close()
+        # ワーカが停止時に書き切った分も取り込む
+        _sync_index(store)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Hallucination-Safe GPT API server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1, help="ワーカプロセス数（2 以上で pre-fork / シャード書き込み）")
+    parser.add_argument("--log-level", default="info")
+    parser.add_argument("--cache", type=int, default=0, metavar="N", help="応答キャッシュの最大件数（0 で無効）")
+    parser.add_argument("--cache-ttl", type=float, default=300.0, help="キャッシュの有効期限（秒、0 で無期限）")
+    parser.add_argument("--cache-reuse", choices=REUSE_MODES, default=REUSE_NEW,
+                        help="ヒット時に新しい粒子を作る（new）か元の粒子を指す（reference）か")
+    args = parser.parse_args()
+    logging.basicConfig(level=args.log_level.upper(), format="%(asctime)s %(processName)s %(levelname)s %(message)s")
+    configure_cache(args.cache, ttl=args.cache_ttl or None, reuse=args.cache_reuse)
+    serve(args.host, args.port, args.workers, args.log_level)
+
+
 if __name__ == "__main__":
-    uvicorn.run(app, host="127.0.0.1", port=8000)
+    main()
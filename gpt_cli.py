@@ -1,19 +1,34 @@
 from __future__ import annotations
 import argparse
+import collections
+import itertools
 import json
 import logging
+import sys
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
 
-from gpt_design import GPTDesign, policy_from_summary_meta, export_particle  # type: ignore[attr-defined]
+from gpt_design import GPTDesign, current_policy, export_particle  # type: ignore[attr-defined]
+
+try:
+    from particle_exporter import export_kwargs, export_particles
+except Exception:
+    export_kwargs = export_particles = None  # type: ignore[assignment]
 
 logging.basicConfig(level=logging.INFO, format="[%(levelname)s] %(message)s")
 logger = logging.getLogger(__name__)
 
+# --input モードで 1 回の generate_many() / export_particles() にまとめる件数
+BULK_CHUNK = 256
+# 進捗を stderr に出す間隔（秒）
+PROGRESS_INTERVAL = 1.0
 
-def run_once(prompt: str, evidence_source: Optional[str] = None) -> Dict[str, Any]:
-    # ポリシーを meta/summary_meta.json から読み込み
-    policy = policy_from_summary_meta()
+
+def load_design() -> GPTDesign:
+    # ポリシーを meta/summary_meta.json から読み込み（プロセス内で共有するキャッシュ経由）
+    policy = current_policy()
     logger.info(
         "Policy loaded: mode=%s threshold=%s require_evidence=%s",
         getattr(policy, "mode", "unknown"),
@@ -21,55 +36,194 @@ def run_once(prompt: str, evidence_source: Optional[str] = None) -> Dict[str, An
         getattr(policy, "require_evidence", False),
     )
 
-    gpt = GPTDesign(
+    return GPTDesign(
         threshold=getattr(policy, "threshold", 0.90),
         require_evidence=getattr(policy, "require_evidence", False),
     )
 
-    evidence: Optional[Dict[str, Any]] = None
-    if evidence_source:
-        evidence = {"source": evidence_source}
 
-    result = gpt.generate(prompt, evidence=evidence)
-    reply = result["reply"]
-    evalr = result["evaluation"]
+def _format_result(result: Dict[str, Any], saved_path: Optional[Path]) -> Dict[str, Any]:
     px = result["particle"]
-
-    saved_path: Optional[str] = None
-    storage_commit_id: Optional[str] = None
-
-    if export_particle is not None:
-        out_path = export_particle(
-            text=px["Raw Text"],
-            evaluation={
-                "score": px["Reliability Score"],
-                "status": px["Processing Outcome"],
-            },
-            true_intent=px["True Intent"],
-            evidence_sources=px["Evidence Sources"],
-            parent_commit=px["Parent Commit"],
-        )
-        saved_path = str(out_path)
-        storage_commit_id = Path(out_path).stem
-        logger.info("Particle saved: %s", saved_path)
-    else:
-        logger.warning("export_particle is not available; particle not persisted.")
-
     return {
-        "answer": reply,
-        "evaluation": evalr,
+        "answer": result["reply"],
+        "evaluation": result["evaluation"],
         "true_intent": px["True Intent"],
         "particle_meta": {
             # gpt_design 内部で付与した UUID
             "internal_commit_uuid": px["Commit ID"],
             # 粒子ファイル名 = V1 粒子の 'Commit ID'
-            "storage_commit_id": storage_commit_id,
+            "storage_commit_id": saved_path.stem if saved_path is not None else None,
             "processing_outcome": px["Processing Outcome"],
-            "saved_path": saved_path,
+            "saved_path": str(saved_path) if saved_path is not None else None,
         },
     }
 
 
+def run_once(prompt: str, evidence_source: Optional[str] = None) -> Dict[str, Any]:
+    gpt = load_design()
+
+    evidence: Optional[Dict[str, Any]] = None
+    if evidence_source:
+        evidence = {"source": evidence_source}
+
+    result = gpt.generate(prompt, evidence=evidence)
+
+    saved_path: Optional[Path] = None
+    if export_particle is not None:
+        saved_path = Path(export_particle(**export_kwargs(result["particle"])))  # type: ignore[misc]
+        logger.info("Particle saved: %s", saved_path)
+    else:
+        logger.warning("export_particle is not available; particle not persisted.")
+
+    return _format_result(result, saved_path)
+
+
+# ---- Bulk (--input) -----------------------------------------------------------
+Item = Tuple[str, Optional[Dict[str, Any]]]
+
+_WORKER_DESIGN: Optional[GPTDesign] = None
+
+
+def parse_item(line: str) -> Optional[Item]:
+    """
+    入力 1 行を (prompt, evidence) にする。空行は None。
+
+    JSON オブジェクトなら "text"（または "prompt"）と "evidence"（dict）/ "evidence_source"（ラベル）を読み、
+    JSON 文字列やそれ以外の行はそのままプロンプトとして扱う。
+    "text" / "prompt" のない JSON オブジェクトは ValueError（run_bulk() はその行を飛ばす）。
+    """
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        data = json.loads(line)
+    except ValueError:
+        return line, None
+    if isinstance(data, str):
+        return data, None
+    if not isinstance(data, dict):
+        return line, None
+    prompt = data.get("text", data.get("prompt"))
+    if not isinstance(prompt, str):
+        raise ValueError(f"item has no text: {line[:80]}")
+    evidence = data.get("evidence")
+    if evidence is None and data.get("evidence_source"):
+        evidence = {"source": data["evidence_source"]}
+    return prompt, evidence
+
+
+def _read_items(lines: Iterable[str], progress: "_Progress") -> Iterator[Item]:
+    """入力行を parse_item() で読む。読めない行は行番号つきで警告して飛ばし、progress.skipped に数える。"""
+    for lineno, line in enumerate(lines, 1):
+        try:
+            item = parse_item(line)
+        except ValueError as exc:
+            logger.warning("line %d skipped: %s", lineno, exc)
+            progress.skipped += 1
+            continue
+        if item is not None:
+            yield item
+
+
+def _init_worker() -> None:
+    global _WORKER_DESIGN
+    _WORKER_DESIGN = load_design()
+
+
+def _generate_chunk(items: List[Item]) -> List[Dict[str, Any]]:
+    if _WORKER_DESIGN is None:
+        _init_worker()
+    return _WORKER_DESIGN.generate_many([p for p, _ in items], [e for _, e in items])  # type: ignore[union-attr]
+
+
+def _chunks(items: Iterable[Item], size: int) -> Iterator[List[Item]]:
+    it = iter(items)
+    while True:
+        chunk = list(itertools.islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _generate_chunks(chunks: Iterator[List[Item]], workers: int) -> Iterator[List[Dict[str, Any]]]:
+    """チャンクを順に生成する。workers > 1 ならプロセスプールで先読みし、結果は入力順に返す。"""
+    if workers <= 1:
+        for chunk in chunks:
+            yield _generate_chunk(chunk)
+        return
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        # 入力をすべて積むとメモリを食うので、ワーカ数の 2 倍だけ先に投げておく
+        pending: Deque[Future] = collections.deque()
+        for chunk in chunks:
+            pending.append(pool.submit(_generate_chunk, chunk))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+class _Progress:
+    """処理件数とスループット（items/s）を stderr に出す。"""
+
+    def __init__(self, stream: Optional[TextIO] = None):
+        self.stream = stream or sys.stderr
+        self.started = self.last = time.perf_counter()
+        self.count = 0
+        self.skipped = 0
+
+    def update(self, n: int) -> None:
+        self.count += n
+        now = time.perf_counter()
+        if now - self.last >= PROGRESS_INTERVAL:
+            self.last = now
+            self.stream.write(f"\r{self.count:,} items  {self.count / (now - self.started):,.0f} items/s")
+            self.stream.flush()
+
+    def finish(self) -> None:
+        elapsed = time.perf_counter() - self.started
+        rate = self.count / elapsed if elapsed > 0 else 0.0
+        skipped = f"  ({self.skipped:,} skipped)" if self.skipped else ""
+        self.stream.write(f"\r{self.count:,} items in {elapsed:.2f}s  {rate:,.0f} items/s{skipped}\n")
+        self.stream.flush()
+
+
+def run_bulk(input_path: Path, output_path: Path, workers: int = 1, persist: bool = True) -> int:
+    """
+    input_path の各行（parse_item() を参照）を処理し、run_once() と同じ形の結果を 1 行 1 件で output_path に書く。
+
+    ポリシーは 1 回（workers > 1 ならワーカごとに 1 回）だけ読み込み、BULK_CHUNK 件ずつ
+    generate_many() で処理する。粒子は親プロセスで export_particles() によりチャンクごとに一括保存する。
+    読めない行（parse_item() が ValueError）は警告して飛ばし、最後の進捗行に件数を出す。
+    "-" は標準入出力。戻り値は処理件数。
+    """
+    if persist and export_particles is None:
+        logger.warning("export_particles is not available; particles not persisted.")
+        persist = False
+    # 進捗表示の邪魔にならないよう、保存ログは件数だけにする
+    logging.getLogger("particle_exporter").setLevel(logging.WARNING)
+    src = sys.stdin if str(input_path) == "-" else input_path.open(encoding="utf-8")
+    dst = sys.stdout if str(output_path) == "-" else output_path.open("w", encoding="utf-8")
+    progress = _Progress()
+    try:
+        items = _read_items(src, progress)
+        for results in _generate_chunks(_chunks(items, BULK_CHUNK), workers):
+            saved: List[Optional[Path]] = [None] * len(results)
+            if persist:
+                saved = list(export_particles([export_kwargs(r["particle"]) for r in results]))  # type: ignore[misc]
+            dst.writelines(
+                json.dumps(_format_result(result, path), ensure_ascii=False) + "\n"
+                for result, path in zip(results, saved)
+            )
+            progress.update(len(results))
+    finally:
+        if src is not sys.stdin:
+            src.close()
+        if dst is not sys.stdout:
+            dst.close()
+    progress.finish()
+    return progress.count
+
+
 def main() -> None:
     parser = argparse.ArgumentParser(
         description="Hallucination-resistant GPT CLI (particle-emitting)."
@@ -89,9 +243,38 @@ def main() -> None:
         action="store_true",
         help="結果を JSON で出力する（デフォルト）。",
     )
+    parser.add_argument(
+        "--input",
+        "-i",
+        type=Path,
+        help="プロンプトを 1 行 1 件で並べたファイル（JSONL またはテキスト、- で標準入力）。一括処理する。",
+    )
+    parser.add_argument(
+        "--output",
+        "-o",
+        type=Path,
+        default=Path("-"),
+        help="--input の結果を書く JSONL（既定は標準出力）。",
+    )
+    parser.add_argument(
+        "--workers",
+        "-w",
+        type=int,
+        default=1,
+        help="--input を処理するワーカプロセス数。",
+    )
+    parser.add_argument(
+        "--no-persist",
+        action="store_true",
+        help="--input の粒子を保存しない。",
+    )
 
     args = parser.parse_args()
 
+    if args.input is not None:
+        run_bulk(args.input, args.output, workers=args.workers, persist=not args.no_persist)
+        return
+
     if args.prompt:
         prompt = args.prompt
     else:
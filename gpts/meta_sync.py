@@ -1,9 +1,12 @@
 from __future__ import annotations
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
 import json
 import logging
+import os
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
@@ -28,6 +31,8 @@ def policy_from_summary_meta(path: Optional[Path] = None) -> ReasoningPolicy:
     meta/summary_meta.json からポリシーをロードする。
     - ファイル無し → デフォルト
     - JSON 読み込み失敗 → デフォルト
+
+    呼ぶたびにファイルを読み直す。リクエストごとに呼ぶ経路では current_policy() を使う。
     """
     meta_path = path or SUMMARY_META
 
@@ -65,3 +70,120 @@ def policy_from_summary_meta(path: Optional[Path] = None) -> ReasoningPolicy:
         meta_snapshot=data,
         diagnostic=f"loaded from {meta_path}",
     )
+
+
+# PolicyProvider が stat で変更を確かめる間隔（秒）。0 なら get() のたびに確かめる
+CHECK_INTERVAL = 1.0
+
+
+class PolicyProvider:
+    """
+    policy_from_summary_meta() の結果をファイルの識別情報（inode, mtime, サイズ）ごとにキャッシュする。
+
+    - get() は前回の確認から check_interval 秒たったときだけ stat し、変わっていれば読み直す
+    - 読み直している間、他の呼び出しは待たずに直前のポリシーを返す（初回の読み込みだけは待つ）
+    - 内容が変わったポリシーは subscribe() で登録した関数に渡す（同じ内容なら通知せず、前の値を使い続ける）
+    """
+
+    def __init__(self, path: Optional[Path] = None, check_interval: float = CHECK_INTERVAL):
+        self.path = Path(path or SUMMARY_META)
+        self.check_interval = check_interval
+        self.reloads = 0
+        self.changes = 0
+        self._policy: Optional[ReasoningPolicy] = None
+        self._key: Optional[Tuple[int, int, int]] = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+        self._subscribers: List[Callable[[ReasoningPolicy], Any]] = []
+
+    def _file_key(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            st = self.path.stat()
+        except OSError:
+            return None
+        return st.st_ino, st.st_mtime_ns, st.st_size
+
+    def get(self, revalidate: bool = False) -> ReasoningPolicy:
+        """現在のポリシー。revalidate なら check_interval を待たずにファイルを確かめる。"""
+        policy = self._policy
+        now = time.monotonic()
+        if policy is not None and not revalidate and now - self._checked < self.check_interval:
+            return policy
+        self._checked = now
+        key = self._file_key()
+        if policy is not None and key == self._key:
+            return policy
+        # 読み直し中なら待たずに直前のポリシーを返す
+        if not self._lock.acquire(blocking=policy is None):
+            return policy  # type: ignore[return-value]
+        try:
+            if self._policy is None or self._file_key() != self._key:
+                self._load()
+        finally:
+            self._lock.release()
+        return self._policy  # type: ignore[return-value]
+
+    def reload(self) -> bool:
+        """ファイルを確かめずに読み直す。内容が変わっていたら True。"""
+        with self._lock:
+            return self._load()
+
+    def _load(self) -> bool:
+        # 読む前に stat する（読んでいる間に書き換えられても、次の確認で読み直される）
+        key = self._file_key()
+        policy = policy_from_summary_meta(self.path)
+        self.reloads += 1
+        self._key = key
+        previous = self._policy
+        if previous is not None and policy == previous:
+            return False
+        self._policy = policy
+        self.changes += 1
+        logger.debug("Policy changed: %s", policy.diagnostic)
+        for callback in list(self._subscribers):
+            try:
+                callback(policy)
+            except Exception:
+                logger.exception("Policy subscriber %r failed", callback)
+        return True
+
+    def subscribe(self, callback: Callable[[ReasoningPolicy], Any]) -> Callable[[], None]:
+        """
+        ポリシーが変わるたびに callback(policy) を呼ぶ（読み直したスレッドで呼ぶ）。
+
+        読み込み済みなら登録時に現在のポリシーでも 1 回呼ぶ。戻り値を呼ぶと登録を解除する。
+        """
+        self._subscribers.append(callback)
+        if self._policy is not None:
+            callback(self._policy)
+        return lambda: self._subscribers.remove(callback) if callback in self._subscribers else None
+
+    def describe(self) -> Dict[str, Any]:
+        policy = self.get()
+        return {
+            "mode": policy.mode,
+            "threshold": policy.threshold,
+            "require_evidence": policy.require_evidence,
+            "diagnostic": policy.diagnostic,
+            "reloads": self.reloads,
+            "changes": self.changes,
+        }
+
+
+_PROVIDERS: Dict[Path, PolicyProvider] = {}
+_PROVIDERS_LOCK = threading.Lock()
+
+
+def policy_provider(path: Optional[Path] = None) -> PolicyProvider:
+    """path ごとに 1 つの PolicyProvider を共有する（プロセス内キャッシュ）。"""
+    key = Path(os.path.abspath(path or SUMMARY_META))
+    with _PROVIDERS_LOCK:
+        provider = _PROVIDERS.get(key)
+        if provider is None:
+            provider = _PROVIDERS[key] = PolicyProvider(path)
+        return provider
+
+
+def current_policy(path: Optional[Path] = None) -> ReasoningPolicy:
+    """共有の PolicyProvider からポリシーを返す（リクエストごとの呼び出し用）。"""
+    return policy_provider(path).get()
@@ -1,8 +1,14 @@
 from __future__ import annotations
 from pathlib import Path
-from typing import Any, Dict, Tuple, List
+from typing import Any, Dict, List
 import json
 import datetime
+import sys
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))  # ai_core_gpt をリポジトリ直下から import する
+from ai_core_gpt.analytics import Reducer
+from ai_core_gpt.particle import Particle
+from ai_core_gpt.store import open_store
 
 PARTICLE_ROOT = Path("particles")
 SUMMARY_DIR = Path("summary")
@@ -10,40 +16,37 @@ SUMMARY_DIR.mkdir(parents=True, exist_ok=True)
 OUT_PATH = SUMMARY_DIR / "particles_summary.json"
 
 
-def load_particles() -> List[Tuple[Path, Dict[str, Any]]]:
-    particles: List[Tuple[Path, Dict[str, Any]]] = []
+def load_particles() -> List[Particle]:
+    # インデックス経由で取得する（壊れた JSON はインデックス作成時に除外される）
     if not PARTICLE_ROOT.exists():
-        return particles
-
-    for path in PARTICLE_ROOT.rglob("AUTO_*.json"):
-        try:
-            data = json.loads(path.read_text(encoding="utf-8"))
-            particles.append((path, data))
-        except Exception:
-            # 壊れた JSON は無視
-            continue
-    return particles
+        return []
+    store = open_store(PARTICLE_ROOT)
+    store.sync()
+    return store.records("AUTO_*.json")
 
 
-def main() -> None:
-    particles = load_particles()
-    total = len(particles)
+class SummaryReducer(Reducer):
+    """AUTO_* 粒子の status / intent 別集計（particles_summary.json の中身）。"""
 
-    intents: Dict[str, Dict[str, Any]] = {}
-    status_counts: Dict[str, int] = {}
+    name = "particles_summary"
+    pattern = "AUTO_*.json"
 
-    for path, p in particles:
-        score = float(p.get("Reliability Score", 0.0))
-        status = str(p.get("Processing Outcome", "unknown"))
+    def __init__(self) -> None:
+        self.total = 0
+        self.intents: Dict[str, Dict[str, Any]] = {}
+        self.status_counts: Dict[str, int] = {}
 
-        ti = p.get("True Intent") or {}
-        category = str(ti.get("Category") or "Unknown")
+    def add(self, p: Particle) -> None:
+        score = p.score
+        status = p.status
+        category = p.intent_category
+        self.total += 1
 
         # status 集計
-        status_counts[status] = status_counts.get(status, 0) + 1
+        self.status_counts[status] = self.status_counts.get(status, 0) + 1
 
         # intentごとの集計
-        info = intents.setdefault(
+        info = self.intents.setdefault(
             category,
             {"count": 0, "avg_score": 0.0, "promoted": 0, "record_only": 0},
         )
@@ -54,23 +57,36 @@ def main() -> None:
         elif status == "record_only":
             info["record_only"] += 1
 
-    # 平均スコア計算
-    for cat, info in intents.items():
-        if info["count"]:
-            info["avg_score"] = round(info["avg_score"] / info["count"], 3)
+    def result(self) -> Dict[str, Any]:
+        # 平均スコア計算（集計途中の合計は書き換えない）
+        intents = {cat: dict(info) for cat, info in self.intents.items()}
+        for info in intents.values():
+            if info["count"]:
+                info["avg_score"] = round(info["avg_score"] / info["count"], 3)
+
+        return {
+            "generated_at": datetime.datetime.now().isoformat(),
+            "total_particles": self.total,
+            "status_counts": dict(self.status_counts),
+            "intents": intents,
+        }
 
-    summary = {
-        "generated_at": datetime.datetime.now().isoformat(),
-        "total_particles": total,
-        "status_counts": status_counts,
-        "intents": intents,
-    }
 
-    OUT_PATH.write_text(
+def write_summary(summary: Dict[str, Any], out_path: Path = OUT_PATH) -> Path:
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    out_path.write_text(
         json.dumps(summary, ensure_ascii=False, indent=2),
         encoding="utf-8",
     )
-    print(f"Wrote summary to {OUT_PATH}")
+    print(f"Wrote summary to {out_path}")
+    return out_path
+
+
+def main() -> None:
+    reducer = SummaryReducer()
+    for p in load_particles():
+        reducer.add(p)
+    write_summary(reducer.result())
 
 
 if __name__ == "__main__":
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))  # ai_core_gpt をリポジトリ直下から import する
+from ai_core_gpt.analytics import run_pass
+from ai_core_gpt.store import open_store
+
+import aggregate_particles
+import optimizer
+import pipeline_controller
+
+
+def run_all(repo_root: Path) -> Dict[str, List[Path]]:
+    """
+    粒子インデックスを 1 回だけ走査し、3 つの集計結果をまとめて書き出す。
+
+    - integration_report.json（pipeline_controller.ReportReducer: 全粒子）
+    - summary/particles_summary.json（aggregate_particles.SummaryReducer: AUTO_*）
+    - optimization_summary.json / summary/optimization_summary.json
+      （optimizer.AggregateReducer と直近の窓・傾向の optimizer.WindowReducer: AUTO_*）
+    """
+    store = open_store(repo_root / "particles")
+    report, summary, aggregate, signals = run_pass(
+        store,
+        [
+            pipeline_controller.ReportReducer(),
+            aggregate_particles.SummaryReducer(),
+            optimizer.AggregateReducer(),
+            optimizer.WindowReducer(),
+        ],
+    )
+    return {
+        "integration_report": [pipeline_controller.export_report(report, repo_root / "integration_report.json")],
+        "particles_summary": [
+            aggregate_particles.write_summary(summary, repo_root / "summary" / "particles_summary.json")
+        ],
+        "optimization_summary": optimizer.write_summary(
+            optimizer.build_summary(aggregate, repo_root, signals=signals), repo_root
+        ),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="集計 3 種を 1 回の粒子走査で生成する。")
+    parser.add_argument(
+        "--repo-root",
+        type=Path,
+        default=Path(__file__).resolve().parent.parent,
+        help="particles/ と meta/ を含むリポジトリのルート",
+    )
+    args = parser.parse_args()
+    run_all(args.repo_root)
+
+
+if __name__ == "__main__":
+    main()
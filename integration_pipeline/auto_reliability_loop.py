@@ -1,21 +1,42 @@
-import subprocess, time, logging
-from datetime import datetime
+import argparse
+import logging
+import sys
+import time
+from pathlib import Path
 
 logging.basicConfig(filename="auto_pipeline.log", level=logging.INFO, format="[%(asctime)s] %(message)s")
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))  # integration_pipeline をリポジトリ直下から import する
+from ai_core_gpt.watch import DEBOUNCE, ParticleWatcher  # noqa: E402
+from integration_pipeline.runner import PipelineRunner  # noqa: E402
+
+_runner = None
+
+def _get_runner():
+    # ステップは同じプロセスで関数として実行し、import 済みのモジュールと集計状態をサイクル間で使い回す
+    global _runner
+    if _runner is None:
+        _runner = PipelineRunner()
+    return _runner
+
 def run_pipeline():
-    steps = [
-        "python particle_exporter.py",
-        "python integration_pipeline/pipeline_controller.py",
-        "python integration_pipeline/optimizer.py"
-    ]
-    for step in steps:
-        logging.info(f"Executing: {step}")
-        subprocess.run(step, shell=True)
-        time.sleep(2)
+    cycle = _get_runner().run_cycle()
     logging.info("Cycle complete. Waiting for next iteration...")
+    return cycle
 
 def main():
+    parser = argparse.ArgumentParser(description="Continuous reliability loop.")
+    parser.add_argument("--watch", action="store_true", help="新しい粒子が来たときだけ実行する（既定は 1 時間ごと）")
+    parser.add_argument("--debounce", type=float, default=DEBOUNCE, help="--watch で変化が落ち着くまで待つ秒数")
+    parser.add_argument("--poll", action="store_true", help="--watch で inotify を使わずポーリングする")
+    args = parser.parse_args()
+
+    if args.watch:
+        logging.info("Starting event-driven reliability loop...")
+        runner = _get_runner()
+        runner.watch(ParticleWatcher(runner.particle_roots(), debounce=args.debounce, use_inotify=False if args.poll else None))
+        return
+
     logging.info("Starting continuous reliability loop...")
     while True:
         run_pipeline()
@@ -1,9 +1,31 @@
 from __future__ import annotations
 
+import argparse
 import json
+import logging
+import sys
+import time
 from pathlib import Path
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))  # ai_core_gpt をリポジトリ直下から import する
+from ai_core_gpt.analytics import Reducer
+from ai_core_gpt.columns import Columns, load_columns
+from ai_core_gpt.particle import Particle
+from ai_core_gpt.sketch import ScoreHistogram, ScoreSketches
+from ai_core_gpt.store import open_store
+from ai_core_gpt.windows import RollingStats, timestamp_of
+
+logger = logging.getLogger(__name__)
+
+# threshold を下げてよいかを見る下位の分位点（この割合の粒子が下げた threshold を下回るなら据え置く）
+TAIL_QUANTILE = 0.10
+# 直近の平均・promoted 比率を見る窓（ai_core_gpt.windows.WINDOWS の名前）と、それを使う最小件数
+RECENT_WINDOW = "1d"
+MIN_WINDOW_COUNT = 20
+# 1 日あたりのスコアの傾きがこれ以上下がっていれば「下降傾向」とみなす
+TREND_SLOPE = 0.05
 
 
 def _load_current_policy(meta_dir: Path) -> Dict[str, Any]:
@@ -47,107 +69,50 @@ def _load_current_policy(meta_dir: Path) -> Dict[str, Any]:
     }
 
 
-def _iter_particle_files(particles_root: Path):
-    if not particles_root.exists():
-        return []
-    return list(particles_root.rglob("AUTO_*.json"))
-
-
-def _normalize_particle(raw: Dict[str, Any], path: Path) -> Dict[str, Any]:
+def _load_particles(particles_root: Path, workers: Optional[int] = None) -> List[Particle]:
     """
-    粒子 JSON を内部共通形式に正規化する。
+    AUTO_*.json 粒子をインデックス（ai_core_gpt.store）から Particle として取得する。
 
-    実際のファイルから確認できた形式をカバー：
-    - V1 スキーマ（"Commit ID", "Reliability Score", "Processing Outcome", "True Intent" など）
-    - 旧形式（particle_id + evaluation + true_intent + text）
+    インデックスが空のときは workers 個のプロセスで YYYY/MM ごとに並列に読み込む。
     """
-    # V1 スキーマ（今回のセッションで生成された粒子）
-    if "Reliability Score" in raw:
-        score = float(raw.get("Reliability Score", 0.0))
-        status = str(raw.get("Processing Outcome", "record_only"))
-        true_intent = raw.get("True Intent", {}) or {}
-        intent_cat = str(true_intent.get("Category", "Unknown"))
-        intent_details = str(true_intent.get("Details", ""))
-
-        created_at = None
-        history = raw.get("Score History") or []
-        if history and isinstance(history, list):
-            ts = history[0].get("timestamp")
-            if isinstance(ts, str):
-                created_at = ts
-
-        commit_id = str(raw.get("Commit ID", path.stem))
-        return {
-            "commit_id": commit_id,
-            "score": score,
-            "status": status,
-            "intent_category": intent_cat,
-            "intent_details": intent_details,
-            "created_at": created_at,
-            "path": str(path),
-        }
+    store = open_store(particles_root)
+    store.sync(workers)
+    return store.records("AUTO_*.json")
 
-    # 旧形式（ログに残っている AUTO_1761... など）
-    if "evaluation" in raw and "true_intent" in raw:
-        eval_block = raw.get("evaluation") or {}
-        true_intent = raw.get("true_intent") or {}
-        score = float(eval_block.get("score", 0.0))
-        status = str(eval_block.get("status", "record_only"))
-        intent_cat = str(true_intent.get("Category", "Unknown"))
-        intent_details = str(true_intent.get("Details", ""))
-        created_at = raw.get("created_at")
-        commit_id = str(raw.get("particle_id", path.stem))
-
-        return {
-            "commit_id": commit_id,
-            "score": score,
-            "status": status,
-            "intent_category": intent_cat,
-            "intent_details": intent_details,
-            "created_at": created_at,
-            "path": str(path),
-        }
-
-    # それ以外は最低限の情報だけ残す
-    return {
-        "commit_id": str(raw.get("Commit ID") or raw.get("particle_id") or path.stem),
-        "score": float(raw.get("score", 0.0)),
-        "status": str(raw.get("status", "unknown")),
-        "intent_category": str(raw.get("intent", "Unknown")),
-        "intent_details": "",
-        "created_at": raw.get("created_at"),
-        "path": str(path),
-    }
 
+def _load_columns(particles_root: Path) -> Optional[Columns]:
+    """AUTO_*.json 粒子を列キャッシュ（ai_core_gpt.columns）から取得する。numpy が無ければ None。"""
+    try:
+        cols = load_columns(particles_root)
+    except RuntimeError as e:
+        logger.warning("Column cache unavailable, falling back to the particle index: %s", e)
+        return None
+    return cols.select(cols.where(kind="AUTO"))
 
-def _load_particles(particles_root: Path) -> List[Dict[str, Any]]:
-    particles: List[Dict[str, Any]] = []
-    for fp in _iter_particle_files(particles_root):
-        try:
-            raw = json.loads(fp.read_text(encoding="utf-8"))
-        except Exception:
-            continue
-        norm = _normalize_particle(raw, fp)
-        particles.append(norm)
-    return particles
 
+class AggregateReducer(Reducer):
+    """_aggregate() の Reducer 版（集計エンジンで 1 回の走査にまとめるため）。"""
 
-def _aggregate(particles: List[Dict[str, Any]]) -> Dict[str, Any]:
-    total = len(particles)
-    status_counts: Dict[str, int] = {}
-    intent_stats: Dict[str, Dict[str, Any]] = {}
+    name = "optimization_summary"
+    pattern = "AUTO_*.json"
 
-    total_score = 0.0
+    def __init__(self) -> None:
+        self.total = 0
+        self.total_score = 0.0
+        self.status_counts: Dict[str, int] = {}
+        self.intent_stats: Dict[str, Dict[str, Any]] = {}
+        self.sketches = ScoreSketches()
 
-    for p in particles:
-        score = float(p.get("score", 0.0))
-        status = str(p.get("status", "unknown"))
-        intent = str(p.get("intent_category", "Unknown"))
+    def add(self, p: Particle) -> None:
+        score = p.score
+        status = p.status
+        intent = p.intent_category
 
-        total_score += score
-        status_counts[status] = status_counts.get(status, 0) + 1
+        self.total += 1
+        self.total_score += score
+        self.status_counts[status] = self.status_counts.get(status, 0) + 1
 
-        s = intent_stats.setdefault(
+        s = self.intent_stats.setdefault(
             intent,
             {"count": 0, "score_sum": 0.0, "promoted": 0, "record_only": 0},
         )
@@ -157,36 +122,83 @@ def _aggregate(particles: List[Dict[str, Any]]) -> Dict[str, Any]:
             s["promoted"] += 1
         elif status == "record_only":
             s["record_only"] += 1
+        self.sketches.add(score, intent, status)
+
+    def result(self) -> Dict[str, Any]:
+        total = self.total
+        avg_score = self.total_score / total if total else 0.0
+
+        intents_out: Dict[str, Any] = {}
+        for name, s in self.intent_stats.items():
+            c = s["count"]
+            intents_out[name] = {
+                "count": c,
+                "avg_score": (s["score_sum"] / c) if c else 0.0,
+                "promoted": s["promoted"],
+                "record_only": s["record_only"],
+            }
 
-    avg_score = total_score / total if total else 0.0
-
-    intents_out: Dict[str, Any] = {}
-    for name, s in intent_stats.items():
-        c = s["count"]
-        intents_out[name] = {
-            "count": c,
-            "avg_score": (s["score_sum"] / c) if c else 0.0,
-            "promoted": s["promoted"],
-            "record_only": s["record_only"],
+        return {
+            "total_particles": total,
+            "avg_score": avg_score,
+            "status_counts": dict(self.status_counts),
+            "intents": intents_out,
+            "score_sketches": self.sketches.to_dict(),
         }
 
-    return {
-        "total_particles": total,
-        "avg_score": avg_score,
-        "status_counts": status_counts,
-        "intents": intents_out,
-    }
+
+class WindowReducer(Reducer):
+    """直近 1 時間 / 1 日 / 1 週間の窓と EWMA・傾き（ai_core_gpt.windows.RollingStats）を畳み込む。"""
+
+    name = "optimization_windows"
+    pattern = "AUTO_*.json"
+
+    def __init__(self) -> None:
+        self.stats = RollingStats()
+
+    def add(self, p: Particle) -> None:
+        self.stats.add_record(p)
+
+    def result(self, now: Optional[float] = None) -> Dict[str, Any]:
+        return self.stats.snapshot(time.time() if now is None else now)
+
+
+def _aggregate(particles: List[Particle]) -> Dict[str, Any]:
+    reducer = AggregateReducer()
+    for p in particles:
+        reducer.add(p)
+    return reducer.result()
+
+
+def _signals(particles: List[Particle]) -> Dict[str, Any]:
+    reducer = WindowReducer()
+    for p in particles:
+        reducer.add(p)
+    return reducer.result()
+
+
+def _column_signals(columns: Columns) -> Dict[str, Any]:
+    """列キャッシュの timestamp / score / status 列を時刻順に流して、_signals() と同じシグナルを作る。"""
+    reducer = WindowReducer()
+    seconds, scores, promoted = columns.timeline()
+    reducer.stats.add_series(seconds.tolist(), scores.tolist(), promoted.tolist())
+    return reducer.result()
 
 
 def _recommend_policy(
-    aggregate: Dict[str, Any], current: Dict[str, Any]
+    aggregate: Dict[str, Any], current: Dict[str, Any], signals: Optional[Dict[str, Any]] = None
 ) -> Tuple[Dict[str, Any], str]:
     """
     シンプルなヒューリスティックでポリシー推奨値を計算する。
 
     - 平均スコアが current.threshold よりかなり低い → しきい値を少し上げる
     - 平均スコアが current.threshold よりかなり高い → しきい値を少し下げる
+      （ただし score_sketches の下位 TAIL_QUANTILE 分位点が下げた値を下回るなら据え置く）
     - promoted 比率が極端に低い / 高い場合は mode を調整する
+
+    signals（WindowReducer.result()）の RECENT_WINDOW に MIN_WINDOW_COUNT 件以上あれば、平均スコアと
+    promoted 比率は全期間ではなくその窓の値を使い、傾き（1 日あたり）が -TREND_SLOPE 以下の下降傾向では
+    しきい値を下げず、EWMA が threshold を下回っていれば引き上げ、mode は strict にする。
     """
     total = aggregate.get("total_particles", 0) or 0
     avg_score = float(aggregate.get("avg_score", 0.0))
@@ -196,32 +208,77 @@ def _recommend_policy(
     mode = str(current.get("mode", "strict"))
     require_evidence = bool(current.get("require_evidence", True))
 
+    sketch = (aggregate.get("score_sketches") or {}).get("all")
+    tail = ScoreHistogram.from_dict(sketch).quantile(TAIL_QUANTILE) if sketch else None
+
     promoted = status_counts.get("promoted", 0)
     record_only = status_counts.get("record_only", 0)
     promoted_ratio = promoted / total if total else 0.0
     record_only_ratio = record_only / total if total else 0.0
+    ratio_text = f"promoted 比率 {promoted_ratio:.2%} と record_only 比率 {record_only_ratio:.2%}"
+
+    # 直近の窓と傾向
+    label = "平均スコア"
+    ewma = slope = None
+    trend_text = ""
+    recent = ((signals or {}).get("windows") or {}).get(RECENT_WINDOW) or {}
+    if recent.get("count", 0) >= MIN_WINDOW_COUNT:
+        label = f"直近 {RECENT_WINDOW} の平均スコア"
+        avg_score = float(recent["avg_score"])
+        promoted_ratio = float(recent["promoted_ratio"])
+        ratio_text = f"直近 {RECENT_WINDOW} の promoted 比率 {promoted_ratio:.2%}"
+        ewma, slope = signals.get("ewma"), signals.get("slope_per_day")  # type: ignore[union-attr]
+        trend_text = (
+            f"直近 {RECENT_WINDOW} の {recent['count']} 件: EWMA "
+            + (f"{ewma:.3f}" if ewma is not None else "-")
+            + "、傾き "
+            + (f"{slope:+.3f}/日" if slope is not None else "-")
+            + "。"
+        )
+    falling = slope is not None and slope <= -TREND_SLOPE
 
     # しきい値の調整
     recommended_threshold = current_threshold
     explanation_parts = []
 
+    if trend_text:
+        explanation_parts.append(trend_text)
+
     # current_threshold よりかなり低い（品質が低い）
     if avg_score < current_threshold - 0.05:
         recommended_threshold = min(0.99, current_threshold + 0.05)
         explanation_parts.append(
-            f"平均スコア {avg_score:.3f} が現在の threshold {current_threshold:.3f} より低いため、"
+            f"{label} {avg_score:.3f} が現在の threshold {current_threshold:.3f} より低いため、"
             "しきい値をやや引き上げることを推奨します。"
         )
     # current_threshold よりかなり高い（かなり保守的すぎる）
     elif avg_score > current_threshold + 0.05:
-        recommended_threshold = max(0.7, current_threshold - 0.05)
+        lowered = max(0.7, current_threshold - 0.05)
+        if tail is not None and tail < lowered:
+            explanation_parts.append(
+                f"{label} {avg_score:.3f} は現在の threshold {current_threshold:.3f} を上回っていますが、"
+                f"下位 {TAIL_QUANTILE:.0%} のスコア {tail:.3f} が {lowered:.3f} を下回るため、threshold は現状維持とします。"
+            )
+        elif falling:
+            explanation_parts.append(
+                f"{label} {avg_score:.3f} は現在の threshold {current_threshold:.3f} を上回っていますが、"
+                f"スコアが下降傾向（{slope:+.3f}/日）のため、threshold は現状維持とします。"
+            )
+        else:
+            recommended_threshold = lowered
+            explanation_parts.append(
+                f"{label} {avg_score:.3f} が現在の threshold {current_threshold:.3f} を安定して上回っているため、"
+                "しきい値をやや引き下げる余地があります。"
+            )
+    elif falling and ewma is not None and ewma < current_threshold:
+        recommended_threshold = min(0.99, current_threshold + 0.05)
         explanation_parts.append(
-            f"平均スコア {avg_score:.3f} が現在の threshold {current_threshold:.3f} を安定して上回っているため、"
-            "しきい値をやや引き下げる余地があります。"
+            f"{label} {avg_score:.3f} は現在の threshold {current_threshold:.3f} に近いものの、"
+            f"EWMA {ewma:.3f} が threshold を下回って下降傾向（{slope:+.3f}/日）にあるため、しきい値をやや引き上げることを推奨します。"
         )
     else:
         explanation_parts.append(
-            f"平均スコア {avg_score:.3f} は現在の threshold {current_threshold:.3f} に近いため、"
+            f"{label} {avg_score:.3f} は現在の threshold {current_threshold:.3f} に近いため、"
             "threshold は現状維持を推奨します。"
         )
 
@@ -232,6 +289,11 @@ def _recommend_policy(
         explanation_parts.append(
             f"promoted 比率が低い ({promoted_ratio:.2%}) ため、strict モード継続を推奨します。"
         )
+    elif falling:
+        recommended_mode = "strict"
+        explanation_parts.append(
+            f"スコアが下降傾向（{slope:+.3f}/日）にあるため、strict モードを推奨します。"
+        )
     elif promoted_ratio > 0.7 and avg_score > current_threshold:
         recommended_mode = "balanced"
         explanation_parts.append(
@@ -240,7 +302,7 @@ def _recommend_policy(
         )
     else:
         explanation_parts.append(
-            f"promoted 比率 {promoted_ratio:.2%} と record_only 比率 {record_only_ratio:.2%} は極端ではないため、"
+            f"{ratio_text} は極端ではないため、"
             "mode は現状維持とします。"
         )
 
@@ -268,22 +330,26 @@ def _recommend_policy(
     return recommended, explanation
 
 
-def main() -> None:
-    repo_root = Path(__file__).resolve().parent.parent
-    particles_root = repo_root / "particles"
-    meta_dir = repo_root / "meta"
-    summary_dir = repo_root / "summary"
-    summary_dir.mkdir(parents=True, exist_ok=True)
+def build_summary(
+    aggregate: Dict[str, Any],
+    repo_root: Path,
+    columns: Optional[Columns] = None,
+    signals: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    集計結果と現在のポリシーから optimization_summary.json の中身を作る。
 
+    columns（列キャッシュ）を渡すと、スコアのパーセンタイルと意図別の月次トレンドも含める。
+    集計に score_sketches があれば、意図別・status 別の分位点（score_quantiles）とスケッチ本体も含める。
+    signals（WindowReducer.result()）を渡すと推奨計算に使い、trend_signals として出力する。
+    """
     now = datetime.now(timezone.utc)
-    current_policy = _load_current_policy(meta_dir)
-    particles = _load_particles(particles_root)
-    aggregate = _aggregate(particles)
-    recommended_policy, explanation = _recommend_policy(aggregate, current_policy)
+    current_policy = _load_current_policy(repo_root / "meta")
+    recommended_policy, explanation = _recommend_policy(aggregate, current_policy, signals)
 
     out = {
         "generated_at": now.isoformat(),
-        "particle_source_root": str(particles_root),
+        "particle_source_root": str(repo_root / "particles"),
         "total_particles": aggregate.get("total_particles", 0),
         "avg_score": aggregate.get("avg_score", 0.0),
         "status_counts": aggregate.get("status_counts", {}),
@@ -292,9 +358,23 @@ def main() -> None:
         "recommended_policy": recommended_policy,
         "policy_explanation": explanation,
     }
-
+    if aggregate.get("score_sketches"):
+        # 意図別・status 別の裾（p5 など）と、シャードや期間をまたいでマージできるスケッチ本体
+        out["score_quantiles"] = ScoreSketches.from_dict(aggregate["score_sketches"]).percentiles()
+        out["score_sketches"] = aggregate["score_sketches"]
+    if signals is not None:
+        out["trend_signals"] = signals
+    if columns is not None:
+        out["score_percentiles"] = columns.percentiles()
+        out["intent_trends"] = columns.trends("intent")
+    return out
+
+
+def write_summary(out: Dict[str, Any], repo_root: Path) -> List[Path]:
     # 旧チャットの設計では optimization_summary.json をリポジトリ直下に置いていた。
     # 現在は summary/ も存在するので、両方に書き出して互換性を保つ。
+    summary_dir = repo_root / "summary"
+    summary_dir.mkdir(parents=True, exist_ok=True)
     out_root = repo_root / "optimization_summary.json"
     out_summary = summary_dir / "optimization_summary.json"
 
@@ -303,6 +383,130 @@ def main() -> None:
 
     print(f"Optimization summary written to {out_root}")
     print(f"Optimization summary written to {out_summary}")
+    return [out_root, out_summary]
+
+
+def backtest(
+    particles: List[Particle], current: Dict[str, Any], step_hours: float = 24.0, apply: bool = True
+) -> Dict[str, Any]:
+    """
+    粒子を作成時刻順に再生し、step_hours ごとに窓つきの推奨（signals あり）と全期間だけの推奨を計算する。
+    粒子の来なかった区間は飛ばす。
+
+    apply なら各時点の窓つき推奨（threshold / mode）を次の時点の現在ポリシーにする（運用ループの再現）。
+    作成時刻の無い粒子は再生しない。
+    """
+    timed = sorted(
+        ((ts, p) for ts, p in ((timestamp_of(p), p) for p in particles) if ts is not None),
+        key=lambda item: item[0],
+    )
+    policy = dict(current)
+    reducer = AggregateReducer()
+    windows = WindowReducer()
+    steps: List[Dict[str, Any]] = []
+    step = step_hours * 3600
+
+    def evaluate(now: float) -> None:
+        aggregate = reducer.result()
+        signals = windows.result(now)
+        windowed, _ = _recommend_policy(aggregate, policy, signals)
+        baseline, _ = _recommend_policy(aggregate, policy)
+        recent = signals["windows"][RECENT_WINDOW]
+        steps.append({
+            "at": signals["at"],
+            "particles": aggregate["total_particles"],
+            "avg_score": aggregate["avg_score"],
+            "recent_count": recent["count"],
+            "recent_avg_score": recent["avg_score"],
+            "ewma": signals["ewma"],
+            "slope_per_day": signals["slope_per_day"],
+            "threshold": policy["threshold"],
+            "mode": policy["mode"],
+            "recommended": {"threshold": windowed["threshold"], "mode": windowed["mode"]},
+            "all_time_recommended": {"threshold": baseline["threshold"], "mode": baseline["mode"]},
+        })
+        if apply:
+            policy.update(threshold=windowed["threshold"], mode=windowed["mode"])
+
+    if timed:
+        boundary = (timed[0][0] // step + 1) * step
+        for ts, p in timed:
+            if ts >= boundary:
+                # 前の時点以降に粒子が来た区間の終わりでだけ推奨を計算する（--watch と同じく空の区間では動かさない）
+                evaluate(boundary)
+                boundary = (ts // step + 1) * step
+            reducer.add(p)
+            windows.stats.add(ts, p.score, p.status == "promoted")
+        evaluate(boundary)
+
+    return {
+        "replayed": len(timed),
+        "skipped": len(particles) - len(timed),
+        "step_hours": step_hours,
+        "applied": apply,
+        "initial_policy": {"threshold": current.get("threshold"), "mode": current.get("mode")},
+        "final_policy": {"threshold": policy.get("threshold"), "mode": policy.get("mode")},
+        "diverged_steps": sum(s["recommended"] != s["all_time_recommended"] for s in steps),
+        "steps": steps,
+    }
+
+
+def write_backtest(result: Dict[str, Any], repo_root: Path) -> Path:
+    out = repo_root / "summary" / "optimizer_backtest.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8")
+    for s in result["steps"]:
+        recent = "-" if s["recent_avg_score"] is None else f"{s['recent_avg_score']:.3f}"
+        ewma = "-" if s["ewma"] is None else f"{s['ewma']:.3f}"
+        slope = "-" if s["slope_per_day"] is None else f"{s['slope_per_day']:+.3f}"
+        print(
+            f"{s['at'][:16]}  n={s['particles']:>6}  all={s['avg_score']:.3f}  {RECENT_WINDOW}={recent} ({s['recent_count']})  "
+            f"ewma={ewma}  slope={slope}  -> {s['recommended']['threshold']:.2f}/{s['recommended']['mode']}  "
+            f"(all-time: {s['all_time_recommended']['threshold']:.2f}/{s['all_time_recommended']['mode']})"
+        )
+    print(
+        f"Backtest: {result['replayed']} particles, {len(result['steps'])} steps, "
+        f"{result['diverged_steps']} steps differ from the all-time recommendation -> {out}"
+    )
+    return out
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="粒子の集計からポリシー推奨値を計算する。")
+    parser.add_argument(
+        "--columns",
+        action="store_true",
+        help="列キャッシュ（particles/_columns）から集計し、パーセンタイルとトレンドも出力する",
+    )
+    parser.add_argument("--workers", type=int, default=None, help="インデックスが空のときの並列読み込み数（1 で直列）")
+    parser.add_argument(
+        "--backtest",
+        action="store_true",
+        help="粒子を時刻順に再生して窓つき推奨の推移を summary/optimizer_backtest.json に書く",
+    )
+    parser.add_argument("--step-hours", type=float, default=24.0, help="バックテストで推奨を計算する間隔（時間）")
+    parser.add_argument(
+        "--no-apply",
+        action="store_true",
+        help="バックテストで推奨を次の時点のポリシーに反映しない（現在のポリシーのまま比べる）",
+    )
+    args = parser.parse_args()
+
+    repo_root = Path(__file__).resolve().parent.parent
+    if args.backtest:
+        particles = _load_particles(repo_root / "particles", args.workers)
+        current = _load_current_policy(repo_root / "meta")
+        write_backtest(backtest(particles, current, args.step_hours, apply=not args.no_apply), repo_root)
+        return
+    if args.columns:
+        open_store(repo_root / "particles").sync(args.workers)
+    columns = _load_columns(repo_root / "particles") if args.columns else None
+    if columns is not None:
+        aggregate, signals = columns.aggregate(), _column_signals(columns)
+    else:
+        particles = _load_particles(repo_root / "particles", args.workers)
+        aggregate, signals = _aggregate(particles), _signals(particles)
+    write_summary(build_summary(aggregate, repo_root, columns, signals), repo_root)
 
 
 if __name__ == "__main__":
@@ -1,7 +1,16 @@
+import argparse
 import json
 import logging
+import sys
 from pathlib import Path
 from datetime import datetime, timezone
+from typing import Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))  # ai_core_gpt をリポジトリ直下から import する
+from ai_core_gpt.analytics import Reducer
+from ai_core_gpt.particle import Particle
+from ai_core_gpt.sketch import ScoreSketches
+from ai_core_gpt.store import open_store
 
 # pipeline_controller.py
 # Integration pipeline controller:
@@ -19,47 +28,123 @@ logging.basicConfig(
 
 PARTICLE_DIR = Path("../particle-git/particles")
 REPORT_PATH = Path("integration_report.json")
+CHECKPOINT_PATH = Path("integration_checkpoint.json")
 
-def collect_particles() -> list[Path]:
-    """Recursively collect all particle JSON files."""
-    particles = sorted(PARTICLE_DIR.rglob("*.json"))
+def collect_particles(since: int = 0, workers: Optional[int] = None, sync: bool = True) -> list[Particle]:
+    """
+    Collect indexed particles registered after `since` (new files are picked up by a store sync).
+    On a cold index the tree is parsed by `workers` processes, one YYYY/MM directory per task.
+    Pass sync=False when the caller has already synced the store.
+    """
+    store = open_store(PARTICLE_DIR)
+    if sync:
+        store.sync(workers)
+    particles = store.records(since=since)
     logging.info(f"Collected {len(particles)} particle files.")
     return particles
 
-def aggregate_scores(particles: list[Path]) -> dict:
-    """Aggregate reliability scores and statuses."""
-    scores, promoted, record_only = [], 0, 0
+def _empty_state(generation: str = "") -> dict:
+    return {
+        "generation": generation,
+        "last_seq": 0,
+        "count": 0,
+        "score_sum": 0.0,
+        "score_sumsq": 0.0,
+        "status_counts": {},
+        "intent_counts": {},
+        # score distribution per intent / status (ai_core_gpt.sketch); stored in the checkpoint as a dict
+        "sketches": ScoreSketches(),
+    }
+
+def fold_particles(state: dict, particles: list[Particle]) -> dict:
+    """Fold particles into running aggregates (in index order, so partial folds add up exactly)."""
     for p in particles:
-        try:
-            data = json.loads(p.read_text(encoding="utf-8"))
-            score = data.get("Reliability Score", 0.0)
-            status = data.get("Processing Outcome", "unknown")
-            scores.append(score)
-            if status == "promoted":
-                promoted += 1
-            elif status == "record_only":
-                record_only += 1
-        except Exception as e:
-            logging.error(f"Failed to read {p}: {e}")
-    avg_score = round(sum(scores) / len(scores), 4) if scores else 0.0
+        score = p.score
+        state["count"] += 1
+        state["score_sum"] += score
+        state["score_sumsq"] += score * score
+        state["status_counts"][p.status] = state["status_counts"].get(p.status, 0) + 1
+        intent = p.intent_category
+        state["intent_counts"][intent] = state["intent_counts"].get(intent, 0) + 1
+        state["sketches"].add(score, intent, p.status)
+        state["last_seq"] = max(state["last_seq"], p.seq)
+    return state
+
+def summarize(state: dict) -> dict:
+    """Build the integration report from running aggregates."""
+    count = state["count"]
     return {
-        "total_particles": len(scores),
-        "average_score": avg_score,
-        "promoted_count": promoted,
-        "record_only_count": record_only,
+        "total_particles": count,
+        "average_score": round(state["score_sum"] / count, 4) if count else 0.0,
+        "promoted_count": state["status_counts"].get("promoted", 0),
+        "record_only_count": state["status_counts"].get("record_only", 0),
+        "score_quantiles": state["sketches"].percentiles(),
         "timestamp": datetime.now(timezone.utc).isoformat() + "Z"
     }
 
-def export_report(summary: dict) -> Path:
+class ReportReducer(Reducer):
+    """Reducer form of aggregate_scores() for the shared analytics pass."""
+    name = "integration_report"
+
+    def __init__(self, generation: str = ""):
+        self.state = _empty_state(generation)
+
+    def add(self, record: Particle) -> None:
+        fold_particles(self.state, [record])
+
+    def result(self) -> dict:
+        return summarize(self.state)
+
+def aggregate_scores(particles: list[Particle]) -> dict:
+    """Aggregate reliability scores and statuses."""
+    return summarize(fold_particles(_empty_state(), particles))
+
+def load_checkpoint(generation: str) -> dict:
+    """Load running aggregates; start over if missing, unreadable or from another index generation."""
+    if CHECKPOINT_PATH.exists():
+        try:
+            state = json.loads(CHECKPOINT_PATH.read_text(encoding="utf-8"))
+            if state.get("generation") == generation and "sketches" in state:
+                state["sketches"] = ScoreSketches.from_dict(state["sketches"])
+                return state
+            logging.info("Particle index was rebuilt or pruned (or the checkpoint predates score sketches); recomputing aggregates from scratch.")
+        except Exception as e:
+            logging.error(f"Failed to read checkpoint {CHECKPOINT_PATH}: {e}")
+    return _empty_state(generation)
+
+def save_checkpoint(state: dict) -> Path:
+    saved = {**state, "sketches": state["sketches"].to_dict()}
+    CHECKPOINT_PATH.write_text(json.dumps(saved, indent=2, ensure_ascii=False), encoding="utf-8")
+    return CHECKPOINT_PATH
+
+def aggregate_incremental(full: bool = False, workers: Optional[int] = None) -> dict:
+    """
+    Fold only particles indexed since the last checkpoint into the persisted aggregates.
+    With full=True the aggregates are recomputed from every particle (the report is identical).
+    """
+    # sync before reading the generation, so deletions found by this sync invalidate the checkpoint
+    store = open_store(PARTICLE_DIR)
+    store.sync(workers)
+    generation = store.generation
+    state = _empty_state(generation) if full else load_checkpoint(generation)
+    fold_particles(state, collect_particles(since=state["last_seq"], sync=False))
+    save_checkpoint(state)
+    return summarize(state)
+
+def export_report(summary: dict, path: Path = REPORT_PATH) -> Path:
     """Save aggregated report as JSON."""
-    REPORT_PATH.write_text(json.dumps(summary, indent=2, ensure_ascii=False), encoding="utf-8")
-    logging.info(f"Integration report saved: {REPORT_PATH.resolve()}")
-    return REPORT_PATH
+    path.write_text(json.dumps(summary, indent=2, ensure_ascii=False), encoding="utf-8")
+    logging.info(f"Integration report saved: {path.resolve()}")
+    return path
 
 def main() -> None:
+    parser = argparse.ArgumentParser(description="Aggregate particle scores into integration_report.json.")
+    parser.add_argument("--full", action="store_true", help="recompute from every particle instead of the checkpoint")
+    parser.add_argument("--workers", type=int, default=None, help="processes for a cold index load (1 = serial)")
+    args = parser.parse_args()
+
     logging.info("Running integration pipeline controller...")
-    particles = collect_particles()
-    summary = aggregate_scores(particles)
+    summary = aggregate_incremental(full=args.full, workers=args.workers)
     export_report(summary)
     logging.info(f"Summary: {summary}")
 
@@ -0,0 +1,255 @@
+from __future__ import annotations
+"""
+runner.py
+
+集計パイプライン（粒子の書き出し → pipeline_controller → optimizer [→ gpt_design]）を
+1 プロセスの中で関数呼び出しとして実行する常駐ランナー。
+
+各ステップを `python ...` のサブプロセスで起動していた頃と違い、モジュールの import、
+粒子インデックス（ParticleStore の接続）、optimizer の集計、ポリシーと GPTDesign は
+サイクルをまたいで共有する。optimizer の集計は前回のサイクル以降に登録された粒子だけを畳み込む。
+
+ステップごとの所要時間とサイクル全体の時間は、1 行 1 JSON の構造化ログとして出力する：
+
+    {"event": "step", "cycle": 1, "step": "pipeline_controller", "seconds": 0.012, "ok": true}
+    {"event": "cycle", "cycle": 1, "seconds": 0.051, "ok": true, "steps": {...}}
+"""
+
+import argparse
+import json
+import logging
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))  # ai_core_gpt / particle_exporter をリポジトリ直下から import する
+
+import gpt_design  # noqa: E402
+import particle_exporter  # noqa: E402
+from ai_core_gpt.dag import CACHE_PATH, DagScheduler, Step, file_input, particles_input  # noqa: E402
+from ai_core_gpt.store import open_store  # noqa: E402
+from ai_core_gpt.watch import DEBOUNCE, ParticleWatcher  # noqa: E402
+from gpts.meta_sync import ReasoningPolicy, policy_provider  # noqa: E402
+from integration_pipeline import optimizer, pipeline_controller  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+STEPS = ("particle_exporter", "pipeline_controller", "optimizer")
+# final_integration.py のサイクル（最後にデモ粒子を生成する）
+FINAL_STEPS = STEPS + ("gpt_design",)
+
+
+class PipelineRunner:
+    """
+    パイプラインのステップを同じプロセスで順に実行する。
+
+    - particle_exporter: 非同期ライタに積まれた粒子を書き切り、インデックスへ取り込む
+    - pipeline_controller: 差分集計して integration_report.json を書く
+    - optimizer: 前回以降の粒子だけを集計と直近の窓（リングバッファ）に足し込み、optimization_summary.json を書く
+    - gpt_design: ポリシー（gpts.meta_sync.PolicyProvider）が変わったときだけ作り直す GPTDesign でデモを実行する
+
+    ステップが例外を送出してもログに残して次のステップへ進む（サブプロセス版と同じ）。
+    """
+
+    def __init__(
+        self,
+        steps: Tuple[str, ...] = STEPS,
+        repo_root: Path = REPO_ROOT,
+        workers: Optional[int] = None,
+    ):
+        unknown = [name for name in steps if not hasattr(self, f"_step_{name}")]
+        if unknown:
+            raise ValueError(f"unknown pipeline steps: {unknown}")
+        self.steps = steps
+        self.repo_root = repo_root
+        self.workers = workers
+        self.cycles = 0
+        # optimizer の集計状態（インデックスの世代が変わったら作り直す）
+        self._reducer: Optional[optimizer.AggregateReducer] = None
+        self._windows: Optional[optimizer.WindowReducer] = None
+        self._generation = ""
+        self._last_seq = 0
+        # gpt_design の GPTDesign と、それを作ったポリシー（同じオブジェクトが返る間は作り直さない）
+        self._design: Optional[gpt_design.GPTDesign] = None
+        self._policy: Optional[ReasoningPolicy] = None
+
+    # ---- steps ----------------------------------------------------------------
+    def _step_particle_exporter(self) -> Dict[str, Any]:
+        flushed = particle_exporter.flush_default_writer()
+        stats = open_store(particle_exporter.PARTICLE_ROOT).sync(self.workers)
+        return {"flushed": flushed, **stats}
+
+    def _step_pipeline_controller(self) -> Dict[str, Any]:
+        summary = pipeline_controller.aggregate_incremental(workers=self.workers)
+        pipeline_controller.export_report(summary)
+        return {"total_particles": summary.get("total_particles", 0)}
+
+    def _step_optimizer(self) -> Dict[str, Any]:
+        store = open_store(self.repo_root / "particles")
+        store.sync(self.workers)
+        if self._reducer is None or store.generation != self._generation:
+            self._reducer = optimizer.AggregateReducer()
+            self._windows = optimizer.WindowReducer()
+            self._generation, self._last_seq = store.generation, 0
+        added = 0
+        for record in store.iter_records(optimizer.AggregateReducer.pattern, since=self._last_seq):
+            self._reducer.add(record)
+            self._windows.add(record)  # type: ignore[union-attr]
+            self._last_seq = record.seq
+            added += 1
+        aggregate = self._reducer.result()
+        signals = self._windows.result()  # type: ignore[union-attr]
+        optimizer.write_summary(optimizer.build_summary(aggregate, self.repo_root, signals=signals), self.repo_root)
+        return {"added": added, "total_particles": aggregate["total_particles"]}
+
+    def _current_policy(self) -> ReasoningPolicy:
+        # サイクルに 1 回だけなので、確認間隔を待たずに stat する
+        return policy_provider(self.repo_root / "meta" / "summary_meta.json").get(revalidate=True)
+
+    def _step_gpt_design(self) -> Dict[str, Any]:
+        policy = self._current_policy()
+        reloaded = self._design is None or policy is not self._policy
+        if reloaded:
+            self._design = gpt_design.GPTDesign(
+                threshold=getattr(policy, "threshold", 0.90),
+                require_evidence=getattr(policy, "require_evidence", False),
+            )
+            self._policy = policy
+        gpt_design.main(self._design)
+        return {"policy_reloaded": reloaded}
+
+    # ---- run ------------------------------------------------------------------
+    def _timed(self, name: str, fn: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        started = time.perf_counter()
+        entry: Dict[str, Any] = {"event": "step", "cycle": self.cycles, "step": name}
+        try:
+            entry.update(fn())
+            entry["ok"] = True
+        except Exception as e:  # noqa: BLE001
+            logger.exception("Pipeline step %s failed", name)
+            entry["ok"] = False
+            entry["error"] = f"{type(e).__name__}: {e}"
+        entry["seconds"] = round(time.perf_counter() - started, 6)
+        logger.info(json.dumps(entry, ensure_ascii=False))
+        return entry
+
+    def run_cycle(self) -> Dict[str, Any]:
+        """全ステップを 1 回ずつ実行し、ステップごとの結果と所要時間をまとめて返す。"""
+        self.cycles += 1
+        started = time.perf_counter()
+        entries: List[Dict[str, Any]] = [self._timed(name, getattr(self, f"_step_{name}")) for name in self.steps]
+        cycle = {
+            "event": "cycle",
+            "cycle": self.cycles,
+            "seconds": round(time.perf_counter() - started, 6),
+            "ok": all(e["ok"] for e in entries),
+            "steps": {e["step"]: e["seconds"] for e in entries},
+        }
+        logger.info(json.dumps(cycle, ensure_ascii=False))
+        return cycle
+
+    def run_forever(self, interval: float) -> None:
+        """run_cycle() を繰り返す。interval はサイクルの開始間隔（秒）。"""
+        while True:
+            started = time.monotonic()
+            self.run_cycle()
+            time.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+    def dag_steps(self) -> List[Step]:
+        """
+        各ステップの入力・出力を宣言した DAG（run_dag() 用）。
+
+        pipeline_controller と optimizer は互いに独立なので並行に走る。gpt_design はデモ粒子が今回の集計に
+        混ざらないよう最後に回し、入力は meta/summary_meta.json だけにする（integration_report.json は
+        毎回 timestamp が変わり、デモ粒子がまた集計を動かすので、入力にすると毎回全ステップが走る）。
+        """
+        particles = self.repo_root / "particles"
+        summary_meta = file_input(self.repo_root / "meta" / "summary_meta.json")
+        steps = {
+            "particle_exporter": Step("particle_exporter", self._step_particle_exporter, cacheable=False),
+            "pipeline_controller": Step(
+                "pipeline_controller",
+                self._step_pipeline_controller,
+                inputs=[particles_input(pipeline_controller.PARTICLE_DIR)],
+                outputs=[pipeline_controller.REPORT_PATH, pipeline_controller.CHECKPOINT_PATH],
+                after=["particle_exporter"],
+            ),
+            "optimizer": Step(
+                "optimizer",
+                self._step_optimizer,
+                inputs=[particles_input(particles), summary_meta],
+                outputs=[self.repo_root / "optimization_summary.json", self.repo_root / "summary" / "optimization_summary.json"],
+                after=["particle_exporter"],
+            ),
+            "gpt_design": Step(
+                "gpt_design",
+                self._step_gpt_design,
+                inputs=[summary_meta],
+                after=["pipeline_controller", "optimizer"],
+            ),
+        }
+        selected = [steps[name] for name in self.steps]
+        for step in selected:
+            step.after = [name for name in step.after if name in self.steps]
+        return selected
+
+    def run_dag(self, force: bool = False, cache_path: Path = CACHE_PATH) -> Dict[str, Any]:
+        """
+        ステップを DAG として実行する。入力（粒子ツリー・meta/summary_meta.json）が前回から変わっていない
+        ステップは省き、ステップ別の所要時間とキャッシュヒット数を報告する。
+        """
+        self.cycles += 1
+        return DagScheduler(self.dag_steps(), cache_path).run(force=force)
+
+    def particle_roots(self) -> List[Path]:
+        """各ステップが読む粒子ツリー（存在するものだけ）。"""
+        roots = [particle_exporter.PARTICLE_ROOT, pipeline_controller.PARTICLE_DIR, self.repo_root / "particles"]
+        return [root for root in roots if root.exists()]
+
+    def watch(self, watcher: Optional[ParticleWatcher] = None) -> None:
+        """
+        新しい粒子が来たときだけ run_cycle() を回す（起動時に 1 回回して、それまでの分を取り込む）。
+
+        同じプロセスで書き出した粒子は particle_exporter の post hook からも通知される。
+        粒子を書き出すステップ（gpt_design）を含むと自分の出力で再起動し続けるため、ここでは使えない。
+        """
+        if "gpt_design" in self.steps:
+            raise ValueError("watch mode cannot run the gpt_design step (it writes particles itself)")
+        watcher = watcher or ParticleWatcher(self.particle_roots())
+        particle_exporter.add_post_hook(watcher.notify)
+        try:
+            self.run_cycle()
+            watcher.run_forever(lambda _changes: self.run_cycle())
+        finally:
+            particle_exporter.remove_post_hook(watcher.notify)
+            watcher.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="集計パイプラインを 1 プロセスで実行する。")
+    parser.add_argument("--final", action="store_true", help="最後に gpt_design のデモも実行する（final_integration 相当）")
+    parser.add_argument("--loop", type=float, default=None, help="この秒数ごとに繰り返す（省略時は 1 回）")
+    parser.add_argument("--dag", action="store_true", help="入力が変わったステップだけを依存順（独立なものは並行）に実行する")
+    parser.add_argument("--force", action="store_true", help="--dag で入力が同じステップも実行する")
+    parser.add_argument("--watch", action="store_true", help="新しい粒子が来たときだけ実行する（inotify / ポーリング）")
+    parser.add_argument("--debounce", type=float, default=DEBOUNCE, help="--watch で変化が落ち着くまで待つ秒数")
+    parser.add_argument("--workers", type=int, default=None, help="インデックスが空のときの並列読み込み数（1 で直列）")
+    args = parser.parse_args()
+    if args.watch and args.final:
+        parser.error("--watch cannot be combined with --final")
+
+    runner = PipelineRunner(FINAL_STEPS if args.final else STEPS, workers=args.workers)
+    if args.watch:
+        runner.watch(ParticleWatcher(runner.particle_roots(), debounce=args.debounce))
+    elif args.dag:
+        runner.run_dag(force=args.force)
+    elif args.loop:
+        runner.run_forever(args.loop)
+    else:
+        runner.run_cycle()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,83 @@
 from __future__ import annotations
 from pathlib import Path
-from datetime import datetime
-from typing import Any, Dict, List
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import atexit
+import itertools
 import json
-import uuid
+import queue
+import random
+import threading
+import time
 import logging
 
+from ai_core_gpt.particle import Particle
+from ai_core_gpt.segments import open_writer, segment_dir
+from ai_core_gpt.sketch import record_particles
+from ai_core_gpt.store import content_hash, open_store
+
 logger = logging.getLogger(__name__)
 
 PARTICLE_ROOT = Path("particles")
+# "files": 1 粒子 = 1 JSON ファイル / "segments": particles/segments/ の追記型セグメント
+PARTICLE_BACKEND = "files"
+# segments バックエンドの書き込み先シャードと、書き込み時にインデックスへ登録するか
+# （マルチプロセス配信では各ワーカが自分のシャードだけに書き、登録はコーディネータの sync() が行う）
+SEGMENT_SHARD = ""
+INDEX_ON_WRITE = True
+# Commit ID の末尾に付けるワーカ識別子（"_w0" など）
+WORKER_TAG = ""
+# True なら意味的な内容が同じ粒子を書き出さず、既存粒子の重複件数だけを増やす（write_particles() を参照）
+DEDUPE = False
+# True なら書き出した粒子を particles/_sketches/ の月ごとのスコア分布（ai_core_gpt.sketch）にも足し込む
+SKETCH_ON_WRITE = True
 
+# write_particles() が書き終えるたびに、書いたパスのリストで呼ぶ関数（ai_core_gpt.watch の notify など）
+_POST_HOOKS: List[Callable[[List[Path]], Any]] = []
 
-def export_particle(
+# Commit ID の 6 桁 16 進サフィックス。プロセス内ではカウンタで重複させず、開始位置だけを乱数にする
+_SUFFIXES = itertools.count(random.randrange(1 << 24))
+
+
+def configure_worker(shard: str) -> None:
+    """このプロセスの粒子を segments/<shard>/ に書き、Commit ID にもシャード名を付ける。"""
+    global PARTICLE_BACKEND, SEGMENT_SHARD, INDEX_ON_WRITE, WORKER_TAG
+    PARTICLE_BACKEND = "segments"
+    SEGMENT_SHARD = shard
+    INDEX_ON_WRITE = False
+    WORKER_TAG = f"_{shard}"
+
+
+def add_post_hook(hook: Callable[[List[Path]], Any]) -> None:
+    """粒子を書き出した後に hook(paths) を呼ぶよう登録する（同じプロセス内の通知用）。"""
+    if hook not in _POST_HOOKS:
+        _POST_HOOKS.append(hook)
+
+
+def remove_post_hook(hook: Callable[[List[Path]], Any]) -> None:
+    if hook in _POST_HOOKS:
+        _POST_HOOKS.remove(hook)
+
+
+def _run_post_hooks(paths: List[Path]) -> None:
+    for hook in list(_POST_HOOKS):
+        try:
+            hook(paths)
+        except Exception:
+            logger.exception("Particle post hook %r failed", hook)
+
+
+def build_particle(
     *,
     text: str,
     evaluation: Dict[str, Any],
     true_intent: Dict[str, Any],
     evidence_sources: List[str],
     parent_commit: str,
-) -> Path:
+    backend: Optional[str] = None,
+) -> Tuple[Path, Dict[str, Any]]:
     """
-    V1 粒子スキーマで JSON を保存するエクスポータ。
+    V1 粒子を組み立て、書き出し先のパスと一緒に返す（ファイルにはまだ書かない）。
 
     出力例（キー構造）は AUTO_1761956191.json などの既存粒子に揃える：
 
@@ -39,45 +96,332 @@ def export_particle(
       ],
       "Conflict Status": "pending"
     }
+
+    粒子は Particle で組み立てて to_v1_dict() で JSON の形にする。
+    パスは particles/YYYY/MM/<Commit ID>.json。segments バックエンドでは追記先の
+    セグメントが書き込み時まで決まらないため、particles/segments[/<shard>]/<Commit ID>.json を返す。
     """
-    now = datetime.now()
+    # created_at（Score History の timestamp）はオフセット付きの UTC で書く
+    now = datetime.now(timezone.utc)
     year = now.strftime("%Y")
     month = now.strftime("%m")
     dir_path = PARTICLE_ROOT / year / month
-    dir_path.mkdir(parents=True, exist_ok=True)
 
     ts = now.strftime("%Y%m%d_%H%M%S")
-    suffix = uuid.uuid4().hex[:6]
-    commit_id = f"AUTO_{ts}_{suffix}"
+    suffix = f"{next(_SUFFIXES) & 0xFFFFFF:06x}"
+    commit_id = f"AUTO_{ts}_{suffix}{WORKER_TAG}"
     filename = f"{commit_id}.json"
-    out_path = dir_path / filename
+    if (backend or PARTICLE_BACKEND) == "segments":
+        dir_path = segment_dir(PARTICLE_ROOT, SEGMENT_SHARD)
 
     score = float(evaluation.get("score", 0.0))
-    status = str(evaluation.get("status", "record_only"))
-
-    particle: Dict[str, Any] = {
-        "Commit ID": commit_id,
-        "Parent Commit": parent_commit,
-        "True Intent": true_intent,
-        "Reliability Score": score,
-        "Raw Text": text,
-        "Context ID": f"CTX_{ts}",
-        "Processing Outcome": status,
-        "Evidence Sources": evidence_sources or [],
-        "Reviewer": "gpt-design",
-        "Score History": [
-            {
-                "version": "DESIGN-1.1",
-                "score": score,
-                "timestamp": now.isoformat(),
-            }
-        ],
-        "Conflict Status": "pending",
+    particle = Particle(
+        commit_id=commit_id,
+        score=score,
+        status=str(evaluation.get("status", "record_only")),
+        intent_category=str(true_intent.get("Category", "Unknown")),
+        intent_details=str(true_intent.get("Details", "")),
+        parent_commit=parent_commit,
+        reviewer="gpt-design",
+        raw_text=text,
+        context_id=f"CTX_{ts}",
+        evidence_sources=evidence_sources or [],
+        score_history=[{"version": "DESIGN-1.1", "score": score, "timestamp": now.isoformat()}],
+        conflict_status="pending",
+    )
+    return dir_path / filename, particle.to_v1_dict()
+
+
+def _stored_path(record: Particle) -> Path:
+    """インデックスのレコードを export_particle() が返す形式のパスにする（セグメントは <セグメント>/<名前>）。"""
+    path = Path(record.path)
+    return path if record.offset < 0 else path / record.name
+
+
+def _split_duplicates(
+    items: List[Tuple[Path, Dict[str, Any]]],
+) -> Tuple[List[Tuple[Path, Dict[str, Any]]], List[Any]]:
+    """
+    items を「書き出す粒子」と「既存の粒子と同じ内容のもの」に分ける。
+
+    2 つ目の戻り値は items と同じ長さで、既存粒子のパス（Path）か、書き出す粒子の位置（int）。
+    重複の件数はインデックスの duplicates 表に足す。
+    """
+    store = open_store(PARTICLE_ROOT)
+    fresh: List[Tuple[Path, Dict[str, Any]]] = []
+    placement: List[Any] = []
+    seen: Dict[str, Any] = {}
+    counts: Dict[str, int] = {}
+    for item in items:
+        digest = content_hash(item[1])
+        existing = seen.get(digest) if digest is not None else None
+        if digest is not None and existing is None:
+            record = store.find_content(digest)
+            existing = None if record is None else _stored_path(record)
+        if existing is None:
+            placement.append(len(fresh))
+            if digest is not None:
+                seen[digest] = len(fresh)
+            fresh.append(item)
+        else:
+            placement.append(existing)
+            counts[digest] = counts.get(digest, 0) + 1  # type: ignore[index]
+    if counts:
+        store.add_duplicates(counts)
+        logger.info("Skipped %d duplicate particles (same content already stored)", sum(counts.values()))
+    return fresh, placement
+
+
+def export_kwargs(particle: Dict[str, Any]) -> Dict[str, Any]:
+    """V1 粒子（GPTDesign.generate() の "particle"）を export_particle() / AsyncParticleWriter.submit() の引数にする。"""
+    return {
+        "text": particle["Raw Text"],
+        "evaluation": {"score": particle["Reliability Score"], "status": particle["Processing Outcome"]},
+        "true_intent": particle["True Intent"],
+        "evidence_sources": particle["Evidence Sources"],
+        "parent_commit": particle["Parent Commit"],
     }
 
-    out_path.write_text(
-        json.dumps(particle, ensure_ascii=False, indent=2),
-        encoding="utf-8",
+
+def write_particles(
+    items: List[Tuple[Path, Dict[str, Any]]],
+    backend: Optional[str] = None,
+    dedupe: Optional[bool] = None,
+) -> List[Path]:
+    """
+    build_particle() の結果をまとめて書き出し、インデックスにも 1 トランザクションで登録する。
+
+    files バックエンドは各パスへ JSON を書き、segments バックエンドは 1 回の追記でセグメントへ書く。
+    戻り値は export_particle() と同じ形式のパスで、add_post_hook() で登録した関数にも（新しく書いた分だけ）渡す。
+
+    dedupe（既定は DEDUPE）なら、意味的な内容（ai_core_gpt.store.content_hash）が既存の粒子や
+    同じバッチの先の粒子と同じものは書き出さず、インデックスの重複件数だけを増やして既存粒子のパスを返す。
+    """
+    if not items:
+        return []
+    placement: Optional[List[Any]] = None
+    if DEDUPE if dedupe is None else dedupe:
+        try:
+            items, placement = _split_duplicates(items)
+        except Exception:
+            logger.exception("Failed to look up duplicate particles; writing all of them")
+    written = _write(items, backend) if items else []
+    if written:
+        _record_sketches(items)
+        _run_post_hooks(written)
+    if placement is None:
+        return written
+    return [written[p] if isinstance(p, int) else p for p in placement]
+
+
+def _record_sketches(items: List[Tuple[Path, Dict[str, Any]]]) -> None:
+    """書き出した粒子のスコアを、このプロセスのシャードの月別スケッチに足し込む。"""
+    if not SKETCH_ON_WRITE:
+        return
+    try:
+        record_particles(PARTICLE_ROOT, (Particle.from_v1_dict(particle, path) for path, particle in items), SEGMENT_SHARD)
+    except Exception:
+        logger.exception("Failed to update score sketches (run `python -m ai_core_gpt.sketch rebuild`)")
+
+
+def _write(items: List[Tuple[Path, Dict[str, Any]]], backend: Optional[str]) -> List[Path]:
+    if (backend or PARTICLE_BACKEND) == "segments":
+        placed = open_writer(PARTICLE_ROOT, SEGMENT_SHARD, index=INDEX_ON_WRITE).append_many((path.name, particle) for path, particle in items)
+        return [segment / path.name for (segment, _, _), (path, _) in zip(placed, items)]
+
+    for dir_path in {path.parent for path, _ in items}:
+        dir_path.mkdir(parents=True, exist_ok=True)
+    for out_path, particle in items:
+        out_path.write_text(
+            json.dumps(particle, ensure_ascii=False, indent=2),
+            encoding="utf-8",
+        )
+
+    # 集計側がツリーを再走査しなくて済むよう、インデックスにも登録する
+    try:
+        open_store(PARTICLE_ROOT).add_many(items)
+    except Exception:
+        logger.exception("Failed to index %d particles (run `python -m ai_core_gpt.store sync`)", len(items))
+    return [path for path, _ in items]
+
+
+def export_particle(
+    *,
+    text: str,
+    evaluation: Dict[str, Any],
+    true_intent: Dict[str, Any],
+    evidence_sources: List[str],
+    parent_commit: str,
+    backend: Optional[str] = None,
+    dedupe: Optional[bool] = None,
+) -> Path:
+    """
+    V1 粒子スキーマで JSON を保存するエクスポータ（キー構造は build_particle() を参照）。
+
+    backend="segments"（既定は PARTICLE_BACKEND）のときはセグメントへ追記し、
+    `<セグメント>/<Commit ID>.json` という論理パスを返す（.stem は Commit ID のまま）。
+    dedupe=True なら同じ内容の粒子が既にあれば書き出さず、そのパスを返す（write_particles() を参照）。
+    """
+    item = build_particle(
+        text=text,
+        evaluation=evaluation,
+        true_intent=true_intent,
+        evidence_sources=evidence_sources,
+        parent_commit=parent_commit,
+        backend=backend,
     )
+    (out_path,) = write_particles([item], backend, dedupe)
     logger.info("Particle exported (V1 schema): %s", out_path)
     return out_path
+
+
+def export_particles(
+    particles: Iterable[Dict[str, Any]],
+    backend: Optional[str] = None,
+    dedupe: Optional[bool] = None,
+) -> List[Path]:
+    """export_particle() のキーワード引数の dict を複数受け取り、まとめて書き出す。"""
+    items = [build_particle(**kwargs, backend=backend) for kwargs in particles]
+    paths = write_particles(items, backend, dedupe)
+    logger.info("Particles exported (V1 schema): %d", len(paths))
+    return paths
+
+
+class AsyncParticleWriter:
+    """
+    粒子をキューに積み、バックグラウンドスレッドがまとめて書き出すライタ。
+
+    - submit() は粒子を組み立てて積んだ時点で書き出し予定のパスを返す（Commit ID は確定済み）
+    - flush_size 件たまるか flush_interval 秒たつと write_particles() で一括書き込みする
+    - キューが max_queue 件で埋まっていると submit() は空くまで待つ（バックプレッシャ）
+    - flush() はそれまでに積んだ粒子の書き込み完了を待ち、close() は全件を書いてから停止する
+    - dedupe 時、重複として書き出されなかった粒子の submit() 戻り値のパスは作られない
+    """
+
+    _FLUSH = object()
+    _STOP = object()
+
+    def __init__(
+        self,
+        max_queue: int = 10000,
+        flush_interval: float = 0.5,
+        flush_size: int = 256,
+        backend: Optional[str] = None,
+        dedupe: Optional[bool] = None,
+    ):
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self.backend = backend
+        self.dedupe = dedupe
+        self.written = 0
+        self.batches = 0
+        self.errors = 0
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_queue)
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="particle-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, *, timeout: Optional[float] = None, **kwargs: Any) -> Path:
+        """
+        export_particle() と同じ引数で粒子を積む。
+
+        timeout 秒以内にキューが空かなければ queue.Full を送出する（None なら待ち続ける）。
+        """
+        if self._closed:
+            raise RuntimeError("AsyncParticleWriter is closed")
+        item = build_particle(**kwargs, backend=self.backend)
+        self._queue.put(item, timeout=timeout)
+        return item[0]
+
+    def submit_many(self, particles: Iterable[Dict[str, Any]], timeout: Optional[float] = None) -> List[Path]:
+        """export_particle() の引数の dict を複数積む（順に submit() するのと同じ）。"""
+        return [self.submit(timeout=timeout, **kwargs) for kwargs in particles]
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """これまでに積んだ粒子がすべて書き込まれるまで待つ。timeout 内に終われば True。"""
+        if not self._thread.is_alive():
+            return self._queue.empty()
+        done = threading.Event()
+        self._queue.put((self._FLUSH, done))
+        return done.wait(timeout)
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """残りを書き出してからスレッドを止める（二重に呼んでもよい）。"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put((self._STOP, None))
+        self._thread.join(timeout)
+
+    def __enter__(self) -> "AsyncParticleWriter":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def _write(self, batch: List[Tuple[Path, Dict[str, Any]]]) -> None:
+        if not batch:
+            return
+        started = time.perf_counter()
+        try:
+            write_particles(batch, self.backend, self.dedupe)
+        except Exception:
+            self.errors += len(batch)
+            logger.exception("Failed to write %d particles", len(batch))
+            return
+        self.written += len(batch)
+        self.batches += 1
+        logger.info(
+            "Particles exported (V1 schema): %d in %.3fs (queued: %d)",
+            len(batch), time.perf_counter() - started, self._queue.qsize(),
+        )
+
+    def _run(self) -> None:
+        batch: List[Tuple[Path, Dict[str, Any]]] = []
+        deadline: Optional[float] = None
+        while True:
+            wait = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=wait)
+            except queue.Empty:
+                item = None
+            if item is None or (deadline is not None and time.monotonic() >= deadline):
+                # flush_interval 経過
+                self._write(batch)
+                batch, deadline = [], None
+                if item is None:
+                    continue
+            marker, payload = item
+            if marker is self._FLUSH or marker is self._STOP:
+                self._write(batch)
+                batch, deadline = [], None
+                if marker is self._STOP:
+                    return
+                payload.set()
+                continue
+            batch.append(item)
+            if deadline is None:
+                deadline = time.monotonic() + self.flush_interval
+            if len(batch) >= self.flush_size:
+                self._write(batch)
+                batch, deadline = [], None
+
+
+_DEFAULT_WRITER: Optional[AsyncParticleWriter] = None
+_DEFAULT_WRITER_LOCK = threading.Lock()
+
+
+def default_writer() -> AsyncParticleWriter:
+    """プロセス共有の AsyncParticleWriter（終了時に残りを書き出す）。"""
+    global _DEFAULT_WRITER
+    with _DEFAULT_WRITER_LOCK:
+        if _DEFAULT_WRITER is None:
+            _DEFAULT_WRITER = AsyncParticleWriter()
+            atexit.register(_DEFAULT_WRITER.close)
+        return _DEFAULT_WRITER
+
+
+def flush_default_writer(timeout: Optional[float] = None) -> bool:
+    """default_writer() が作られていれば、それまでに積まれた粒子の書き込みを待つ（作られていなければ何もしない）。"""
+    writer = _DEFAULT_WRITER
+    return True if writer is None else writer.flush(timeout)
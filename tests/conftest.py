@@ -0,0 +1,41 @@
+import random
+
+import pytest
+
+import particle_exporter
+
+INTENTS = ["Operational Automation", "Evidence Integration", "Reliability Framework", "General Reflection"]
+
+
+def sample_kwargs(n, seed=0):
+    """export_particle() のキーワード引数を n 件（スコア・意図は seed から決まる）。"""
+    rng = random.Random(seed)
+    items = []
+    for i in range(n):
+        score = round(rng.random(), 3)
+        items.append({
+            "text": f"prompt {seed}-{i}",
+            "evaluation": {"score": score, "status": "promoted" if score >= 0.5 else "record_only"},
+            "true_intent": {"Category": rng.choice(INTENTS), "Details": f"details {i % 7}"},
+            "evidence_sources": [],
+            "parent_commit": "ROOT",
+        })
+    return items
+
+
+@pytest.fixture
+def particle_root(tmp_path, monkeypatch):
+    """particle_exporter の書き出し先を一時ディレクトリにする。"""
+    root = tmp_path / "particles"
+    monkeypatch.setattr(particle_exporter, "PARTICLE_ROOT", root)
+    return root
+
+
+@pytest.fixture
+def export_samples(particle_root):
+    """sample_kwargs() の粒子を particle_root に書き出し、パスの一覧を返す関数。"""
+
+    def export(n, seed=0, backend=None):
+        return particle_exporter.export_particles(sample_kwargs(n, seed), backend=backend)
+
+    return export
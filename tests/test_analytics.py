@@ -0,0 +1,57 @@
+"""
+集計エンジン（ai_core_gpt.analytics）のテスト。
+
+Reducer が add() / result() を実装していないサブクラスを作らせないこと、1 回の走査で
+複数の Reducer に配った結果が、それぞれを単独で集計した結果と一致することを確かめる。
+"""
+
+import json
+
+import pytest
+
+from ai_core_gpt.analytics import Reducer, run_pass
+from ai_core_gpt.pipeline_controller import ReportReducer, aggregate_scores
+from ai_core_gpt.store import open_store
+from integration_pipeline.aggregate_particles import SummaryReducer
+from integration_pipeline.optimizer import AggregateReducer, _aggregate
+
+
+def summary_of(records):
+    reducer = SummaryReducer()
+    for record in records:
+        reducer.add(record)
+    return reducer.result()
+
+
+def without_time(result):
+    return {k: v for k, v in result.items() if k not in ("timestamp", "generated_at")}
+
+
+def test_reducer_requires_add_and_result():
+    class AddOnly(Reducer):
+        def add(self, record):
+            pass
+
+    with pytest.raises(TypeError):
+        Reducer()
+    with pytest.raises(TypeError):
+        AddOnly()
+
+
+def test_one_pass_matches_separate_aggregations(particle_root, export_samples):
+    paths = export_samples(60)
+    # AUTO_* 以外の粒子は pattern="AUTO_*.json" の Reducer には渡らない
+    manual = json.loads(paths[0].read_text(encoding="utf-8"))
+    manual["Commit ID"] = "MANUAL_0001"
+    manual["Reliability Score"] = 0.01
+    (paths[0].parent / "MANUAL_0001.json").write_text(json.dumps(manual, ensure_ascii=False), encoding="utf-8")
+
+    store = open_store(particle_root)
+    report, summary, optimization = run_pass(store, [ReportReducer(), SummaryReducer(), AggregateReducer()])
+    every = store.records()
+    auto = store.records("AUTO_*.json")
+    assert len(every) == 61 and len(auto) == 60
+
+    assert without_time(report) == without_time(aggregate_scores(every))
+    assert without_time(summary) == without_time(summary_of(auto))
+    assert optimization == _aggregate(auto)
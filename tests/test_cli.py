@@ -0,0 +1,36 @@
+"""
+一括処理（gpt_cli.run_bulk）のテスト。
+
+"text" のない JSON オブジェクトの行で全体が止まらず、その行だけを警告して飛ばし、
+最後の進捗行に飛ばした件数が出ることを確かめる。
+"""
+
+import json
+import logging
+
+import gpt_cli
+
+
+def test_run_bulk_skips_items_without_text(tmp_path, caplog, capsys):
+    src = tmp_path / "prompts.jsonl"
+    out = tmp_path / "results.jsonl"
+    src.write_text(
+        "\n".join([
+            json.dumps({"text": "毎週の自動レポート"}, ensure_ascii=False),
+            json.dumps({"evidence_source": "user"}),
+            "",
+            "出典の URL を添えて",
+            json.dumps({"prompt": 3}),
+        ]) + "\n",
+        encoding="utf-8",
+    )
+
+    with caplog.at_level(logging.WARNING, logger="gpt_cli"):
+        count = gpt_cli.run_bulk(src, out, persist=False)
+
+    assert count == 2
+    results = [json.loads(line) for line in out.read_text(encoding="utf-8").splitlines()]
+    assert [r["true_intent"]["Category"] for r in results] == ["Operational Automation", "Evidence Integration"]
+    skipped = [r.getMessage() for r in caplog.records if "skipped" in r.getMessage()]
+    assert [m.split(":")[0] for m in skipped] == ["line 2 skipped", "line 5 skipped"]
+    assert "(2 skipped)" in capsys.readouterr().err
@@ -0,0 +1,163 @@
+"""
+True Intent 判定（ai_core_gpt.lexicon）のテスト。
+
+組み込みのカテゴリ語彙での判定が、以前の _parse_true_intent（カテゴリごとの正規表現を判定順に
+re.search する）と一致すること、タクソノミーのキーワードが英単語の一部や 1 語だけで
+カテゴリを決めないことを確かめる。
+共有の 1 回走査（default_matcher().scan()）の結果で採点・禁止表現判定をしても、
+語彙ごとに別々に走査した場合と同じ結果になることも確かめる。
+"""
+
+import json
+import random
+import re
+
+import pytest
+
+from ai_core_gpt.design import GPTDesign
+from ai_core_gpt.lexicon import (
+    DEFAULT_INTENT,
+    EMOTIONAL,
+    EMOTIONAL_PHRASES,
+    INTENT_CATEGORIES,
+    INTENT_PREFIX,
+    META_DIR,
+    PROHIBITED,
+    SPECULATION,
+    SPECULATION_PHRASES,
+    IntentClassifier,
+    default_classifier,
+    default_matcher,
+    intent_lexicons,
+    load_prohibited_phrases,
+    match_intent,
+)
+from ai_core_gpt.scoring import EMOTIONAL_PATTERN, SPECULATION_PATTERN, score_reliability
+
+# 以前の gpt_design._parse_true_intent のカテゴリ判定
+LEGACY_RULES = (
+    ("Operational Automation", r"(自動|定期|スケジュール|毎|周期)"),
+    ("Evidence Integration", r"(URL|https?://|値|データ|根拠|出典|証拠)"),
+    ("Reliability Framework", r"(信頼度|スコア|評価基準|threshold|Reliability)"),
+    ("Meta Evaluation", r"(EVAL|自己検証|meta|評価結果|再採点)"),
+)
+
+# 組み込み語彙にもタクソノミーのキーワードにも当たらない英語の入力
+PLAIN_PROMPTS = (
+    "What are you doing today?",
+    "hello underscore",
+    "I like the trend",
+    "The database migration finished",
+    "Thanks for the scheduling tips",
+    "",
+)
+
+BUILTIN_WORDS = [phrase for _, phrases in INTENT_CATEGORIES for phrase in phrases]
+FRAGMENTS = ["要点: ", "について教えて", "the plan", "doing ", "underscore", "trend", "batch", "。", " ", "ok"]
+SCORING_WORDS = list(EMOTIONAL_PHRASES + SPECULATION_PHRASES) + list(load_prohibited_phrases(META_DIR / "prohibited_phrases.txt"))
+
+
+def legacy_intent(text):
+    for category, pattern in LEGACY_RULES:
+        if re.search(pattern, text, re.IGNORECASE):
+            return category
+    return DEFAULT_INTENT
+
+
+def builtin_classifier():
+    return IntentClassifier([lx for lx in intent_lexicons() if lx.name.startswith(INTENT_PREFIX)])
+
+
+def random_corpus(n, seed=0, words=None):
+    rng = random.Random(seed)
+    words = words or BUILTIN_WORDS + FRAGMENTS * 3
+    texts = []
+    for _ in range(n):
+        parts = [rng.choice(words) for _ in range(rng.randint(0, 6))]
+        texts.append("".join(p.upper() if rng.random() < 0.2 else p for p in parts))
+    return texts
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "毎週の自動レポート",
+        "出典の URL を添えて",
+        "Reliability threshold を上げる",
+        "評価結果を再採点して",
+        "metadata を確認",
+        "https://example.com のデータ",
+        "EVAL-001 の信頼度",
+        *PLAIN_PROMPTS,
+    ],
+)
+def test_builtin_rules_match_legacy(text):
+    assert builtin_classifier().classify(text).category == legacy_intent(text)
+
+
+def test_builtin_rules_match_legacy_on_random_corpus():
+    classifier = builtin_classifier()
+    for text in random_corpus(5000):
+        assert classifier.classify(text).category == legacy_intent(text), text
+
+
+def test_taxonomy_keeps_builtin_decisions():
+    # タクソノミーを加えても、組み込み語彙にヒットした入力のカテゴリは変わらない
+    classifier = default_classifier()
+    matcher = default_matcher()
+    for text in random_corpus(5000, seed=1):
+        expected = legacy_intent(text)
+        got = classifier.classify(text).category
+        assert got == match_intent(matcher.scan(text)).category, text
+        if expected != DEFAULT_INTENT:
+            assert got == expected, text
+
+
+@pytest.mark.parametrize("text", PLAIN_PROMPTS)
+def test_plain_english_prompts_stay_general(text):
+    assert legacy_intent(text) == DEFAULT_INTENT
+    assert default_classifier().classify(text).category == DEFAULT_INTENT
+    assert match_intent(default_matcher().scan(text)).category == DEFAULT_INTENT
+
+
+def test_taxonomy_fallback(tmp_path):
+    (tmp_path / "category_taxonomy.json").write_text(
+        json.dumps({"Evidence Integration": ["doi", "citation"], "Meta Evaluation": ["振り返り", "週次"]}),
+        encoding="utf-8",
+    )
+    classifier = default_classifier(tmp_path)
+
+    match = classifier.classify("add the DOI and a citation")
+    assert match.category == "Evidence Integration"
+    assert match.scores == {"Evidence Integration": 2}
+    # 英数字のキーワードは単語の一部には一致しない
+    assert classifier.classify("doing citations").scores == {}
+    # 日本語のキーワードは部分一致
+    assert classifier.classify("今週は週次の振り返りを書く").category == "Meta Evaluation"
+    # キーワード 1 つだけではカテゴリを決めない
+    single = classifier.classify("see the citation")
+    assert single.category == DEFAULT_INTENT
+    assert single.scores == {"Evidence Integration": 1}
+
+
+def test_shared_scan_matches_separate_scans():
+    prohibited = [p.lower() for p in load_prohibited_phrases(META_DIR / "prohibited_phrases.txt")]
+    matcher = default_matcher()
+    for text in random_corpus(5000, seed=2, words=SCORING_WORDS + BUILTIN_WORDS + FRAGMENTS * 3):
+        hits = matcher.scan(text)
+        assert hits.has(EMOTIONAL) == bool(EMOTIONAL_PATTERN.search(text)), text
+        assert hits.has(SPECULATION) == bool(SPECULATION_PATTERN.search(text)), text
+        assert hits.has(PROHIBITED) == any(p in text.lower() for p in prohibited), text
+        assert score_reliability(text, hits=hits) == score_reliability(text), text
+        # generate() は回答（prompt[:120] を含む）の採点にプロンプトの走査結果を切り出して使う
+        assert score_reliability(text[:120], hits=hits.within(0, 120)) == score_reliability(text[:120]), text
+
+
+def test_generate_many_matches_generate():
+    gpt = GPTDesign(threshold=0.5, require_evidence=False)
+    prompts = random_corpus(300, seed=3, words=SCORING_WORDS + BUILTIN_WORDS + FRAGMENTS * 3)
+    for prompt, batched in zip(prompts, gpt.generate_many(prompts)):
+        single = gpt.generate(prompt)
+        for key in ("reply", "evaluation", "lexicon_hits"):
+            assert batched[key] == single[key], prompt
+        assert batched["particle"]["True Intent"] == single["particle"]["True Intent"], prompt
@@ -0,0 +1,55 @@
+"""
+統合レポートの差分集計（ai_core_gpt.pipeline_controller.aggregate_incremental）のテスト。
+
+チェックポイントから追加分だけを畳み込んだレポートが全件からの再計算と一致すること、
+粒子が削除されたときはチェックポイントを捨てて数え直すことを確かめる。
+"""
+
+import json
+
+import pytest
+
+from ai_core_gpt import pipeline_controller
+from ai_core_gpt.pipeline_controller import aggregate_incremental, aggregate_scores
+from ai_core_gpt.store import open_store
+
+
+def without_time(report):
+    return {k: v for k, v in report.items() if k != "timestamp"}
+
+
+@pytest.fixture
+def controller(particle_root, tmp_path, monkeypatch):
+    monkeypatch.setattr(pipeline_controller, "PARTICLE_DIR", particle_root)
+    monkeypatch.setattr(pipeline_controller, "CHECKPOINT_PATH", tmp_path / "integration_checkpoint.json")
+    monkeypatch.setattr(pipeline_controller, "REPORT_PATH", tmp_path / "integration_report.json")
+    return pipeline_controller
+
+
+def test_incremental_matches_full(controller, particle_root, export_samples):
+    export_samples(40, seed=0)
+    first = aggregate_incremental()
+    assert first["total_particles"] == 40
+
+    export_samples(25, seed=1)
+    checkpoint = json.loads(controller.CHECKPOINT_PATH.read_text(encoding="utf-8"))
+    incremental = aggregate_incremental()
+    assert checkpoint["count"] == 40
+    assert incremental["total_particles"] == 65
+
+    full = aggregate_incremental(full=True)
+    assert without_time(incremental) == without_time(full)
+    assert without_time(full) == without_time(aggregate_scores(open_store(particle_root).records()))
+    # 追加が無ければ差分集計は何も畳み込まない
+    assert without_time(aggregate_incremental()) == without_time(full)
+
+
+def test_deletion_invalidates_checkpoint(controller, particle_root, export_samples):
+    paths = export_samples(30, seed=2)
+    aggregate_incremental()
+    paths[0].unlink()
+    paths[1].unlink()
+
+    report = aggregate_incremental()
+    assert report["total_particles"] == 28
+    assert without_time(report) == without_time(aggregate_scores(open_store(particle_root).records()))
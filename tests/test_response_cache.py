@@ -0,0 +1,96 @@
+"""
+応答キャッシュ（ai_core_gpt.response_cache / GPTDesign(cache=...)）のテスト。
+
+reuse="reference" のヒットが実際に保存された最初の粒子を指すこと、ヒットごとの結果が
+保存したエントリや他のヒットと dict を共有しないことを確かめる。
+"""
+
+from pathlib import Path
+
+import pytest
+
+from ai_core_gpt.design import GPTDesign
+from ai_core_gpt.response_cache import REUSE_NEW, REUSE_REFERENCE, ResponseCache
+from ai_core_gpt.store import open_store
+from particle_exporter import export_kwargs, export_particle
+
+PROMPT = "毎週の自動レポートの信頼度を教えて"
+
+
+def design(reuse):
+    return GPTDesign(threshold=0.5, require_evidence=False, cache=ResponseCache(16, ttl=None, reuse=reuse))
+
+
+def test_reference_hit_points_at_stored_particle(particle_root):
+    gpt = design(REUSE_REFERENCE)
+    first = gpt.generate(PROMPT)
+    assert first["cache"] == {"hit": False}
+    saved = Path(export_particle(**export_kwargs(first["particle"])))
+    gpt.record_persisted(PROMPT, None, saved.stem)
+
+    second = gpt.generate(PROMPT)
+    ref = second["cache"]["ref"]
+    record = open_store(particle_root).get(ref)
+    assert record is not None
+    assert record.commit_id == saved.stem
+    assert record.score == first["evaluation"]["score"]
+
+
+def test_reference_hit_before_persist_makes_new_particle():
+    gpt = design(REUSE_REFERENCE)
+    first = gpt.generate(PROMPT)
+    second = gpt.generate(PROMPT)
+    assert second["cache"]["hit"] is True
+    assert "ref" not in second["cache"]
+    assert second["particle"]["Commit ID"] != first["particle"]["Commit ID"]
+
+
+@pytest.mark.parametrize("reuse", [REUSE_NEW, REUSE_REFERENCE])
+def test_hits_do_not_share_mutable_state(reuse):
+    gpt = design(reuse)
+    first = gpt.generate(PROMPT)
+    gpt.record_persisted(PROMPT, None, "AUTO_first")
+    # 呼び出し側が miss の結果に足したキーはキャッシュに入らない
+    first["particle_meta"] = {"storage_commit_id": "AUTO_first"}
+    first["evaluation"]["score"] = -1.0
+
+    hit1 = gpt.generate(PROMPT)
+    hit2 = gpt.generate(PROMPT)
+    assert "particle_meta" not in hit1
+    assert hit1["evaluation"]["score"] != -1.0
+    assert hit1["cache"] is not hit2["cache"]
+    hit1["cache"]["extra"] = True
+    hit1["particle_meta"] = {}
+    assert "extra" not in hit2["cache"]
+    assert "particle_meta" not in gpt.generate(PROMPT)
+
+
+def test_generate_many_reference_hits(particle_root):
+    gpt = design(REUSE_REFERENCE)
+    prompts = [PROMPT, "データの出典を添えて"]
+    results = gpt.generate_many(prompts)
+    assert [r["cache"]["hit"] for r in results] == [False, False]
+    for prompt, result in zip(prompts, results):
+        saved = Path(export_particle(**export_kwargs(result["particle"])))
+        gpt.record_persisted(prompt, None, saved.stem)
+
+    again = gpt.generate_many(prompts + [PROMPT])
+    store = open_store(particle_root)
+    assert all(r["cache"]["hit"] for r in again)
+    assert again[0]["cache"]["ref"] == again[2]["cache"]["ref"]
+    assert {store.get(r["cache"]["ref"]).commit_id for r in again} == {r["cache"]["ref"] for r in again}
+
+
+def test_api_reference_hit_points_at_stored_particle(particle_root):
+    gpt_api = pytest.importorskip("gpt_api")
+    import particle_exporter
+
+    gpt = design(REUSE_REFERENCE)
+    req = gpt_api.GenerateRequest(text=PROMPT)
+    first = gpt_api._generate_one(gpt, req)
+    second = gpt_api._generate_one(gpt, req)
+    particle_exporter.default_writer().flush()
+
+    assert second["cache"]["ref"] == first["particle_meta"]["storage_commit_id"]
+    assert "particle_meta" not in second
+    assert open_store(particle_root).get(second["cache"]["ref"]) is not None
@@ -0,0 +1,91 @@
+"""
+バッチ採点（ai_core_gpt.scoring.score_batch）のテスト。
+
+score_batch() の各行が score_reliability() をテキストごとに呼んだ結果と一致すること、
+区切り文字（\\x00）を含むテキストや境界を跨ぐ語彙でも判定がずれないことを確かめる。
+"""
+
+import random
+import re
+
+import pytest
+
+from ai_core_gpt import scoring
+from ai_core_gpt.scoring import score_batch, score_reliability
+
+SAMPLES = [
+    "System achieved 0.95 reliability with verified evidence.",
+    "たぶん問題ないと思われます",
+    "推測ですが、来月には改善するかもしれない",
+    "maybe",
+    "may",
+    "be",
+    "要点: 信頼度スコアの計算方針を教えて",
+    "I guess the threshold should probably be lower.",
+    "ok",
+    "",
+    "\x00",
+]
+
+NUL_TEXTS = [
+    "ok\x00maybe",
+    "maybe\x00",
+    "\x00guess",
+    "may\x00be",
+    "\x00\x00",
+    "long enough text\x00たぶん",
+    "推\x00測",
+]
+
+
+def random_texts(n, seed=0):
+    rng = random.Random(seed)
+    return ["".join(rng.choice(SAMPLES) for _ in range(rng.randint(0, 4))) for _ in range(n)]
+
+
+def assert_parity(texts, seed=0):
+    rng = random.Random(seed)
+    evidence = [rng.random() < 0.5 for _ in texts]
+    intent = [rng.random() < 0.8 for _ in texts]
+    contra = [rng.random() < 0.1 for _ in texts]
+    batch = score_batch(texts, evidence, intent, contra, 0.6)
+    expected = [score_reliability(t, e, i, c, 0.6) for t, e, i, c in zip(texts, evidence, intent, contra)]
+    assert batch.rows() == expected
+    for i, row in enumerate(expected):
+        assert batch.row(i) == row, texts[i]
+
+
+@pytest.mark.parametrize("text", NUL_TEXTS)
+def test_texts_with_separator_match_single(text):
+    # 区切り文字を含むテキストを前後のテキストと並べても、単発採点と同じ結果になる
+    assert_parity(["maybe", text, "ok", text, "guess"])
+
+
+def test_batch_matches_single_on_random_corpus():
+    assert_parity(random_texts(3000) + NUL_TEXTS * 3, seed=1)
+
+
+def test_batch_matches_single_without_numpy(monkeypatch):
+    monkeypatch.setattr(scoring, "np", None)
+    assert_parity(random_texts(200, seed=2) + NUL_TEXTS, seed=2)
+
+
+def test_pattern_hits_do_not_cross_text_boundaries():
+    np = pytest.importorskip("numpy")
+    pattern = re.compile("a\x00b|b\x00c|c")
+    texts = ["xa", "by", "a\x00b", "b", "\x00c"]
+    joined = "\x00".join(texts)
+    ends = np.cumsum(np.array([len(t) for t in texts]) + 1) - 1
+    hits = scoring._pattern_hits(pattern, joined, ends, len(texts))
+    assert hits.tolist() == [bool(pattern.search(t)) for t in texts] == [False, False, True, False, True]
+
+
+def test_pattern_hits_match_per_text_search_on_random_corpus():
+    np = pytest.importorskip("numpy")
+    rng = random.Random(3)
+    pattern = re.compile("ab|b\x00\x00c|a\x00b|c\x00")
+    for _ in range(200):
+        texts = ["".join(rng.choice("abc\x00") for _ in range(rng.randint(0, 4))) for _ in range(rng.randint(1, 8))]
+        ends = np.cumsum(np.array([len(t) for t in texts]) + 1) - 1
+        hits = scoring._pattern_hits(pattern, "\x00".join(texts), ends, len(texts))
+        assert hits.tolist() == [bool(pattern.search(t)) for t in texts], texts
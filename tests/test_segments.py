@@ -0,0 +1,83 @@
+"""
+セグメントログ（ai_core_gpt.segments）のテスト。
+
+粒子 JSON のツリーをセグメントへ変換しても、インデックスから読むレコードと集計結果・
+Commit ID での読み出しが変換前と一致することを確かめる。
+"""
+
+import pytest
+
+from ai_core_gpt.pipeline_controller import aggregate_scores
+from ai_core_gpt.segments import convert, iter_particles, list_segments, scan_segments
+from ai_core_gpt.store import ParticleStore, open_store, read_particle
+
+FIELDS = (
+    "name", "commit_id", "score", "status", "intent_category", "intent_details",
+    "parent_commit", "created_at", "reviewer", "content_hash",
+)
+
+
+def fields(record):
+    return tuple(getattr(record, f) for f in FIELDS)
+
+
+def without_time(report):
+    return {k: v for k, v in report.items() if k != "timestamp"}
+
+
+def snapshot(root):
+    store = ParticleStore(root)
+    store.sync()
+    records = store.records()
+    loaded = {r.commit_id: store.load(r.commit_id) for r in records}
+    store.close()
+    return sorted(map(fields, records)), without_time(aggregate_scores(records)), loaded
+
+
+def test_in_place_conversion_keeps_records(particle_root, export_samples):
+    paths = export_samples(45)
+    before = snapshot(particle_root)
+
+    stats = convert(particle_root, remove_source=True, batch_size=16)
+    assert stats == {"converted": 45, "skipped": 0, "removed": 45}
+    assert not any(path.exists() for path in paths)
+    assert snapshot(particle_root) == before
+    records = open_store(particle_root).records()
+    assert all(r.offset >= 0 for r in records)
+
+
+def test_conversion_to_another_root_keeps_records(particle_root, export_samples, tmp_path):
+    export_samples(30)
+    before = snapshot(particle_root)
+
+    out = tmp_path / "segmented"
+    assert convert(particle_root, out=out)["converted"] == 30
+    assert snapshot(out) == before
+    # 元のツリーはそのまま残る
+    assert snapshot(particle_root) == before
+
+
+def test_in_place_conversion_requires_remove_source(particle_root, export_samples):
+    export_samples(3)
+    with pytest.raises(ValueError):
+        convert(particle_root)
+
+
+def test_segment_backend_matches_file_backend(particle_root, export_samples):
+    files = export_samples(20, seed=4)
+    segmented = export_samples(20, seed=4, backend="segments")
+    assert len(list_segments(particle_root)) == 1
+
+    store = open_store(particle_root)
+    by_name = {r.name: r for r in store.records()}
+    for file_path, seg_path in zip(files, segmented):
+        # Commit ID とタイムスタンプ以外は同じ入力から同じ粒子になる
+        assert by_name[seg_path.name].content_hash == by_name[file_path.name].content_hash
+        assert by_name[seg_path.name].offset >= 0
+    streamed = {name: data for name, data in iter_particles(particle_root)}
+    assert set(streamed) == {p.name for p in segmented}
+    # 診断用の軽量リーダもインデックスと同じ値を読む
+    light = {r.name: (r.commit_id, r.score, r.status, r.intent_category) for r in scan_segments(particle_root)}
+    indexed = {p.name: by_name[p.name] for p in segmented}
+    assert light == {name: (r.commit_id, r.score, r.status, r.intent_category) for name, r in indexed.items()}
+    assert sorted(fields(by_name[p.name]) for p in files) == sorted(fields(read_particle(p)) for p in files)
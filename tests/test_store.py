@@ -0,0 +1,71 @@
+"""
+粒子インデックス（ai_core_gpt.store.ParticleStore）のテスト。
+
+インデックスの行が粒子 JSON をそのまま読んだ結果と一致すること、sync() が追加・削除を
+取り込み、削除したときだけ世代が変わること、並列読み込みと直列読み込みで同じ行になることを確かめる。
+"""
+
+import shutil
+from pathlib import Path
+
+from ai_core_gpt import store as store_module
+from ai_core_gpt.store import ParticleStore, open_store, read_particle
+
+FIELDS = (
+    "name", "commit_id", "score", "status", "intent_category", "intent_details",
+    "parent_commit", "created_at", "reviewer", "content_hash",
+)
+
+
+def fields(record):
+    return tuple(getattr(record, f) for f in FIELDS)
+
+
+def test_index_matches_files(particle_root, export_samples):
+    paths = export_samples(50)
+    records = open_store(particle_root).records()
+    assert [fields(r) for r in records] == [fields(read_particle(p)) for p in paths]
+
+
+def test_sync_tracks_additions_and_deletions(particle_root, export_samples):
+    store = open_store(particle_root)
+    first = export_samples(20, seed=0)
+    # export_particle() はインデックスにも登録するので、sync() で取り込むものは無い
+    assert store.sync()["added"] == 0
+    assert store.count() == 20
+    generation = store.generation
+    last_seq = store.last_seq()
+
+    # 別の経路で置かれたファイルは sync() で取り込む
+    copied = first[0].parent / "MANUAL_0001.json"
+    copied.write_text(first[0].read_text(encoding="utf-8").replace(first[0].stem, "MANUAL_0001"), encoding="utf-8")
+    second = export_samples(10, seed=1)
+    assert store.sync()["added"] == 1
+    # 追加だけなら世代は変わらず、since で新しい粒子だけを読める
+    assert store.generation == generation
+    assert {r.commit_id for r in store.records(since=last_seq)} == {p.stem for p in second} | {"MANUAL_0001"}
+
+    first[0].unlink()
+    assert store.sync()["removed"] == 1
+    assert store.generation != generation
+    assert store.get(first[0].stem) is None
+    assert store.count() == 30
+
+
+def test_parallel_load_matches_serial(particle_root, export_samples, monkeypatch):
+    paths = export_samples(40)
+    # 2 つ目の月ディレクトリを作って、シャードが複数ある状態にする
+    other = particle_root / "2025" / "01"
+    other.mkdir(parents=True)
+    moved = [Path(shutil.move(str(path), other / path.name)) for path in paths[::2]]
+
+    store = ParticleStore(particle_root)
+    store.rebuild(workers=1)
+    serial = [fields(r) for r in store.records()]
+    monkeypatch.setattr(store_module, "PARALLEL_MIN_FILES", 0)
+    store.rebuild(workers=2)
+    assert [fields(r) for r in store.records()] == serial
+    # 名前順のディレクトリ（2025/01 → 2026/10）・ファイル順に登録される
+    expected = sorted(moved, key=lambda p: p.name) + sorted(paths[1::2], key=lambda p: p.name)
+    assert serial == [fields(read_particle(p)) for p in expected]
+    store.close()
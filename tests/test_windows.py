@@ -0,0 +1,121 @@
+"""
+ローリング集計（ai_core_gpt.windows）のテスト。
+
+created_at のオフセットの有無にかかわらず同じ UTC の時刻になること、リングバッファの窓が
+取り込み順によらず全件を数え直した結果と一致すること、列キャッシュの timeline() から作った
+シグナルが粒子レコードから作ったものと一致することを確かめる。
+"""
+
+import json
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from ai_core_gpt.particle import Particle
+from ai_core_gpt.store import open_store
+from ai_core_gpt.windows import WINDOWS, RollingStats, timestamp_of
+
+NOW = datetime(2026, 10, 18, 12, 0, 0, tzinfo=timezone.utc).timestamp()
+
+
+def stamp(ts, rng):
+    """UNIX 秒 ts を、Z / +09:00 / オフセット無し（UTC）のいずれかの ISO 文字列にする。"""
+    utc = datetime.fromtimestamp(ts, timezone.utc)
+    style = rng.randrange(3)
+    if style == 0:
+        return utc.replace(tzinfo=None).isoformat() + "Z"
+    if style == 1:
+        return utc.astimezone(timezone(timedelta(hours=9))).isoformat()
+    return utc.replace(tzinfo=None).isoformat()
+
+
+def sample_records(n, seed=0):
+    rng = random.Random(seed)
+    records = []
+    for i in range(n):
+        # 窓の外（8〜10 日前）も混ぜる。列キャッシュは秒単位なので整数秒にする
+        ts = float(int(NOW - rng.uniform(0, 10 * 86400)))
+        score = round(rng.random(), 3)
+        records.append(Particle(
+            f"AUTO_{i:05d}", score, "promoted" if score >= 0.6 else "record_only",
+            created_at=stamp(ts, rng),
+        ))
+    return records
+
+
+def brute_force(records, span, buckets):
+    width = span / buckets
+    last = int(NOW // width)
+    inside = [r for r in records if last - buckets < int(timestamp_of(r) // width) <= last]
+    count = len(inside)
+    return {
+        "count": count,
+        "avg_score": sum(r.score for r in inside) / count if count else None,
+        "promoted_ratio": sum(r.status == "promoted" for r in inside) / count if count else None,
+    }
+
+
+@pytest.mark.parametrize(
+    "created_at",
+    ["2026-01-02T03:04:05Z", "2026-01-02T03:04:05+00:00", "2026-01-02T12:04:05+09:00", "2026-01-02T03:04:05"],
+)
+def test_timestamp_of_is_utc(created_at):
+    expected = datetime(2026, 1, 2, 3, 4, 5, tzinfo=timezone.utc).timestamp()
+    assert timestamp_of(Particle("p", created_at=created_at)) == expected
+
+
+@pytest.mark.parametrize("created_at", [None, "", "yesterday"])
+def test_timestamp_of_unreadable(created_at):
+    assert timestamp_of(Particle("p", created_at=created_at)) is None
+
+
+def test_windows_match_brute_force_in_any_order():
+    records = sample_records(3000)
+    ordered = sorted(records, key=timestamp_of)
+    shuffled = records[:]
+    random.Random(1).shuffle(shuffled)
+
+    snapshots = []
+    for batch in (ordered, shuffled):
+        stats = RollingStats()
+        for record in batch:
+            stats.add_record(record)
+        snapshots.append(stats.snapshot(NOW))
+
+    for name, span, buckets in WINDOWS:
+        expected = brute_force(records, span, buckets)
+        for snapshot in snapshots:
+            got = snapshot["windows"][name]
+            assert got["count"] == expected["count"], name
+            assert got["avg_score"] == pytest.approx(expected["avg_score"]), name
+            assert got["promoted_ratio"] == pytest.approx(expected["promoted_ratio"]), name
+    assert snapshots[0]["ewma"] == pytest.approx(snapshots[1]["ewma"])
+    assert snapshots[0]["slope_per_day"] == pytest.approx(snapshots[1]["slope_per_day"])
+
+
+def test_column_timeline_matches_records(particle_root):
+    pytest.importorskip("numpy")
+    from ai_core_gpt.columns import load_columns
+
+    for record in sample_records(500, seed=2):
+        month = datetime.fromtimestamp(timestamp_of(record), timezone.utc).strftime("%Y/%m")
+        path = particle_root / month / f"{record.commit_id}.json"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(record.to_v1_dict(), ensure_ascii=False), encoding="utf-8")
+
+    store = open_store(particle_root)
+    store.sync()
+    from_records = RollingStats()
+    for record in sorted(store.records(), key=timestamp_of):
+        from_records.add_record(record)
+    from_columns = RollingStats()
+    from_columns.add_series(*(col.tolist() for col in load_columns(particle_root).timeline()))
+
+    expected, got = from_records.snapshot(NOW), from_columns.snapshot(NOW)
+    for name, _, _ in WINDOWS:
+        assert got["windows"][name]["count"] == expected["windows"][name]["count"], name
+        assert got["windows"][name]["avg_score"] == pytest.approx(expected["windows"][name]["avg_score"]), name
+        assert got["windows"][name]["promoted_ratio"] == pytest.approx(expected["windows"][name]["promoted_ratio"]), name
+    assert got["ewma"] == pytest.approx(expected["ewma"])
+    assert got["slope_per_day"] == pytest.approx(expected["slope_per_day"])